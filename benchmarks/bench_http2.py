@@ -0,0 +1,96 @@
+"""
+Concurrent run polls over pooled HTTP/1.1 (RequestsTransport) against multiplexed HTTP/2 (HTTPXTransport).
+
+Both local servers answer every request after the same simulated API latency. HTTP/1.1 needs a connection per
+request in flight, HTTP/2 carries them all over one connection: httpx only opens another once the first has no
+concurrent streams left, which the local server never runs out of. Needs the http2 extra.
+
+Usage: python benchmarks/bench_http2.py [threads] [requests] [latency_ms]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from te2_sdk._http_server import ThreadingHTTPServer  # noqa: E402
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns  # noqa: E402
+from te2_sdk.transport import HTTPXTransport, RequestsTransport  # noqa: E402
+from tests.h2_server import H2StandIn  # noqa: E402
+
+
+class _RunHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        body = json.dumps({"data": {"id": self.path.split("?")[0].rsplit("/", 1)[-1], "type": "runs",
+                                    "attributes": {"status": "applied"}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _http1_server(delay):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RunHandler)
+    server.request_queue_size = 256
+    server.delay = delay
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _poll(base_url, transport, threads, requests):
+    client = TE2Client(organisation="bench", atlas_token="bench", base_url=base_url, transport=transport)
+    client.get_workspace_id = lambda name, deadline=None: "ws-bench"
+    runs = TE2WorkspaceRuns(client, "bench")
+
+    def poll(number):
+        return runs.get_run_by_id("run-%d" % number, fields={"runs": ["status"]})
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(poll, range(threads)))  # Open the connections first
+        started = time.perf_counter()
+        list(pool.map(poll, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    transport.close()
+    return elapsed
+
+
+def main(threads=64, requests=2000, latency_ms=50):
+    delay = latency_ms / 1000.0
+    print("%d requests from %d threads, %d ms latency per request" % (requests, threads, latency_ms))
+
+    server = _http1_server(delay)
+    elapsed = _poll("http://127.0.0.1:%d" % server.server_address[1],
+                    RequestsTransport(pooled=True, pool_maxsize=threads), threads, requests)
+    print("HTTP/1.1 pooled: %.2f s, %6.0f requests/s, %d connections opened"
+          % (elapsed, requests / elapsed, server.connections))
+    server.shutdown()
+    server.server_close()
+
+    server = H2StandIn(delay)
+    elapsed = _poll(server.url, HTTPXTransport(http1=False), threads, requests)
+    print("HTTP/2:          %.2f s, %6.0f requests/s, %d connections opened"
+          % (elapsed, requests / elapsed, server.connections))
+    server.close()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""
+Start-up time of te2_sdk modules and of the te2 command, each measured in a fresh interpreter.
+
+Usage: python benchmarks/bench_import.py [runs]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ("python -c pass", ["-c", "pass"]),
+    ("import te2_sdk.cli", ["-c", "import te2_sdk.cli"]),
+    ("import te2_sdk.te2", ["-c", "import te2_sdk.te2"]),
+    ("te2 --help", ["-m", "te2_sdk", "--help"]),
+]
+
+
+def _time(arguments, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _slowest_imports(module, count=5):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=ROOT, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(runs=10):
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, "workspaces.json")
+        with open(cache, "w") as f:
+            f.write('{"https://tf-api.com/organizations/TestOrg/workspaces/example": ["ws-example1", %f]}' % time.time())
+
+        env = dict(os.environ, TE2_ORGANISATION="TestOrg", TE2_TOKEN="token", TE2_BASE_URL="https://tf-api.com",
+                   TE2_CACHE=cache)
+        cases = CASES + [("te2 workspace-id (cached)", ["-m", "te2_sdk", "workspace-id", "example"])]
+
+        for name, arguments in cases:
+            print("%-28s %7.1f ms" % (name, _time(arguments, env, runs) * 1000))
+
+    print("\nSlowest imports under te2_sdk.te2 (cumulative):")
+    for cumulative, name in _slowest_imports("te2_sdk.te2"):
+        print("  %-26s %7.1f ms" % (name, cumulative / 1000))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
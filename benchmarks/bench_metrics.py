@@ -0,0 +1,49 @@
+"""
+Cost of recording metrics around a request, against a transport answering instantly.
+
+Usage: python benchmarks/bench_metrics.py [requests]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from te2_sdk.metrics import MetricsRegistry, MetricsTransport  # noqa: E402
+
+
+class _Response:
+    status_code = 200
+
+
+class _InstantTransport:
+    def request(self, method, url, **kwargs):
+        return _Response()
+
+    def close(self):
+        pass
+
+
+def _time(transport, requests):
+    started = time.perf_counter()
+    for index in range(requests):
+        transport.request("GET", "https://app.terraform.io/api/v2/runs/run-%08d" % (index % 100))
+    return time.perf_counter() - started
+
+
+def main(requests=100000):
+    registry = MetricsRegistry()
+    bare = min(_time(_InstantTransport(), requests) for _ in range(3))
+    measured = min(_time(MetricsTransport(registry, _InstantTransport()), requests) for _ in range(3))
+
+    started = time.perf_counter()
+    registry.render()
+    rendered = time.perf_counter() - started
+
+    print("%d requests" % requests)
+    print("Recording overhead: %.2f us per request" % ((measured - bare) / requests * 1e6))
+    print("Rendering the registry: %.2f ms" % (rendered * 1000))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,48 @@
+"""
+Replay a recorded cassette through TE2Client decoding, to measure SDK overhead against production call patterns.
+Requests with a body are skipped, the cassette only keeps a digest of it.
+
+Record one with:
+    client = TE2Client(..., transport=RecordingTransport("cassette.jsonl.gz"))
+
+Usage: python benchmarks/bench_replay.py cassette.jsonl.gz [repeats]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from te2_sdk.cassette import ReplayTransport, read_cassette  # noqa: E402
+from te2_sdk.te2 import TE2Client  # noqa: E402
+
+
+def main(path, repeats=10):
+    interactions = [interaction for interaction in read_cassette(path) if interaction["body"] is None]
+    recorded_latency = sum(interaction["latency"] for interaction in interactions)
+
+    client = TE2Client(organisation="bench", atlas_token="bench")
+    best = None
+    for _ in range(repeats):
+        client.transport = ReplayTransport(path, time_scale=0)
+        started = time.perf_counter()
+        for interaction in interactions:
+            response = client.transport.request(
+                interaction["method"], interaction["url"], headers=client.request_header,
+                params=dict(interaction["params"])
+            )
+            if "json" in (response.headers.get("Content-Type") or "json"):
+                try:
+                    client.decode(response)
+                except ValueError:
+                    pass
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    print("%d requests, recorded API latency %.1f ms" % (len(interactions), recorded_latency * 1000))
+    print("SDK overhead (replay and decode): %.3f ms total, %.1f us per request"
+          % (best * 1000, best / max(len(interactions), 1) * 1e6))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], *[int(arg) for arg in sys.argv[2:]])
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of the JSON backends used by te2_sdk.
+
+Usage: python benchmarks/bench_serializers.py [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from te2_sdk import serializers  # noqa: E402
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+def main(iterations=20000):
+    with open(os.path.join(os.path.dirname(__file__), "..", "tests", "responses", "get_runs.json")) as f:
+        runs = json.load(f)
+
+    run_document = serializers.JSONSerializer().dumps({"data": runs["data"][0]}).encode()
+    runs_document = serializers.JSONSerializer().dumps(runs).encode()
+    run_request = {
+        "data": {
+            "attributes": {"is-destroy": False},
+            "relationships": {"workspace": {"data": {"type": "workspaces", "id": "ws-example1"}}},
+            "type": "runs"
+        }
+    }
+
+    print("{:<10} {:>14} {:>14} {:>14}".format("backend", "encode run", "decode run", "decode list"))
+    for name, backend in serializers.SERIALIZERS.items():
+        try:
+            serializer = backend()
+        except ImportError:
+            print("{:<10} not installed".format(name))
+            continue
+
+        encode = timeit.timeit(lambda: serializer.dumps(run_request), number=iterations)
+        decode = timeit.timeit(lambda: serializer.loads(run_document), number=iterations)
+        decode_list = timeit.timeit(lambda: serializer.loads(runs_document), number=iterations)
+        print("{:<10} {:>12.2f}us {:>12.2f}us {:>12.2f}us".format(
+            name, encode / iterations * 1e6, decode / iterations * 1e6, decode_list / iterations * 1e6
+        ))
+
+    template = timeit.timeit(
+        lambda: serializers.RUN_REQUEST.render(workspace_id="ws-example1", destroy=False), number=iterations
+    )
+    status = timeit.timeit(lambda: serializers.decode_status(Response(run_document)), number=iterations)
+    print("{:<10} {:>12.2f}us {:>12.2f}us {:>14}".format(
+        "template", template / iterations * 1e6, status / iterations * 1e6, "-"
+    ))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
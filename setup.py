@@ -44,6 +44,11 @@ setup(
     install_requires=['requests'],
     extras_require={
         'test': ['coverage', 'pytest', 'pytest-cov'],
+        'speedups': ['orjson'],
+        'http2': ['httpx[http2]'],
+    },
+    entry_points={
+        'console_scripts': ['te2=te2_sdk.cli:main'],
     },
     cmdclass={'test': RunTests},
     classifiers=[
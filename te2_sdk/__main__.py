@@ -0,0 +1,5 @@
+import sys
+
+from te2_sdk.cli import main
+
+sys.exit(main())
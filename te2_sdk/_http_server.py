@@ -0,0 +1,10 @@
+"""
+The threaded HTTP server behind the notification receiver and the metrics endpoint.
+"""
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which only exists from Python 3.7"""
+    daemon_threads = True
@@ -0,0 +1,248 @@
+"""
+Variable operations spanning many workspaces.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+
+from te2_sdk.deadline import Deadline
+from te2_sdk.te2 import TE2WorkspaceVariables
+
+VARIABLE_DEFAULTS = {"category": "terraform", "sensitive": False, "hcl": False}
+
+
+def _variable_spec(spec):
+    """Normalise a value, or a dict of create_or_update_workspace_variable arguments, into a full spec."""
+    if isinstance(spec, dict):
+        return dict(VARIABLE_DEFAULTS, **spec)
+    return dict(VARIABLE_DEFAULTS, value=spec)
+
+
+def _workspace_report(error=None):
+    return {"created": [], "updated": [], "unchanged": [], "errors": {}, "error": error}
+
+
+def _error_message(error):
+    # str(KeyError) quotes its message
+    return str(error.args[0]) if error.args else error.__class__.__name__
+
+
+class TE2MultiWorkspaceVariables:
+    def __init__(self, client, workspace_names=None, pattern=None, max_workers=8, fingerprint_store=None):
+        """
+        Sets the same variables on many workspaces at once, e.g. to rotate a shared credential.
+
+        :param client: TE2Client
+        :param workspace_names: Names of the workspaces to update
+        :param pattern: Glob matched against every workspace name in the organisation, e.g. "app-*-prod"
+        :param max_workers: Maximum number of API calls in flight
+        :param fingerprint_store: Optional FingerprintStore, so unchanged sensitive variables are not rewritten
+        """
+        if workspace_names is None and pattern is None:
+            raise KeyError("workspace_names or pattern must be given")
+
+        self.client = client
+        self.workspace_names = set(workspace_names or [])
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.fingerprint_store = fingerprint_store
+
+    def resolve_workspaces(self, deadline=None):
+        """
+        Resolve the selected workspaces with one listing of the organisation's workspaces
+
+        :param deadline: Optional Deadline
+        :return: Tuple of (dict of workspace name to ID, set of requested names that do not exist)
+        """
+        if self.pattern is None:
+            workspace_ids = self.client.get_workspace_ids(sorted(self.workspace_names), deadline=deadline)
+        else:
+            # Names only, as get_workspace_ids lists them, rather than every workspace's full document
+            listing = self.client.get_all_workspaces(deadline=deadline, fields={"workspaces": ["name"]})
+            workspaces = {obj["attributes"]["name"]: obj["id"] for obj in listing}
+            workspace_ids = {
+                name: workspace_id for name, workspace_id in workspaces.items()
+                if name in self.workspace_names or fnmatchcase(name, self.pattern)
+            }
+
+        return workspace_ids, self.workspace_names - set(workspace_ids)
+
+    def push(self, variables, deadline=None):
+        """
+        Create or update variables on every selected workspace
+
+        :param variables: Dict of variable key to either a value, or a dict with "value" and optionally
+                          "category", "sensitive" and "hcl" as accepted by create_or_update_workspace_variable.
+                          Keys and values are written verbatim, spaces are kept.
+        :param deadline: Optional Deadline, or budget in seconds. Calls still to be made when it passes are reported
+                         as errors.
+        :return: Dict of workspace name to a report of {"created": [keys], "updated": [keys], "unchanged": [keys],
+                 "errors": {key: error}, "error": error for the whole workspace or None}
+        """
+        specs = {key: _variable_spec(spec) for key, spec in variables.items()}
+        for spec in specs.values():
+            TE2WorkspaceVariables._validate_variable(spec["category"], spec["sensitive"], spec["hcl"])
+
+        deadline = Deadline.resolve(deadline)
+        workspace_ids, missing = self.resolve_workspaces(deadline)
+
+        report = {name: _workspace_report() for name in workspace_ids}
+        for name in missing:
+            report[name] = _workspace_report(error="Workspace ID Cannot be found")
+
+        workspaces = {
+            name: TE2WorkspaceVariables(
+                self.client, name, workspace_id=workspace_id, fingerprint_store=self.fingerprint_store
+            )
+            for name, workspace_id in workspace_ids.items()
+        }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            listings = {
+                name: executor.submit(workspace.get_workspace_variables, deadline)
+                for name, workspace in workspaces.items()
+            }
+
+            writes = {}
+            for name, listing in listings.items():
+                try:
+                    existing = {var['attributes']['key']: var for var in listing.result()}
+                except Exception as e:
+                    report[name]["error"] = _error_message(e)
+                    continue
+
+                for key, spec in specs.items():
+                    existing_variable = existing.get(key)
+                    if workspaces[name]._is_unchanged(existing_variable, key, normalise=False, **spec):
+                        report[name]["unchanged"].append(key)
+                        continue
+
+                    writes[(name, key)] = (
+                        "created" if existing_variable is None else "updated",
+                        executor.submit(
+                            workspaces[name]._write_workspace_variable,
+                            key, spec["value"], spec["category"], spec["sensitive"], spec["hcl"], existing_variable,
+                            deadline, normalise=False
+                        )
+                    )
+
+            for (name, key), (action, write) in writes.items():
+                try:
+                    write.result()
+                except Exception as e:
+                    report[name]["errors"][key] = _error_message(e)
+                else:
+                    report[name][action].append(key)
+
+        return report
+
+
+def _snapshot_variable(variable):
+    """The parts of a variable document create_or_update_workspace_variable takes"""
+    attributes = variable['attributes']
+    return {
+        "key": attributes['key'],
+        "value": attributes.get('value'),
+        "category": attributes.get('category', "terraform"),
+        "sensitive": bool(attributes.get('sensitive')),
+        "hcl": bool(attributes.get('hcl')),
+    }
+
+
+def _variable_specs(snapshot):
+    """
+    :return: Tuple of (dict of key to spec for push, keys skipped because their value is unknown)
+    """
+    specs, skipped = {}, []
+    for variable in snapshot:
+        if variable["value"] is None:
+            # Sensitive values are write only, the API returns them without a value
+            skipped.append(variable["key"])
+            continue
+        specs[variable["key"]] = {name: variable[name] for name in ("value", "category", "sensitive", "hcl")}
+    return specs, skipped
+
+
+def export_variables(client, workspace_name, path, deadline=None):
+    """
+    Write a workspace's variables to a JSON lines snapshot, one variable per line
+
+    Sensitive variables are written without a value, the API never returns it.
+
+    :param client: TE2Client
+    :param workspace_name: Workspace to export
+    :param path: Snapshot file, overwritten
+    :param deadline: Optional Deadline
+    :return: Number of variables written
+    """
+    snapshot = [
+        _snapshot_variable(variable)
+        for variable in TE2WorkspaceVariables(client, workspace_name).get_workspace_variables(deadline=deadline)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        for variable in snapshot:
+            f.write(json.dumps(variable, separators=(",", ":")) + "\n")
+    return len(snapshot)
+
+
+def read_variable_snapshot(path):
+    """
+    :return: List of variables, dicts of "key", "value", "category", "sensitive" and "hcl"
+    """
+    with open(path, encoding="utf-8") as f:
+        return [dict(dict(VARIABLE_DEFAULTS, value=None), **json.loads(line)) for line in f if line.strip()]
+
+
+def _push_snapshot(client, snapshot, workspace_names, max_workers, fingerprint_store, deadline):
+    specs, skipped = _variable_specs(snapshot)
+    report = TE2MultiWorkspaceVariables(
+        client, workspace_names=workspace_names, max_workers=max_workers, fingerprint_store=fingerprint_store
+    ).push(specs, deadline=deadline)
+
+    for workspace_report in report.values():
+        workspace_report["skipped"] = list(skipped)
+    return report
+
+
+def import_variables(client, workspace_name, path, max_workers=8, fingerprint_store=None, deadline=None):
+    """
+    Create or update a workspace's variables from a snapshot written by export_variables
+
+    The workspace is listed once; variables that already match are left alone and the others are written in
+    parallel. Variables without a value in the snapshot are skipped.
+
+    :param max_workers: Maximum number of API calls in flight
+    :param fingerprint_store: Optional FingerprintStore, so unchanged sensitive variables are not rewritten
+    :param deadline: Optional Deadline, or budget in seconds
+    :return: Report as returned by TE2MultiWorkspaceVariables.push for the workspace, with the "skipped" keys
+    """
+    return _push_snapshot(
+        client, read_variable_snapshot(path), [workspace_name], max_workers, fingerprint_store, deadline
+    )[workspace_name]
+
+
+def clone_variables(client, source, target, max_workers=8, fingerprint_store=None, deadline=None):
+    """
+    Copy every variable of one workspace to another, e.g. from a template to a preview environment
+
+    The source and target are each listed once. Variables that already match on the target are left alone and
+    the others are written in parallel. Sensitive variables of the source cannot be read, so they are skipped.
+
+    :param client: TE2Client
+    :param source: Name of the workspace to copy from
+    :param target: Name of the workspace to copy to, or a list of names
+    :param max_workers: Maximum number of API calls in flight
+    :param fingerprint_store: Optional FingerprintStore, so unchanged sensitive variables are not rewritten
+    :param deadline: Optional Deadline, or budget in seconds
+    :return: Report as returned by TE2MultiWorkspaceVariables.push, with the "skipped" keys; for each target when a
+             list was given
+    """
+    deadline = Deadline.resolve(deadline)
+    snapshot = [
+        _snapshot_variable(variable)
+        for variable in TE2WorkspaceVariables(client, source).get_workspace_variables(deadline=deadline)
+    ]
+
+    targets = [target] if isinstance(target, str) else list(target)
+    report = _push_snapshot(client, snapshot, targets, max_workers, fingerprint_store, deadline)
+    return report[target] if isinstance(target, str) else report
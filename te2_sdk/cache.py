@@ -0,0 +1,79 @@
+"""
+Workspace name to ID lookups, kept in memory and optionally on disk.
+"""
+import threading
+import time
+
+from te2_sdk.file_store import JSONFileStore
+
+
+def workspace_cache_key(base_url, organisation, workspace_name):
+    return base_url + "/organizations/" + organisation + "/workspaces/" + workspace_name
+
+
+class WorkspaceCache:
+    def __init__(self, path=None, ttl=None):
+        """
+        Caches workspace IDs so TE2Client.get_workspace_id does not list every workspace on each call.
+
+        Safe to share between threads. The entries are copied on write, so lookups read them without a lock and only
+        hold one briefly to count the hit or miss.
+
+        :param path: Optional JSON file shared by every process using the same path, e.g. pipeline workers
+        :param ttl: Optional age in seconds after which an entry is looked up again
+        """
+        self.ttl = ttl
+        self._store = JSONFileStore(path) if path else None
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> [workspace_id, cached_at], replaced rather than changed once published
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self):
+        return self._store.path if self._store is not None else None
+
+    def get(self, key):
+        entry = self._entries.get(key)
+
+        if entry is None and self._store is not None:
+            # Another process may have cached it since this one last read the file
+            stored = self._store.load()
+            with self._lock:
+                self._entries = dict(self._entries, **stored)
+            entry = self._entries.get(key)
+
+        hit = entry is not None and (self.ttl is None or time.time() - entry[1] <= self.ttl)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[0] if hit else None
+
+    def update(self, workspace_ids):
+        """
+        :param workspace_ids: Mapping of cache key to workspace ID
+        """
+        now = time.time()
+        entries = {key: [workspace_id, now] for key, workspace_id in workspace_ids.items()}
+
+        with self._lock:
+            self._entries = dict(self._entries, **entries)
+        if self._store is not None:
+            self._store.update(entries)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries = {k: entry for k, entry in self._entries.items() if k != key}
+        if self._store is not None:
+            self._store.update(remove=[key])
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,91 @@
+"""
+Cooperative cancellation of runs being requested or polled.
+"""
+import threading
+from concurrent.futures import CancelledError
+
+
+class CancellationToken:
+    def __init__(self, *parents):
+        """
+        Shared flag asking every operation holding it to stop
+
+        Pass the same token to several request_run calls to cancel them together, e.g. the sibling runs of a batch
+        once one of them fails. Cancelling wakes up sleeps between polls straight away, and the run being polled is
+        cancelled or discarded in Terraform Enterprise so it does not keep the workspace locked.
+
+        :param parents: CancellationTokens, any of which cancels this one too when it is cancelled
+        """
+        self.reason = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+        self._parents = []
+        for parent in parents:
+            if parent is not None:
+                self._parents.append((parent, parent.add_callback(self._parent_callback(parent))))
+
+    def _parent_callback(self, parent):
+        return lambda: self.cancel(parent.reason)
+
+    def detach(self):
+        """Stop following the parent tokens, so a short lived token is not kept alive by a long lived parent"""
+        for parent, callback in self._parents:
+            parent.remove_callback(callback)
+        self._parents = []
+
+    def cancel(self, reason=None):
+        """
+        :param reason: Optional message, e.g. which run failed
+        :return: False if the token was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            callback()
+        return True
+
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """Raise concurrent.futures.CancelledError if the token has been cancelled"""
+        if self._event.is_set():
+            raise CancelledError(self.reason or "Cancelled")
+
+    def wait(self, timeout=None):
+        """
+        Sleep until the token is cancelled, or for timeout seconds
+
+        :return: True if the token has been cancelled
+        """
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback):
+        """
+        Call callback() once the token is cancelled, straight away if it already is
+
+        :return: callback, to pass to remove_callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return callback
+        callback()
+        return callback
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def __repr__(self):
+        if self.cancelled():
+            return "CancellationToken(cancelled: %s)" % (self.reason or "no reason")
+        return "CancellationToken(active)"
@@ -0,0 +1,245 @@
+"""
+Record API traffic to a cassette file and replay it offline, at the transport level of TE2Client.
+
+A cassette is a JSON lines file, gzip compressed when its name ends in ".gz". Each line holds one request (method,
+URL, query parameters and a digest of the body), its response and how long the response took. Request headers,
+including the API token, are never written.
+"""
+import base64
+import collections
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from te2_sdk.transport import RequestsTransport
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def read_cassette(path):
+    """
+    :return: List of the recorded interactions, in the order they were recorded
+    """
+    with _open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _body_bytes(data):
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+class _DigestingIterator:
+    """Passes a streamed request body through while hashing it"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.digest = hashlib.sha256()
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.digest.update(_body_bytes(chunk))
+            yield chunk
+
+
+def _body_digest(data):
+    """
+    :return: (digest, data to send). Iterators are consumed while the request is sent, so their digest is a
+             _DigestingIterator to read afterwards.
+    """
+    if data is None:
+        return None, None
+    if isinstance(data, (str, bytes)):
+        return hashlib.sha256(_body_bytes(data)).hexdigest(), data
+    digesting = _DigestingIterator(data)
+    return digesting, digesting
+
+
+def _params_key(params):
+    return sorted((str(key), str(value)) for key, value in (params or {}).items())
+
+
+def interaction_key(method, url, params=None, body_digest=None):
+    return json.dumps([method.upper(), url, _params_key(params), body_digest])
+
+
+def _response_content(response):
+    content = getattr(response, "content", None)
+    if isinstance(content, bytes):
+        return content
+    # Responses without a body of bytes, such as test doubles, still provide json()
+    return json.dumps(response.json()).encode("utf-8")
+
+
+class CassetteResponse:
+    """Replayed response, providing the parts of requests.Response the SDK uses"""
+
+    def __init__(self, status_code, content, headers=None, url=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        chunk_size = chunk_size or len(self.content) or 1
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False, delimiter=None):
+        lines = self.content.split(delimiter) if delimiter else self.content.splitlines()
+        for line in lines:
+            yield line.decode("utf-8", "replace") if decode_unicode else line
+
+    def close(self):
+        pass
+
+
+class RecordingTransport:
+    def __init__(self, path, transport=None):
+        """
+        Sends requests through another transport and appends each one, with its response and latency, to a cassette
+
+        :param path: Cassette file, appended to
+        :param transport: Transport doing the requests, defaults to an unpooled RequestsTransport
+        """
+        self.path = path
+        self.transport = transport if transport is not None else RequestsTransport()
+        self._lock = threading.Lock()
+        self._started = None
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        digest, data = _body_digest(data)
+
+        started = time.monotonic()
+        response = self.transport.request(
+            method, url, headers=headers, params=params, data=data, stream=stream, timeout=timeout
+        )
+        content = _response_content(response)
+        latency = time.monotonic() - started
+
+        if isinstance(digest, _DigestingIterator):
+            digest = digest.digest.hexdigest()
+
+        interaction = {
+            "method": method.upper(),
+            "url": url,
+            "params": _params_key(params),
+            "body": digest,
+            "status": response.status_code,
+            "content-type": (getattr(response, "headers", None) or {}).get("Content-Type"),
+            "latency": round(latency, 6),
+        }
+        try:
+            interaction["response"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["response_base64"] = base64.b64encode(content).decode("ascii")
+
+        with self._lock:
+            if self._started is None:
+                self._started = started
+            interaction["offset"] = round(started - self._started, 6)
+
+            with _open(self.path, "a") as f:
+                f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    def __getstate__(self):
+        return {"path": self.path, "transport": self.transport}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+class ReplayTransport:
+    def __init__(self, path, time_scale=1.0, repeat_last=True):
+        """
+        Answers requests from a cassette, without network access
+
+        Requests are matched on method, URL, query parameters and body. A request made several times, such as a run
+        being polled, gets the recorded responses in order.
+
+        :param path: Cassette written by RecordingTransport
+        :param time_scale: Multiplier of the recorded latencies, 1.0 to replay in real time, 0.1 ten times faster,
+                           0 without waiting
+        :param repeat_last: Answer a request made more often than recorded with its last response, instead of
+                            raising KeyError
+        """
+        self.path = path
+        self.time_scale = time_scale
+        self.repeat_last = repeat_last
+        self._lock = threading.Lock()
+        self._interactions = collections.defaultdict(collections.deque)
+        self._last = {}
+        self.replayed = 0
+
+        for interaction in read_cassette(path):
+            key = interaction_key(
+                interaction["method"], interaction["url"], dict(interaction["params"]), interaction["body"]
+            )
+            self._interactions[key].append(interaction)
+
+    def remaining(self):
+        """
+        :return: Number of recorded interactions not replayed yet
+        """
+        with self._lock:
+            return sum(len(queue) for queue in self._interactions.values())
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        digest, data = _body_digest(data)
+        if isinstance(digest, _DigestingIterator):
+            for _ in digest:
+                pass
+            digest = digest.digest.hexdigest()
+
+        key = interaction_key(method, url, params, digest)
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self._last[key] = interaction
+            elif self.repeat_last and key in self._last:
+                interaction = self._last[key]
+            else:
+                raise KeyError("No recorded response for " + method.upper() + " " + url)
+            self.replayed += 1
+
+        if self.time_scale:
+            time.sleep(interaction["latency"] * self.time_scale)
+
+        if "response_base64" in interaction:
+            content = base64.b64decode(interaction["response_base64"])
+        else:
+            content = interaction["response"].encode("utf-8")
+
+        headers = {"Content-Type": interaction["content-type"]} if interaction.get("content-type") else {}
+        return CassetteResponse(interaction["status"], content, headers=headers, url=url)
+
+    def close(self):
+        pass
+
+    def __getstate__(self):
+        return {"path": self.path, "time_scale": self.time_scale, "repeat_last": self.repeat_last}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
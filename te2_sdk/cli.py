@@ -0,0 +1,252 @@
+"""
+te2 command line interface, for pipeline shell steps.
+
+Only the standard library is imported up front. The API client, and with it requests, is imported by the commands
+that call the API, so --help and lookups served from the workspace cache start quickly.
+"""
+import argparse
+import json
+import os
+import sys
+
+from te2_sdk import __version__
+
+DEFAULT_BASE_URL = "https://atlas.hashicorp.com/api/v2"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CHANGES = 2
+
+
+def _default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "te2", "workspaces.json")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="te2", description="Trigger Terraform Enterprise runs and set variables.")
+    parser.add_argument("--version", action="version", version="%(prog)s " + __version__)
+    parser.add_argument("--organisation", default=os.environ.get("TE2_ORGANISATION"),
+                        help="Organisation name (env: TE2_ORGANISATION)")
+    parser.add_argument("--token", default=os.environ.get("TE2_TOKEN") or os.environ.get("ATLAS_TOKEN"),
+                        help="API token, or comma separated tokens to spread requests over (env: TE2_TOKEN or "
+                             "ATLAS_TOKEN)")
+    parser.add_argument("--base-url", default=os.environ.get("TE2_BASE_URL", DEFAULT_BASE_URL),
+                        help="API URL, for private installs (env: TE2_BASE_URL)")
+    parser.add_argument("--cache", default=os.environ.get("TE2_CACHE", _default_cache_path()),
+                        help="Workspace ID cache file (env: TE2_CACHE)")
+    parser.add_argument("--no-cache", action="store_true", help="Always look workspace IDs up")
+    parser.add_argument("--deadline", type=float, default=os.environ.get("TE2_DEADLINE"),
+                        help="Seconds the whole command may take, including waiting for runs (env: TE2_DEADLINE)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not report run progress on stderr")
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    plan = commands.add_parser("plan", help="Plan a workspace and wait for the result")
+    plan.add_argument("workspace")
+    plan.add_argument("--destroy", action="store_true")
+    plan.add_argument("--configuration-directory", help="Upload and plan this Terraform directory")
+    plan.add_argument("--detailed-exitcode", action="store_true",
+                      help="Exit with 2 when the plan has changes, like terraform plan -detailed-exitcode")
+    plan.add_argument("--reuse-plan", type=float, metavar="SECONDS",
+                      help="Return the last plan of the same configuration and variables if it is this recent")
+    plan.set_defaults(handler=command_run, request_type="plan")
+
+    apply = commands.add_parser("apply", help="Create a run and wait for it to apply")
+    apply.add_argument("workspace")
+    apply.add_argument("--destroy", action="store_true")
+    apply.add_argument("--configuration-directory", help="Upload and apply this Terraform directory")
+    apply.set_defaults(handler=command_run, request_type="apply", detailed_exitcode=False, reuse_plan=None)
+
+    discard = commands.add_parser("discard", help="Discard the pending runs of a workspace")
+    discard.add_argument("workspace")
+    discard.set_defaults(handler=command_discard)
+
+    status = commands.add_parser("status", help="Print the status of a run")
+    status.add_argument("run_id")
+    status.set_defaults(handler=command_status)
+
+    workspace_id = commands.add_parser("workspace-id", help="Print the ID of a workspace")
+    workspace_id.add_argument("workspace")
+    workspace_id.set_defaults(handler=command_workspace_id)
+
+    variables = commands.add_parser("vars", help="Workspace variables")
+    variable_commands = variables.add_subparsers(dest="vars_command", metavar="vars_command")
+    variable_commands.required = True
+
+    sync = variable_commands.add_parser("sync", help="Create or update variables, skipping unchanged ones")
+    sync.add_argument("workspace", nargs="+")
+    sync.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", dest="assignments")
+    sync.add_argument("--file", help='JSON object of key to value, or to {"value": ..., "category": ...}')
+    sync.add_argument("--category", choices=["terraform", "env"], default="terraform")
+    sync.add_argument("--sensitive", action="store_true")
+    sync.add_argument("--hcl", action="store_true")
+    sync.add_argument("--fingerprints", default=os.environ.get("TE2_FINGERPRINTS"),
+                      help="Fingerprint store file, so unchanged sensitive values are skipped (env: TE2_FINGERPRINTS)")
+    sync.set_defaults(handler=command_vars_sync)
+
+    return parser
+
+
+def _workspace_cache(args):
+    if args.no_cache:
+        return None
+
+    from te2_sdk.cache import WorkspaceCache
+    return WorkspaceCache(args.cache)
+
+
+def _client(args):
+    if not args.organisation or not args.token:
+        raise SystemExit("te2: --organisation and --token (or TE2_ORGANISATION and TE2_TOKEN) are required")
+
+    from te2_sdk.te2 import TE2Client
+    client = TE2Client(
+        organisation=args.organisation,
+        atlas_token=args.token.split(",") if "," in args.token else args.token,
+        base_url=args.base_url,
+        workspace_cache=_workspace_cache(args)
+    )
+
+    if not args.quiet:
+        import logging
+        from te2_sdk.events import LoggingSink
+        logging.basicConfig(stream=sys.stderr, level=logging.INFO, format="%(message)s")
+        client.events.add_sink(LoggingSink())
+
+    return client
+
+
+def _print(document):
+    print(json.dumps(document, indent=2, sort_keys=True))
+
+
+def _duration_stats(args):
+    if args.no_cache:
+        return None
+
+    from te2_sdk.durations import RunDurationStats
+    return RunDurationStats(os.path.join(os.path.dirname(args.cache), "durations.json"))
+
+
+def _plan_cache(args):
+    if args.no_cache or not args.reuse_plan:
+        return None
+
+    from te2_sdk.plan_cache import PlanCache
+    return PlanCache(os.path.join(os.path.dirname(args.cache), "plans.json"), max_age=args.reuse_plan)
+
+
+def command_run(args):
+    from te2_sdk.te2 import TE2WorkspaceRuns
+
+    client = _client(args)
+    try:
+        runs = TE2WorkspaceRuns(
+            client=client, workspace_name=args.workspace, sparse_polling=True, duration_stats=_duration_stats(args),
+            plan_cache=_plan_cache(args)
+        )
+        results = runs.request_run(
+            request_type=args.request_type,
+            destroy=args.destroy,
+            configuration_directory=args.configuration_directory,
+            deadline=args.deadline
+        )
+    finally:
+        client.events.flush()
+
+    _print(results)
+
+    if not results or results['attributes']['status'] in ("errored", "canceled", "force_canceled", "discarded"):
+        return EXIT_FAILED
+    if args.detailed_exitcode and results['attributes'].get('has-changes'):
+        return EXIT_CHANGES
+    return EXIT_OK
+
+
+def command_discard(args):
+    from te2_sdk.te2 import TE2WorkspaceRuns
+
+    client = _client(args)
+    try:
+        TE2WorkspaceRuns(client=client, workspace_name=args.workspace).discard_all_pending_runs(
+            deadline=args.deadline
+        )
+    finally:
+        client.events.flush()
+    return EXIT_OK
+
+
+def command_status(args):
+    from te2_sdk.te2 import jsonapi_params
+
+    client = _client(args)
+    response = client.get(path="/runs/" + args.run_id, params=jsonapi_params(fields={"runs": ["status"]}))
+
+    if not str(response.status_code).startswith("2"):
+        print("te2: run " + args.run_id + " does not exist", file=sys.stderr)
+        return EXIT_FAILED
+
+    print(client.decode_status(response))
+    return EXIT_OK
+
+
+def command_workspace_id(args):
+    cache = _workspace_cache(args)
+    if cache is not None and args.organisation:
+        from te2_sdk.cache import workspace_cache_key
+        workspace_id = cache.get(workspace_cache_key(args.base_url, args.organisation, args.workspace))
+        if workspace_id is not None:
+            print(workspace_id)
+            return EXIT_OK
+
+    try:
+        print(_client(args).get_workspace_id(args.workspace))
+    except KeyError:
+        print("te2: workspace " + args.workspace + " does not exist", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def _variables_from_args(args):
+    variables = {}
+
+    if args.file:
+        with open(args.file) as f:
+            variables.update(json.load(f))
+
+    for assignment in args.assignments:
+        key, separator, value = assignment.partition("=")
+        if not separator:
+            raise SystemExit("te2: --set expects KEY=VALUE, got " + assignment)
+        variables[key] = {"value": value, "category": args.category, "sensitive": args.sensitive, "hcl": args.hcl}
+
+    return variables
+
+
+def command_vars_sync(args):
+    from te2_sdk.bulk_variables import TE2MultiWorkspaceVariables
+
+    variables = _variables_from_args(args)
+    fingerprint_store = None
+    if args.fingerprints:
+        from te2_sdk.fingerprints import FingerprintStore
+        fingerprint_store = FingerprintStore(args.fingerprints)
+
+    report = TE2MultiWorkspaceVariables(
+        _client(args), workspace_names=args.workspace, fingerprint_store=fingerprint_store
+    ).push(variables, deadline=args.deadline)
+    _print(report)
+
+    failed = any(workspace["error"] or workspace["errors"] for workspace in report.values())
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
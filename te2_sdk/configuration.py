@@ -0,0 +1,281 @@
+"""
+Upload Terraform configuration directories as workspace configuration versions.
+
+Directories are hashed and archived file by file, so neither the archive nor the configuration is ever held in
+memory. A configuration whose hash has already been uploaded to the workspace is not uploaded again.
+"""
+import hashlib
+import os
+import queue
+import stat
+import tarfile
+import threading
+import time
+
+from te2_sdk.file_store import JSONFileStore
+
+DEFAULT_EXCLUDES = (".git", ".terraform")
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_configuration_files(directory, exclude=DEFAULT_EXCLUDES):
+    """
+    Files and symlinks under directory, in a stable order
+
+    :param exclude: Directory or file names skipped wherever they appear
+    :return: Generator of (absolute path, archive name) tuples
+    """
+    directory = os.path.abspath(directory)
+    for root, dirs, files in os.walk(directory):
+        # Symlinked directories are archived as links, like files
+        links = [name for name in dirs if os.path.islink(os.path.join(root, name))]
+        dirs[:] = sorted(name for name in dirs if name not in exclude and name not in links)
+        for name in sorted(files + links):
+            if name in exclude:
+                continue
+            path = os.path.join(root, name)
+            yield path, os.path.relpath(path, directory).replace(os.sep, "/")
+
+
+def content_hash(directory, exclude=DEFAULT_EXCLUDES):
+    """
+    SHA-256 over every file's archive name, executable bit and content (or symlink target)
+
+    :return: Hex digest, identical for identical configurations wherever they are checked out
+    """
+    digest = hashlib.sha256()
+    for path, name in iter_configuration_files(directory, exclude):
+        info = os.lstat(path)
+        digest.update(name.encode() + b"\0")
+
+        if stat.S_ISLNK(info.st_mode):
+            digest.update(b"link\0" + os.readlink(path).encode() + b"\0")
+            continue
+
+        digest.update(b"exec\0" if info.st_mode & stat.S_IXUSR else b"file\0")
+        digest.update(str(info.st_size).encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class _ChunkWriter:
+    """File object handing what tarfile writes to a bounded queue, in CHUNK_SIZE pieces."""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise OSError("Configuration archive is no longer being read")
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def archive_chunks(directory, exclude=DEFAULT_EXCLUDES, max_buffered_chunks=16):
+    """
+    Stream a .tar.gz of directory
+
+    The archive is written by a background thread, at most max_buffered_chunks chunks ahead of the reader.
+
+    :return: Generator of bytes
+    """
+    chunks = queue.Queue(max_buffered_chunks)
+    cancelled = threading.Event()
+    writer = _ChunkWriter(chunks, cancelled)
+
+    def produce():
+        try:
+            with tarfile.open(fileobj=writer, mode="w|gz") as tar:
+                for path, name in iter_configuration_files(directory, exclude):
+                    tar.add(path, arcname=name, recursive=False)
+            writer.flush()
+            writer.put(None)
+        except Exception as e:
+            try:
+                writer.put(e)
+            except OSError:
+                pass  # Nobody is reading any more
+
+    producer = threading.Thread(target=produce, name="te2-archive", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+        producer.join()
+
+
+class ConfigurationIndex:
+    def __init__(self, path=None):
+        """
+        Remembers which configuration version holds each uploaded content hash.
+
+        Safe to share between threads, the versions are copied on write so lookups never wait for a lock.
+
+        :param path: Optional JSON file, so later pipeline runs reuse the uploads of earlier ones
+        """
+        self._store = JSONFileStore(path) if path else None
+        self._lock = threading.Lock()
+        self._versions = {}  # Replaced rather than changed once published
+
+    @staticmethod
+    def _key(workspace_id, digest):
+        return workspace_id + "/" + digest
+
+    def get(self, workspace_id, digest):
+        key = self._key(workspace_id, digest)
+        if key not in self._versions and self._store is not None:
+            stored = self._store.load()
+            with self._lock:
+                self._versions = dict(self._versions, **stored)
+        return self._versions.get(key)
+
+    def record(self, workspace_id, digest, configuration_version_id):
+        key = self._key(workspace_id, digest)
+        with self._lock:
+            self._versions = dict(self._versions, **{key: configuration_version_id})
+        if self._store is not None:
+            self._store.update({key: configuration_version_id})
+
+    def forget(self, workspace_id, digest):
+        key = self._key(workspace_id, digest)
+        with self._lock:
+            self._versions = {k: version for k, version in self._versions.items() if k != key}
+        if self._store is not None:
+            self._store.update(remove=[key])
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class TE2ConfigurationVersions:
+    def __init__(self, client, workspace_name, workspace_id=None, index=None):
+        """
+        :param client: TE2Client
+        :param workspace_name: Workspace the configuration versions belong to
+        :param workspace_id: Workspace ID, looked up from the name when not given
+        :param index: ConfigurationIndex used to skip uploads, an in memory one by default
+        """
+        self.client = client
+        self.workspace_name = workspace_name
+        self.workspace_id = workspace_id if workspace_id is not None else client.get_workspace_id(workspace_name)
+        self.index = index if index is not None else ConfigurationIndex()
+
+    def create_configuration_version(self, auto_queue_runs=False, deadline=None):
+        request = self.client.post(
+            path="/workspaces/" + self.workspace_id + "/configuration-versions",
+            data=self.client.serializer.dumps({
+                "data": {
+                    "type": "configuration-versions",
+                    "attributes": {"auto-queue-runs": auto_queue_runs}
+                }
+            }),
+            deadline=deadline
+        )
+
+        if str(request.status_code).startswith("2"):
+            return self.client.decode(request)['data']
+        raise SyntaxError("Configuration version cannot be created")
+
+    def get_configuration_version(self, configuration_version_id, deadline=None):
+        request = self.client.get(path="/configuration-versions/" + configuration_version_id, deadline=deadline)
+
+        if str(request.status_code).startswith("2"):
+            return self.client.decode(request)['data']
+        raise KeyError("Configuration version does not exist")
+
+    def find_uploaded(self, digest, deadline=None):
+        """
+        :return: ID of an uploaded configuration version with this content hash, or None
+        """
+        configuration_version_id = self.index.get(self.workspace_id, digest)
+        if configuration_version_id is None:
+            return None
+
+        try:
+            status = self.get_configuration_version(configuration_version_id, deadline)['attributes']['status']
+        except KeyError:
+            status = None
+
+        if status != "uploaded":
+            self.index.forget(self.workspace_id, digest)
+            return None
+        return configuration_version_id
+
+    def upload(self, directory, exclude=DEFAULT_EXCLUDES, timeout_count=60, deadline=None, digest=None):
+        """
+        Upload directory as a new configuration version, unless an identical one is already uploaded
+
+        :param directory: Terraform configuration directory
+        :param exclude: Directory or file names left out of the archive and the hash
+        :param timeout_count: Seconds to wait for Terraform Enterprise to process the upload
+        :param deadline: Optional Deadline for every request and wait
+        :param digest: content_hash of directory with exclude, when the caller has already computed it
+        :return: Dict with the configuration version "id", the "content-hash", and whether it was "uploaded" now
+        """
+        if digest is None:
+            digest = content_hash(directory, exclude)
+
+        existing = self.find_uploaded(digest, deadline)
+        if existing is not None:
+            return {"id": existing, "content-hash": digest, "uploaded": False}
+
+        configuration_version = self.create_configuration_version(deadline=deadline)
+        request = self.client.transport.request(
+            "PUT",
+            configuration_version['attributes']['upload-url'],
+            headers={"Content-Type": "application/octet-stream"},
+            data=archive_chunks(directory, exclude),
+            timeout=self.client.request_timeout(deadline)
+        )
+        if not str(request.status_code).startswith("2"):
+            raise SyntaxError("Configuration upload was rejected")
+
+        self._wait_for_upload(configuration_version['id'], timeout_count, deadline)
+        self.index.record(self.workspace_id, digest, configuration_version['id'])
+
+        return {"id": configuration_version['id'], "content-hash": digest, "uploaded": True}
+
+    def _wait_for_upload(self, configuration_version_id, timeout_count, deadline=None):
+        for x in range(0, timeout_count):
+            status = self.get_configuration_version(configuration_version_id, deadline)['attributes']['status']
+            if status == "uploaded":
+                return
+            if status == "errored":
+                raise SyntaxError("Configuration version " + configuration_version_id + " failed to process")
+            time.sleep(deadline.cap(1) if deadline is not None else 1)
+
+        raise TimeoutError("Configuration upload took too long to process")
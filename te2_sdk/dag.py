@@ -0,0 +1,185 @@
+"""
+Apply workspaces in dependency order, e.g. network, then cluster, then apps.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from te2_sdk.cancellation import CancellationToken
+from te2_sdk.run_states import SUCCESSFUL_STATES
+from te2_sdk.te2 import TE2WorkspaceRuns
+
+SKIPPED = "skipped"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def _node_report(wave):
+    return {"status": None, "run": None, "wave": wave, "started": None, "finished": None, "elapsed": None,
+            "error": None}
+
+
+class TE2WorkspaceGraph:
+    def __init__(self, client, dependencies, max_workers=4, runs_factory=TE2WorkspaceRuns):
+        """
+        Runs workspaces once the workspaces they depend on have run successfully
+
+        :param client: TE2Client
+        :param dependencies: Dict of workspace name to the names of the workspaces it depends on. Workspaces that
+                             only appear as dependencies are run too.
+        :param max_workers: Maximum number of runs in progress at once
+        :param runs_factory: Callable of (client, workspace_name) returning a TE2WorkspaceRuns
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.runs_factory = runs_factory
+
+        self.parents = {}
+        for name, parents in dependencies.items():
+            self.parents.setdefault(name, set()).update(parents)
+            for parent in parents:
+                self.parents.setdefault(parent, set())
+
+        self.children = {name: set() for name in self.parents}
+        for name, parents in self.parents.items():
+            for parent in parents:
+                self.children[parent].add(name)
+
+        self._waves = self._levels()
+
+    def _levels(self):
+        """Group workspaces into waves whose members only depend on earlier waves, raising on a cycle"""
+        remaining = {name: set(parents) for name, parents in self.parents.items()}
+        waves = []
+
+        while remaining:
+            wave = sorted(name for name, parents in remaining.items() if not parents)
+            if not wave:
+                raise ValueError("Workspace dependencies contain a cycle: " + ", ".join(sorted(remaining)))
+            for name in wave:
+                del remaining[name]
+            for parents in remaining.values():
+                parents.difference_update(wave)
+            waves.append(wave)
+
+        return waves
+
+    def waves(self):
+        """
+        :return: List of lists of workspace names. Each wave depends only on earlier waves.
+        """
+        return [list(wave) for wave in self._waves]
+
+    def _run_workspace(self, name, request_type, kwargs):
+        started = time.monotonic()
+        try:
+            run = self.runs_factory(self.client, name).request_run(request_type=request_type, **kwargs)
+            error = None
+        except Exception as e:
+            run, error = None, e
+        return run, error, started, time.monotonic()
+
+    def run(self, request_type="apply", fail_fast=False, cancellation=None, **kwargs):
+        """
+        Run every workspace, each as soon as all of its dependencies succeeded
+
+        Workspaces without a path between them run in parallel. When a run fails, its dependents, and theirs, are
+        skipped; unrelated workspaces carry on, unless fail_fast is set.
+
+        :param request_type: "plan" or "apply"
+        :param fail_fast: When a run fails, cancel the runs in progress and skip every workspace not started yet
+        :param cancellation: Optional CancellationToken, stopping the whole graph in the same way when cancelled
+        :param kwargs: Further arguments of TE2WorkspaceRuns.request_run, for every workspace
+        :return: Dict of "workspaces" (name to status, run, wave, started, finished, elapsed and error, times in
+                 seconds from the start), "succeeded", "elapsed", "critical_path" (the chain of dependencies that
+                 finished last) and "critical_path_seconds"
+        """
+        successful_states = SUCCESSFUL_STATES[request_type]
+        waves = {name: index for index, wave in enumerate(self._waves) for name in wave}
+        report = {name: _node_report(waves[name]) for name in self.parents}
+        waiting = {name: set(parents) for name, parents in self.parents.items()}
+
+        graph_started = time.monotonic()
+        token = CancellationToken(cancellation)
+        kwargs["cancellation"] = token
+
+        def skip_descendants(name):
+            for child in self.children[name]:
+                if report[child]["status"] is None:
+                    report[child]["status"] = SKIPPED
+                    report[child]["error"] = "dependency " + name + " did not succeed"
+                    skip_descendants(child)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+
+            def start_ready():
+                if token.cancelled():
+                    for name in waiting:
+                        report[name]["status"] = report[name]["status"] or SKIPPED
+                        report[name]["error"] = report[name]["error"] or "cancelled: " + str(token.reason)
+                    waiting.clear()
+                    return
+
+                for name in sorted(waiting):
+                    if not waiting[name] and report[name]["status"] is None:
+                        del waiting[name]
+                        in_flight[executor.submit(self._run_workspace, name, request_type, kwargs)] = name
+                for name in [name for name in waiting if report[name]["status"] == SKIPPED]:
+                    del waiting[name]
+
+            start_ready()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = in_flight.pop(future)
+                    run, error, started, finished = future.result()
+                    node = report[name]
+
+                    node["run"] = run or None
+                    node["started"] = started - graph_started
+                    node["finished"] = finished - graph_started
+                    node["elapsed"] = finished - started
+
+                    status = run['attributes']['status'] if run else None
+                    if error is None and status in successful_states:
+                        node["status"] = status
+                        for child in self.children[name]:
+                            if child in waiting:
+                                waiting[child].discard(name)
+                    elif not run and error is None and token.cancelled():
+                        node["status"] = CANCELLED
+                        node["error"] = "cancelled: " + str(token.reason)
+                    else:
+                        node["status"] = status or FAILED
+                        node["error"] = str(error) if error is not None else "run finished " + str(status)
+                        skip_descendants(name)
+                        if fail_fast:
+                            token.cancel("workspace " + name + " did not succeed")
+                start_ready()
+
+        token.detach()
+        critical_path = self._critical_path(report)
+        return {
+            "workspaces": report,
+            "succeeded": all(node["error"] is None for node in report.values()),
+            "elapsed": time.monotonic() - graph_started,
+            "critical_path": critical_path,
+            "critical_path_seconds": sum(report[name]["elapsed"] for name in critical_path),
+        }
+
+    def _critical_path(self, report):
+        """
+        Follow the workspace that finished last back through the dependency each one waited for longest
+        """
+        finished = [name for name, node in report.items() if node["finished"] is not None]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda name: report[name]["finished"])]
+        while True:
+            parents = [parent for parent in self.parents[path[-1]] if report[parent]["finished"] is not None]
+            if not parents:
+                break
+            path.append(max(parents, key=lambda name: report[name]["finished"]))
+
+        return list(reversed(path))
@@ -0,0 +1,68 @@
+"""
+Time budgets shared by every call an operation makes.
+"""
+import time
+
+
+class Deadline:
+    def __init__(self, seconds):
+        """
+        A point in time an operation must finish by
+
+        Pass the same Deadline to every nested call. Each HTTP request and sleep is then capped by what is left of
+        the budget, and raises TimeoutError once it has run out.
+
+        :param seconds: Budget from now, in seconds
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def resolve(cls, deadline):
+        """
+        :param deadline: None, a Deadline, or a budget in seconds
+        :return: Deadline, or None when there is no deadline
+        """
+        if deadline is None or isinstance(deadline, cls):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Raise TimeoutError if the deadline has passed"""
+        if self.expired():
+            raise TimeoutError("Deadline of " + str(self.seconds) + " seconds exceeded")
+
+    def cap(self, seconds=None):
+        """
+        :param seconds: Wanted timeout or sleep, None for as long as the deadline allows
+        :return: seconds, reduced to what is left of the budget. Raises TimeoutError if nothing is left.
+        """
+        self.check()
+        remaining = self.remaining()
+        return remaining if seconds is None else min(seconds, remaining)
+
+    def __repr__(self):
+        return "Deadline(%.3f remaining of %s)" % (self.remaining(), self.seconds)
+
+
+def cap_timeout(timeout, deadline):
+    """
+    Cap a requests style timeout by a deadline
+
+    :param timeout: Seconds, a (connect, read) tuple, or None
+    :param deadline: Deadline or None
+    :return: Timeout no longer than the time left before the deadline
+    """
+    if deadline is None:
+        return timeout
+    if timeout is None:
+        return deadline.cap()
+    if isinstance(timeout, tuple):
+        return tuple(deadline.cap(part) for part in timeout)
+    return deadline.cap(timeout)
@@ -0,0 +1,150 @@
+"""
+How long plans and applies take in each workspace, learned from run timestamps.
+"""
+import datetime
+import re
+import threading
+
+from te2_sdk.file_store import JSONFileStore
+
+# status-timestamps keys marking the end of a plan request, the latest one present is used
+PLAN_FINISHED_TIMESTAMPS = (
+    "planned-at",
+    "planned-and-finished-at",
+    "cost-estimated-at",
+    "policy-checked-at",
+    "post-plan-completed-at",
+)
+APPLY_FINISHED_TIMESTAMPS = ("applied-at",)
+FINISHED_TIMESTAMPS = {"plan": PLAN_FINISHED_TIMESTAMPS, "apply": APPLY_FINISHED_TIMESTAMPS}
+
+# status-timestamps keys marking the start of an apply, the earliest one present is used. An apply is measured from
+# the run's confirmation, so the time someone took to confirm it is left out.
+APPLY_STARTED_TIMESTAMPS = ("confirmed-at", "apply-queued-at")
+
+# Date and time, optional fraction, then Z or a UTC offset. strptime's %z only takes "+0000" before Python 3.7
+_TIMESTAMP = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})$")
+
+
+def parse_timestamp(value):
+    """
+    :param value: ISO 8601 timestamp as returned by Terraform Enterprise, e.g. "2017-10-11T11:38:13.576Z"
+    :return: Aware datetime, or None if value is empty or not a timestamp
+    """
+    match = _TIMESTAMP.match(value or "")
+    if match is None:
+        return None
+    seconds, fraction, offset = match.groups()
+    offset = "+0000" if offset == "Z" else offset.replace(":", "")
+    try:
+        return datetime.datetime.strptime(seconds + "." + (fraction or "0")[:6].ljust(6, "0") + offset,
+                                          "%Y-%m-%dT%H:%M:%S.%f%z")
+    except ValueError:
+        return None
+
+
+def run_duration(run, request_type):
+    """
+    Seconds from a run's creation to the end of its plan, or from its confirmation to the end of its apply
+
+    :param run: Run document
+    :param request_type: "plan" or "apply"
+    :return: Seconds, or None when the run has not reached the end of request_type
+    """
+    attributes = run.get('attributes', {})
+    timestamps = attributes.get('status-timestamps') or {}
+    if request_type == "apply":
+        started = [parse_timestamp(timestamps.get(key)) for key in APPLY_STARTED_TIMESTAMPS]
+        started = [timestamp for timestamp in started if timestamp is not None]
+        started = min(started) if started else None
+    else:
+        started = parse_timestamp(attributes.get('created-at'))
+    finished = [parse_timestamp(timestamps.get(key)) for key in FINISHED_TIMESTAMPS[request_type]]
+    finished = [timestamp for timestamp in finished if timestamp is not None]
+
+    if started is None or not finished:
+        return None
+    return max((max(finished) - started).total_seconds(), 0.0)
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[min(int(len(values) * percentile / 100.0), len(values) - 1)]
+
+
+class RunDurationStats:
+    def __init__(self, path=None, window=20, min_samples=3):
+        """
+        Recent plan and apply durations per workspace
+
+        :param path: Optional JSON file to keep durations across pipeline runs, in memory only otherwise
+        :param window: Number of recent durations kept per workspace and request type
+        :param min_samples: Durations needed before expected() returns an estimate
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._store = JSONFileStore(path) if path else None
+        self._lock = threading.Lock()
+        self._durations = self._store.load() if self._store is not None else {}
+
+    @staticmethod
+    def _key(workspace_id, request_type):
+        return workspace_id + "/" + request_type
+
+    def record(self, workspace_id, request_type, seconds):
+        key = self._key(workspace_id, request_type)
+        with self._lock:
+            durations = (self._durations.get(key, []) + [round(seconds, 3)])[-self.window:]
+            self._durations[key] = durations
+        if self._store is not None:
+            self._store.update({key: durations})
+
+    def record_run(self, workspace_id, request_type, run):
+        """
+        Record the duration of a finished run from its timestamps
+
+        :return: The duration recorded, or None if the run has no timestamps for request_type
+        """
+        seconds = run_duration(run, request_type)
+        if seconds is not None:
+            self.record(workspace_id, request_type, seconds)
+        return seconds
+
+    def learn(self, workspace_id, runs):
+        """
+        Replace the durations of a workspace with those of past runs
+
+        :param runs: Run documents, newest first as listed by the API
+        """
+        learned = {"plan": [], "apply": []}
+        for run in reversed(runs):
+            for request_type in learned:
+                seconds = run_duration(run, request_type)
+                if seconds is not None:
+                    learned[request_type].append(round(seconds, 3))
+
+        values = {}
+        with self._lock:
+            for request_type, durations in learned.items():
+                if durations:
+                    values[self._key(workspace_id, request_type)] = durations[-self.window:]
+            self._durations.update(values)
+        if self._store is not None and values:
+            self._store.update(values)
+
+    def durations(self, workspace_id, request_type):
+        with self._lock:
+            return list(self._durations.get(self._key(workspace_id, request_type), []))
+
+    def expected(self, workspace_id, request_type):
+        """
+        :return: Tuple of (median, spread) in seconds, the spread covering most recent durations either side of
+                 the median; or None before min_samples durations have been recorded
+        """
+        durations = self.durations(workspace_id, request_type)
+        if len(durations) < self.min_samples:
+            return None
+
+        median = _percentile(durations, 50)
+        spread = max(median - _percentile(durations, 10), _percentile(durations, 90) - median)
+        return median, spread
@@ -0,0 +1,223 @@
+"""
+Structured events describing run activity, delivered to pluggable sinks from a background thread.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+RUN_CREATED = "run_created"
+RUN_POLLED = "run_polled"
+RUN_COMPLETED = "run_completed"
+RUNS_DISCARDING = "runs_discarding"
+RUN_DISCARDED = "run_discarded"
+RUN_CANCELLED = "run_cancelled"
+RUN_ABANDONED = "run_abandoned"  # Polling stopped before the run finished, e.g. at the deadline or on an error
+PLAN_SKIPPED = "plan_skipped"
+
+# Seconds a delivery thread waits for another event before it exits, it is started again by the next event
+WORKER_IDLE_TIMEOUT = 5
+
+# Emitters of this process, flushed once at exit without keeping them alive
+_emitters = weakref.WeakSet()
+
+
+def _flush_all():
+    for emitter in list(_emitters):
+        emitter.flush()
+
+
+atexit.register(_flush_all)
+
+_RunEvent = namedtuple("RunEvent", ["kind", "run_id", "workspace", "status", "elapsed", "timestamp", "details"])
+
+
+class RunEvent(_RunEvent):
+    """
+    kind: One of the event kinds defined in this module
+    run_id, workspace, status: Run the event is about, where known
+    elapsed: Seconds since the run was created, where known
+    timestamp: time.time() when the event was emitted
+    details: Dict of extra, kind specific, fields
+    """
+    __slots__ = ()
+
+    def as_dict(self):
+        event = self._asdict()
+        event.update(event.pop("details"))
+        return event
+
+
+class EventEmitter:
+    def __init__(self, sinks=None, max_buffered=10000):
+        """
+        Buffers events and delivers them to every sink on a background thread.
+
+        Emitting costs a single check while no sink is attached. The thread only starts with the first event and
+        exits after WORKER_IDLE_TIMEOUT seconds without one, and one exit handler flushes every emitter, so
+        short-lived emitters leave nothing behind. Sinks belong to the process that attached them: a pickled
+        emitter arrives without sinks.
+
+        :param sinks: Callables taking a RunEvent, e.g. LoggingSink, JSONLinesSink or any function
+        :param max_buffered: Events held before new ones are dropped (and counted in dropped)
+        """
+        self.sinks = list(sinks or [])
+        self.max_buffered = max_buffered
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self._delivering = False
+
+    def __bool__(self):
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        # Copied on write, so threads emitting or delivering meanwhile see either list whole
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink):
+        with self._lock:
+            sinks = list(self.sinks)
+            sinks.remove(sink)
+            self.sinks = sinks
+
+    def emit(self, kind, run_id=None, workspace=None, status=None, elapsed=None, **details):
+        if not self.sinks:
+            return
+
+        event = RunEvent(kind, run_id, workspace, status, elapsed, time.time(), details)
+        try:
+            self._worker_queue().put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+
+        if not self._delivering:
+            # The idle thread stopped between the check and the put, without seeing the event: start another
+            self._worker_queue()
+
+    def flush(self):
+        """Block until every buffered event has been delivered."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def _worker_queue(self):
+        """
+        Queue of this process, with a delivery thread running for it
+
+        The thread exits once idle, so emitters that are no longer used do not hold on to one.
+        """
+        if self._queue is None or self._pid != os.getpid() or not self._delivering:
+            with self._lock:
+                if self._queue is None or self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_buffered)
+                    self._pid = os.getpid()
+                    self._delivering = False
+                    _emitters.add(self)
+                if not self._delivering:
+                    self._delivering = True
+                    threading.Thread(
+                        target=_deliver, args=(weakref.ref(self), self._queue), name="te2-events", daemon=True
+                    ).start()
+        return self._queue
+
+    def _stop_delivering(self, events):
+        """Called by an idle delivery thread, False when an event arrived meanwhile and it has to carry on"""
+        with self._lock:
+            self._delivering = False
+            if events.empty():
+                return True
+            self._delivering = True
+            return False
+
+    def __getstate__(self):
+        return {"max_buffered": self.max_buffered}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def _deliver(emitter_ref, events):
+    """
+    Deliver events until the queue has been idle for WORKER_IDLE_TIMEOUT seconds, or the emitter is gone
+
+    The thread only refers to the emitter weakly, so an emitter nobody uses can be collected.
+    """
+    while True:
+        try:
+            event = events.get(timeout=WORKER_IDLE_TIMEOUT)
+        except queue.Empty:
+            emitter = emitter_ref()
+            if emitter is None or emitter._stop_delivering(events):
+                return
+            continue
+
+        emitter = emitter_ref()
+        for sink in emitter.sinks if emitter is not None else ():
+            try:
+                sink(event)
+            except Exception:
+                logging.getLogger(__name__).exception("Event sink %r failed", sink)
+        del emitter
+        events.task_done()
+
+
+class LoggingSink:
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("te2_sdk")
+        self.level = level
+
+    def __call__(self, event):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, format_event(event))
+
+
+class JSONLinesSink:
+    def __init__(self, stream):
+        """
+        :param stream: Text stream, e.g. an open file or sys.stdout
+        """
+        self.stream = stream
+
+    def __call__(self, event):
+        self.stream.write(json.dumps(event.as_dict(), separators=(",", ":"), default=str) + "\n")
+        self.stream.flush()
+
+
+class CallbackSink:
+    def __init__(self, callback, kinds=None):
+        """
+        :param callback: Called with each RunEvent
+        :param kinds: Optional collection of event kinds to pass on, all kinds by default
+        """
+        self.callback = callback
+        self.kinds = frozenset(kinds) if kinds is not None else None
+
+    def __call__(self, event):
+        if self.kinds is None or event.kind in self.kinds:
+            self.callback(event)
+
+
+def format_event(event):
+    """Human readable, single line, description of an event."""
+    parts = [event.kind]
+    if event.workspace is not None:
+        parts.append("workspace=" + str(event.workspace))
+    if event.run_id is not None:
+        parts.append("run=" + str(event.run_id))
+    if event.status is not None:
+        parts.append("status=" + str(event.status))
+    if event.elapsed is not None:
+        parts.append("elapsed=" + str(int(event.elapsed)) + "s")
+    parts.extend(key + "=" + str(value) for key, value in sorted(event.details.items()))
+    return " ".join(parts)
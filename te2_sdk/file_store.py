@@ -0,0 +1,84 @@
+"""
+Small JSON documents on disk, shared between processes.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows, where writers are only serialised within a process
+    fcntl = None
+
+# Writers in one process are serialised per path, so threads do not drop each other's keys when merging
+_PATH_LOCKS = [threading.Lock() for _ in range(16)]
+
+
+def _path_lock(path):
+    return _PATH_LOCKS[hash(path) % len(_PATH_LOCKS)]
+
+
+@contextmanager
+def _locked(path):
+    """Hold the path against writers in this and other processes, through flock on a .lock file beside it"""
+    with _path_lock(path):
+        if fcntl is None:
+            yield
+            return
+
+        with open(path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class JSONFileStore:
+    def __init__(self, path):
+        """
+        A JSON object persisted to a single file.
+
+        Writes go to a temporary file that is renamed over the original, so readers in other processes never see
+        a partial document. Writers take turns through a lock file beside the document, so each merges with what
+        the previous one wrote and no keys are lost; the last writer wins per key.
+
+        :param path: File holding the document
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def update(self, values=None, remove=()):
+        """
+        Merge values into the document on disk, and delete the keys in remove
+
+        :return: The document as written
+        """
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+
+        with _locked(self.path):
+            data = self.load()
+            data.update(values or {})
+            for key in remove:
+                data.pop(key, None)
+
+            descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".te2-", suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "w") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(temporary_path, self.path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+
+        return data
@@ -0,0 +1,78 @@
+"""
+Salted fingerprints of variable values written to Terraform Enterprise.
+
+Terraform Enterprise never returns the value of a sensitive variable, so it cannot be compared with the value about
+to be written. The fingerprint of the last value written is kept locally instead, and compared in its place.
+"""
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import threading
+
+from te2_sdk.file_store import JSONFileStore
+
+SALT_KEY = "salt"
+FINGERPRINT_PREFIX = "fingerprint:"
+
+
+class FingerprintStore:
+    def __init__(self, path=None, salt=None):
+        """
+        :param path: Optional JSON file to keep fingerprints across pipeline runs, in memory only otherwise
+        :param salt: Optional salt, generated (and saved with the fingerprints) when not given
+        """
+        self._store = JSONFileStore(path) if path else None
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+
+        saved = self._store.load() if self._store is not None else {}
+        self.salt = salt or saved.get(SALT_KEY) or binascii.hexlify(os.urandom(16)).decode()
+        self._fingerprints.update(self._saved_fingerprints(saved))
+
+        if self._store is not None and saved.get(SALT_KEY) != self.salt:
+            # Fingerprints made with another salt can never match
+            self._store.update({SALT_KEY: self.salt}, remove=[key for key in saved if key != SALT_KEY])
+            self._fingerprints = {}
+
+    @staticmethod
+    def _saved_fingerprints(saved):
+        return {key: value for key, value in saved.items() if key.startswith(FINGERPRINT_PREFIX)}
+
+    @staticmethod
+    def _key(workspace_id, key):
+        return FINGERPRINT_PREFIX + workspace_id + "/" + key
+
+    def fingerprint(self, value, category, hcl):
+        message = json.dumps([value, category, hcl]).encode()
+        return hmac.new(self.salt.encode(), message, hashlib.sha256).hexdigest()
+
+    def matches(self, workspace_id, key, value, category, hcl):
+        """True when value is the last value recorded for the variable."""
+        store_key = self._key(workspace_id, key)
+        recorded = self._fingerprints.get(store_key)
+
+        if recorded is None and self._store is not None:
+            # Another process may have written the variable since this store was loaded
+            self._fingerprints.update(self._saved_fingerprints(self._store.load()))
+            recorded = self._fingerprints.get(store_key)
+
+        return recorded is not None and hmac.compare_digest(recorded, self.fingerprint(value, category, hcl))
+
+    def record(self, workspace_id, key, value, category, hcl):
+        store_key = self._key(workspace_id, key)
+        fingerprint = self.fingerprint(value, category, hcl)
+
+        with self._lock:
+            self._fingerprints[store_key] = fingerprint
+            if self._store is not None:
+                self._store.update({store_key: fingerprint})
+
+    def forget(self, workspace_id, key):
+        store_key = self._key(workspace_id, key)
+
+        with self._lock:
+            self._fingerprints.pop(store_key, None)
+            if self._store is not None:
+                self._store.update(remove=[store_key])
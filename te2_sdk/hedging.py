@@ -0,0 +1,176 @@
+"""
+Hedged GET requests: when a read is slower than usual, send it again and take whichever answer arrives first.
+"""
+import collections
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from te2_sdk.transport import RequestsTransport
+
+
+class HedgeMetrics:
+    def __init__(self):
+        """Counts of hedged requests, safe to read while requests are in flight"""
+        self._lock = threading.Lock()
+        self.requests = 0  # GETs sent through the hedging transport
+        self.hedged = 0  # GETs a second attempt was sent for
+        self.hedge_wins = 0  # Hedged GETs the second attempt answered first
+
+    def record(self, hedged=False, hedge_won=False):
+        with self._lock:
+            self.requests += 1
+            self.hedged += hedged
+            self.hedge_wins += hedge_won
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0,
+            }
+
+
+def _close_quietly(future):
+    """Close the response of an attempt that lost, once it arrives"""
+    if not future.cancelled() and future.exception() is None:
+        response = future.result()[0]
+        close = getattr(response, "close", None)
+        if close is not None:
+            close()
+
+
+class HedgingTransport:
+    def __init__(self, transport=None, percentile=95, initial_delay=0.5, min_delay=0.01, max_delay=5.0,
+                 window=256, min_samples=20, max_workers=16):
+        """
+        Sends a second copy of a GET when the first has not answered within the percentile of recent GET latencies
+
+        Only GETs are hedged, they are safe to send twice. The slower attempt is cancelled if it has not started,
+        else its response is closed once it arrives; requests cannot abandon a request in flight.
+
+        :param transport: Transport doing the requests, defaults to an unpooled RequestsTransport
+        :param percentile: Latency percentile after which to hedge, e.g. 95 hedges about 5% of GETs
+        :param initial_delay: Delay used until min_samples latencies have been seen
+        :param min_delay: Lower bound of the delay, so fast backends are not hit twice for every read
+        :param max_delay: Upper bound of the delay
+        :param window: Number of recent latencies the percentile is taken over
+        :param min_samples: Latencies needed before the percentile is used
+        :param max_workers: Threads sending attempts
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.metrics = HedgeMetrics()
+
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Threads do not survive a fork, the inherited executor cannot run anything
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="te2-hedge")
+                self._pid = os.getpid()
+            return self._executor
+
+    def hedge_delay(self):
+        """
+        :return: Seconds to wait for the first attempt before sending the second
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+        if len(latencies) < self.min_samples:
+            delay = self.initial_delay
+        else:
+            delay = latencies[min(int(len(latencies) * self.percentile / 100.0), len(latencies) - 1)]
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def _timed_request(self, method, url, kwargs):
+        started = time.monotonic()
+        response = self.transport.request(method, url, **kwargs)
+        return response, started, time.monotonic()
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        kwargs = {"headers": headers, "params": params, "data": data, "stream": stream, "timeout": timeout}
+        if method.upper() != "GET" or stream:
+            return self.transport.request(method, url, **kwargs)
+
+        delay = self.hedge_delay()
+        sent = time.monotonic()
+        first = self.executor.submit(self._timed_request, method, url, kwargs)
+        done, _ = wait([first], timeout=delay)
+
+        if done:
+            response, started, finished = first.result()
+            self._observe(finished - started)
+            self.metrics.record()
+            return response
+
+        second = self.executor.submit(self._timed_request, method, url, kwargs)
+        attempts = [first, second]
+        error = None
+        while attempts:
+            done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempts.remove(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+
+                for other in attempts:
+                    if not other.cancel():
+                        other.add_done_callback(_close_quietly)
+
+                response, started, finished = future.result()
+                self._observe(finished - started)
+                if future is second:
+                    # The first attempt is slower than this, leaving it out would drag the percentile down
+                    self._observe(time.monotonic() - sent)
+                self.metrics.record(hedged=True, hedge_won=future is second)
+                return response
+
+        self.metrics.record(hedged=True)
+        raise error
+
+    def _observe(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+        self.transport.close()
+
+    def __getstate__(self):
+        return {
+            "transport": self.transport,
+            "percentile": self.percentile,
+            "initial_delay": self.initial_delay,
+            "min_delay": self.min_delay,
+            "max_delay": self.max_delay,
+            "window": self.window,
+            "min_samples": self.min_samples,
+            "max_workers": self.max_workers,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
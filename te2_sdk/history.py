@@ -0,0 +1,286 @@
+"""
+Local history of runs in SQLite, synced incrementally from Terraform Enterprise.
+"""
+import sqlite3
+import threading
+import time
+
+from te2_sdk.durations import parse_timestamp
+from te2_sdk.run_states import FINAL_STATES
+from te2_sdk.te2 import jsonapi_params
+
+RUN_FIELDS = ["status", "created-at", "status-timestamps", "has-changes", "is-destroy"]
+
+# Column holding the duration of each phase
+DURATION_COLUMNS = {
+    "queue": "queue_seconds",
+    "plan": "plan_seconds",
+    "apply": "apply_seconds",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    workspace_id TEXT NOT NULL,
+    workspace_name TEXT,
+    status TEXT,
+    is_destroy INTEGER,
+    has_changes INTEGER,
+    created_at REAL,
+    finished_at REAL,
+    queue_seconds REAL,
+    plan_seconds REAL,
+    apply_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_workspace_created ON runs (workspace_id, created_at);
+CREATE INDEX IF NOT EXISTS runs_queue ON runs (queue_seconds, workspace_id) WHERE queue_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_plan ON runs (plan_seconds, workspace_id) WHERE plan_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_apply ON runs (apply_seconds, workspace_id) WHERE apply_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_workspace_queue ON runs (workspace_name, queue_seconds);
+CREATE INDEX IF NOT EXISTS runs_workspace_plan ON runs (workspace_name, plan_seconds);
+CREATE INDEX IF NOT EXISTS runs_workspace_apply ON runs (workspace_name, apply_seconds);
+CREATE TABLE IF NOT EXISTS workspaces (
+    workspace_id TEXT PRIMARY KEY,
+    workspace_name TEXT,
+    synced_at REAL
+);
+"""
+
+
+def _epoch(value):
+    timestamp = parse_timestamp(value)
+    return timestamp.timestamp() if timestamp is not None else None
+
+
+def _first(timestamps, *keys):
+    for key in keys:
+        value = _epoch(timestamps.get(key))
+        if value is not None:
+            return value
+    return None
+
+
+def _seconds(start, end):
+    if start is None or end is None:
+        return None
+    return max(end - start, 0.0)
+
+
+def run_row(run, workspace_id, workspace_name=None):
+    """
+    The compact history row of a run document
+
+    :return: Dict of column name to value
+    """
+    attributes = run['attributes']
+    timestamps = attributes.get('status-timestamps') or {}
+
+    created_at = _epoch(attributes.get('created-at'))
+    planning_at = _first(timestamps, "planning-at")
+    planned_at = _first(timestamps, "planned-at", "planned-and-finished-at")
+    applying_at = _first(timestamps, "applying-at", "confirmed-at")
+    applied_at = _first(timestamps, "applied-at")
+    finished_at = _first(
+        timestamps, "applied-at", "planned-and-finished-at", "errored-at", "discarded-at", "canceled-at",
+        "force-canceled-at"
+    )
+
+    has_changes = attributes.get('has-changes')
+    return {
+        "id": run['id'],
+        "workspace_id": workspace_id,
+        "workspace_name": workspace_name,
+        "status": attributes.get('status'),
+        "is_destroy": int(bool(attributes.get('is-destroy'))),
+        "has_changes": None if has_changes is None else int(bool(has_changes)),
+        "created_at": created_at,
+        "finished_at": finished_at,
+        "queue_seconds": _seconds(created_at, planning_at),
+        "plan_seconds": _seconds(planning_at or created_at, planned_at),
+        "apply_seconds": _seconds(applying_at, applied_at),
+    }
+
+
+class RunHistory:
+    def __init__(self, path=":memory:"):
+        """
+        Runs of many workspaces, kept in a SQLite database
+
+        :param path: Database file, in memory by default
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _execute(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def store(self, runs, workspace_id, workspace_name=None):
+        """
+        Insert or update runs
+
+        :param runs: Run documents
+        """
+        rows = [run_row(run, workspace_id, workspace_name) for run in runs]
+        if not rows:
+            return
+
+        columns = list(rows[0])
+        sql = "INSERT OR REPLACE INTO runs (" + ", ".join(columns) + ") VALUES (" + \
+            ", ".join("?" * len(columns)) + ")"
+        with self._lock, self._connection:
+            self._connection.executemany(sql, [[row[column] for column in columns] for row in rows])
+
+    def _sync_watermark(self, workspace_id):
+        """
+        Creation time before which the stored runs of a workspace are up to date, or None before the first sync
+
+        Runs that had not finished at the last sync may have changed since, so paging goes back to the oldest.
+        """
+        synced = self._execute("SELECT synced_at FROM workspaces WHERE workspace_id = ?", (workspace_id,))
+        if not synced:
+            return None
+
+        placeholders = ", ".join("?" * len(FINAL_STATES))
+        rows = self._execute(
+            "SELECT MIN(created_at) AS unfinished, "
+            "(SELECT MAX(created_at) FROM runs WHERE workspace_id = ?) AS newest "
+            "FROM runs WHERE workspace_id = ? AND status NOT IN (" + placeholders + ")",
+            [workspace_id, workspace_id] + sorted(FINAL_STATES)
+        )
+        unfinished, newest = rows[0]["unfinished"], rows[0]["newest"]
+        if unfinished is not None and (newest is None or unfinished < newest):
+            return unfinished
+        return newest
+
+    def sync(self, client, workspace_name, workspace_id=None, page_size=100, max_pages=None, deadline=None):
+        """
+        Fetch the runs created since the last sync of a workspace, and those that had not finished then
+
+        Runs are listed newest first, so paging stops at the first page reaching back past what is stored.
+
+        :param client: TE2Client
+        :param workspace_name: Workspace to sync
+        :param workspace_id: Workspace ID, looked up from the name when not given
+        :param page_size: Runs per request
+        :param max_pages: Optional limit of requests, e.g. to bound the first sync of a busy workspace
+        :param deadline: Optional Deadline
+        :return: Number of runs stored
+        """
+        if workspace_id is None:
+            workspace_id = client.get_workspace_id(workspace_name, deadline=deadline)
+
+        watermark = self._sync_watermark(workspace_id)
+        stored = 0
+        page = 1
+
+        while max_pages is None or page <= max_pages:
+            request = client.get(
+                path="/workspaces/" + workspace_id + "/runs",
+                params=jsonapi_params(
+                    fields={"runs": RUN_FIELDS}, params={"page[number]": page, "page[size]": page_size}
+                ),
+                deadline=deadline
+            )
+            if not str(request.status_code).startswith("2"):
+                raise KeyError("Run does not exist")
+
+            document = client.decode(request)
+            runs = document['data']
+            self.store(runs, workspace_id, workspace_name)
+            stored += len(runs)
+
+            created = [_epoch(run['attributes'].get('created-at')) for run in runs]
+            reached_watermark = watermark is not None and any(
+                timestamp is not None and timestamp < watermark for timestamp in created
+            )
+            next_page = ((document.get('meta') or {}).get('pagination') or {}).get('next-page')
+            if reached_watermark or not runs or not next_page:
+                break
+            page = next_page
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO workspaces (workspace_id, workspace_name, synced_at) VALUES (?, ?, ?)",
+                (workspace_id, workspace_name, time.time())
+            )
+        return stored
+
+    @staticmethod
+    def _column(phase):
+        if phase not in DURATION_COLUMNS:
+            raise KeyError("phase must be one of " + ", ".join(sorted(DURATION_COLUMNS)))
+        return DURATION_COLUMNS[phase]
+
+    def _filters(self, column, workspace_name=None, since=None):
+        clauses = [column + " IS NOT NULL"]
+        parameters = []
+        if workspace_name is not None:
+            clauses.append("workspace_name = ?")
+            parameters.append(workspace_name)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            parameters.append(since)
+        return " WHERE " + " AND ".join(clauses), parameters
+
+    def duration_percentile(self, phase="plan", percentile=95, workspace_name=None, since=None):
+        """
+        Queue time is from creation until planning started, plan time from then until the plan finished, apply time
+        from applying (or confirmation) until applied.
+
+        :param phase: "queue", "plan" or "apply"
+        :param percentile: e.g. 50 for the median, 95
+        :param workspace_name: Optional workspace, all of them by default
+        :param since: Optional epoch seconds, leaving out runs created before it
+        :return: Seconds, or None when there are no runs with that phase
+        """
+        column = self._column(phase)
+        where, parameters = self._filters(column, workspace_name, since)
+
+        count = self._execute("SELECT COUNT(*) FROM runs" + where, parameters)[0][0]
+        if not count:
+            return None
+
+        offset = min(int(count * percentile / 100.0), count - 1)
+        return self._execute(
+            "SELECT " + column + " FROM runs" + where + " ORDER BY " + column + " LIMIT 1 OFFSET ?",
+            parameters + [offset]
+        )[0][0]
+
+    def slowest_workspaces(self, phase="plan", limit=10, since=None):
+        """
+        :param phase: "queue", "plan" or "apply"
+        :param limit: Number of workspaces returned
+        :param since: Optional epoch seconds, leaving out runs created before it
+        :return: List of dicts of "workspace_id", "workspace_name", "runs", "mean_seconds" and "max_seconds", the
+                 slowest mean first
+        """
+        column = self._column(phase)
+        where, parameters = self._filters(column, since=since)
+
+        rows = self._execute(
+            "SELECT workspace_id, MAX(workspace_name) AS workspace_name, COUNT(*) AS runs, "
+            "AVG(" + column + ") AS mean_seconds, MAX(" + column + ") AS max_seconds FROM runs" + where +
+            " GROUP BY workspace_id ORDER BY mean_seconds DESC LIMIT ?",
+            parameters + [limit]
+        )
+        return [dict(row) for row in rows]
+
+    def runs(self, workspace_name=None, limit=100):
+        """
+        :return: Stored rows, newest first, as dicts
+        """
+        if workspace_name is None:
+            rows = self._execute("SELECT * FROM runs ORDER BY created_at DESC LIMIT ?", (limit,))
+        else:
+            rows = self._execute(
+                "SELECT * FROM runs WHERE workspace_name = ? ORDER BY created_at DESC LIMIT ?", (workspace_name, limit)
+            )
+        return [dict(row) for row in rows]
@@ -0,0 +1,425 @@
+"""
+Metrics of SDK activity in the Prometheus text format, optionally served over HTTP.
+
+Recording a sample takes a lock and a dictionary update, cheap enough to leave on around every request. Nothing is
+formatted until the metrics are scraped.
+"""
+import bisect
+import functools
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+from te2_sdk import events
+from te2_sdk._http_server import ThreadingHTTPServer
+from te2_sdk.transport import RequestsTransport
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, for API requests
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Seconds, for runs from creation to completion
+RUN_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+# Path segments holding Terraform Enterprise IDs, e.g. run-CZcmD7eagjhyX0vN
+_ID_SEGMENT = re.compile(r"^(run|ws|var|cv|plan|apply|sv|nc|pol|polset|team|user|ot|at|ta|tv)-[A-Za-z0-9]+$")
+_NAMED_SEGMENTS = {"organizations": ":organisation", "workspaces": ":workspace"}
+
+
+@functools.lru_cache(maxsize=1024)
+def endpoint(url):
+    """
+    The API endpoint of a URL, with IDs and names replaced so every request to it shares one label
+
+    e.g. "https://host/api/v2/runs/run-CZcmD7eagjhyX0vN/actions/apply" is "/api/v2/runs/:id/actions/apply"
+    """
+    segments = urlsplit(url).path.split("/")
+    for index, segment in enumerate(segments):
+        if _ID_SEGMENT.match(segment):
+            segments[index] = ":id"
+        elif len(segment) > 40:
+            # Signed upload and log URLs carry a long token in the path
+            segments[index] = ":token"
+        elif index > 0 and segments[index - 1] in _NAMED_SEGMENTS and segment:
+            segments[index] = _NAMED_SEGMENTS[segments[index - 1]]
+    return "/".join(segments)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(name + '="' + _escape(value) + '"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        try:
+            if len(labels) == len(self.labels):
+                return tuple(str(labels[name]) for name in self.labels)
+        except KeyError:
+            pass
+        raise ValueError(self.name + " takes the labels " + ", ".join(self.labels))
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """
+        :return: List of (name suffix, label values, extra label pairs, value)
+        """
+        with self._lock:
+            return [("", key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = ["# HELP " + self.name + " " + self.help, "# TYPE " + self.name + " " + self.type]
+        for suffix, key, extra, value in self.samples():
+            lines.append(self.name + suffix + _format_labels(self.labels, key, extra) + " " + _format_value(value))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class CallbackGauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, callback, labels=()):
+        """
+        A gauge read when the metrics are scraped
+
+        :param callback: Returns the value, or a dict of label values tuple to value when there are labels
+        """
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [("", key, (), value) for key, value in sorted(values.items())]
+
+
+class CallbackCounter(CallbackGauge):
+    type = "counter"
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Count per bucket, then one for values above the largest bucket, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in sorted(self._values.items())]
+
+        samples = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+            samples.append(("_sum", key, (), counts[-1]))
+            samples.append(("_count", key, (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Metrics by name, rendered together in the Prometheus text format"""
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(name + " is already registered as a " + metric.type)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge, name, help, labels)
+
+    def callback_gauge(self, name, help, callback, labels=()):
+        return self._register(CallbackGauge, name, help, callback, labels)
+
+    def callback_counter(self, name, help, callback, labels=()):
+        return self._register(CallbackCounter, name, help, callback, labels)
+
+    def histogram(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self):
+        """
+        :return: Every metric in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+    def serve(self, host="127.0.0.1", port=0):
+        """
+        Serve the metrics at /metrics from a background thread
+
+        :param port: Port to listen on, 0 picks a free port
+        :return: Started MetricsServer, stop() it when done
+        """
+        return MetricsServer(self, host, port).start()
+
+
+class MetricsServer:
+    def __init__(self, registry, host="127.0.0.1", port=0):
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.registry = registry
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://" + host + ":" + str(port) + "/metrics"
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, kwargs={"poll_interval": 0.1}, name="te2-metrics", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsTransport:
+    def __init__(self, registry, transport=None):
+        """
+        Counts and times every request sent through another transport, per method and endpoint
+
+        :param registry: MetricsRegistry to record to
+        :param transport: Transport doing the requests, defaults to an unpooled RequestsTransport
+        """
+        self.registry = registry
+        self.transport = transport if transport is not None else RequestsTransport()
+
+        self.requests = registry.counter(
+            "te2_requests_total", "API requests by method, endpoint and status code", ("method", "endpoint", "code")
+        )
+        self.latency = registry.histogram(
+            "te2_request_duration_seconds", "API request latency by method and endpoint", ("method", "endpoint")
+        )
+        self.in_flight = registry.gauge("te2_requests_in_flight", "API requests waiting for a response")
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        method = method.upper()
+        path = endpoint(url)
+        code = "error"
+
+        self.in_flight.inc()
+        started = time.monotonic()
+        try:
+            response = self.transport.request(
+                method, url, headers=headers, params=params, data=data, stream=stream, timeout=timeout
+            )
+            code = str(response.status_code)
+            return response
+        finally:
+            self.latency.observe(time.monotonic() - started, method=method, endpoint=path)
+            self.requests.inc(method=method, endpoint=path, code=code)
+            self.in_flight.dec()
+
+    def close(self):
+        self.transport.close()
+
+    def __getstate__(self):
+        # Metrics belong to the process that records them, a pickled transport records to a fresh registry
+        return {"transport": self.transport}
+
+    def __setstate__(self, state):
+        self.__init__(MetricsRegistry(), **state)
+
+
+class MetricsSink:
+    def __init__(self, registry):
+        """
+        Event sink recording run activity
+
+        :param registry: MetricsRegistry to record to
+        """
+        self.registry = registry
+        self.runs_in_progress = registry.gauge("te2_runs_in_progress", "Runs created and still being polled")
+        # IDs of the runs counted in runs_in_progress, so only those are taken off it again
+        self._in_progress = set()
+        self._lock = threading.Lock()
+        self.polls = registry.counter("te2_run_polls_total", "Polls of runs that had not finished")
+        self.run_duration = registry.histogram(
+            "te2_run_duration_seconds", "Seconds from creating a run to its final status, by request type and status",
+            ("request_type", "status"), buckets=RUN_BUCKETS
+        )
+        self.cancelled = registry.counter("te2_runs_cancelled_total", "Runs cancelled or discarded", ("action",))
+        self.discarded = registry.counter("te2_runs_discarded_total", "Pending runs discarded before a new run")
+        self.plans_skipped = registry.counter(
+            "te2_plans_skipped_total", "Plans answered from the plan cache instead of creating a run"
+        )
+
+    def _finished(self, run_id):
+        with self._lock:
+            if run_id not in self._in_progress:
+                return
+            self._in_progress.remove(run_id)
+        self.runs_in_progress.dec()
+
+    def __call__(self, event):
+        if event.kind == events.RUN_CREATED:
+            with self._lock:
+                if event.run_id in self._in_progress:
+                    return
+                self._in_progress.add(event.run_id)
+            self.runs_in_progress.inc()
+        elif event.kind == events.RUN_POLLED:
+            self.polls.inc()
+        elif event.kind == events.RUN_COMPLETED:
+            self._finished(event.run_id)
+            self.run_duration.observe(
+                event.elapsed or 0, request_type=event.details.get("request_type"), status=event.status
+            )
+        elif event.kind == events.RUN_CANCELLED:
+            self._finished(event.run_id)
+            self.cancelled.inc(action=event.details.get("action"))
+        elif event.kind == events.RUN_ABANDONED:
+            self._finished(event.run_id)
+        elif event.kind == events.RUN_DISCARDED:
+            self.discarded.inc()
+        elif event.kind == events.PLAN_SKIPPED:
+            self.plans_skipped.inc()
+
+
+def instrument(client, registry=None):
+    """
+    Record the requests, runs and workspace cache lookups of a client
+
+    :param client: TE2Client
+    :param registry: MetricsRegistry, a new one by default
+    :return: The registry, e.g. to serve()
+    """
+    registry = registry if registry is not None else MetricsRegistry()
+
+    if not isinstance(client.transport, MetricsTransport):
+        client.transport = MetricsTransport(registry, client.transport)
+    if not any(isinstance(sink, MetricsSink) and sink.registry is registry for sink in client.events.sinks):
+        client.events.add_sink(MetricsSink(registry))
+
+    cache = client.workspace_cache
+    if cache is not None:
+        registry.callback_counter(
+            "te2_workspace_cache_lookups_total", "Workspace ID cache lookups by result",
+            lambda: {("hit",): cache.hits, ("miss",): cache.misses}, ("result",)
+        )
+        registry.callback_gauge(
+            "te2_workspace_cache_hit_ratio", "Share of workspace ID lookups answered from the cache",
+            lambda: cache.hits / float(cache.hits + cache.misses) if cache.hits + cache.misses else 0.0
+        )
+
+    return registry
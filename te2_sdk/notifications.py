@@ -0,0 +1,146 @@
+"""
+Local HTTP receiver for Terraform Enterprise run notifications.
+
+Point a workspace's generic notification configuration at the receiver's URL, using the same token, and
+TE2WorkspaceRuns(..., notifications=receiver) will wait for notifications instead of polling each run.
+"""
+import hashlib
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from te2_sdk._http_server import ThreadingHTTPServer
+
+SIGNATURE_HEADER = "X-TFE-Notification-Signature"
+
+
+def sign(token, body):
+    """HMAC-SHA512 signature of a notification body, as sent by Terraform Enterprise."""
+    return hmac.new(token.encode(), body, hashlib.sha512).hexdigest()
+
+
+class TE2NotificationReceiver:
+    def __init__(self, token, host="127.0.0.1", port=0, fallback_poll_interval=120):
+        """
+        Receives run notifications, and wakes up whoever is waiting on the run.
+
+        :param token: Token configured on the notification, used to verify the HMAC signature
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 picks a free port
+        :param fallback_poll_interval: Seconds to wait for a notification before polling the run anyway
+        """
+        self.token = token
+        self.fallback_poll_interval = fallback_poll_interval
+
+        self._condition = threading.Condition()
+        self._watched = {}  # run_id -> latest unconsumed status, or None
+
+        self._server = ThreadingHTTPServer((host, port), _NotificationHandler)
+        self._server.receiver = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://" + host + ":" + str(port) + "/"
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, kwargs={"poll_interval": 0.1}, name="te2-notifications", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def verify_signature(self, body, signature):
+        return signature is not None and hmac.compare_digest(sign(self.token, body), signature)
+
+    def watch(self, run_id):
+        """Start collecting notifications for a run. Notifications for unwatched runs are ignored."""
+        with self._condition:
+            self._watched.setdefault(run_id, None)
+
+    def unwatch(self, run_id):
+        with self._condition:
+            self._watched.pop(run_id, None)
+
+    def notify(self, run_id, status):
+        with self._condition:
+            if run_id in self._watched:
+                self._watched[run_id] = status
+                self._condition.notify_all()
+
+    def wait(self, run_id, timeout=None, cancellation=None):
+        """
+        Wait for a notification about a watched run
+
+        :param run_id: ID for the run
+        :param timeout: Seconds to wait, defaults to fallback_poll_interval
+        :param cancellation: Optional CancellationToken, ending the wait as soon as it is cancelled
+        :return: The run status from the notification, or None if no notification arrived in time
+        """
+        if timeout is None:
+            timeout = self.fallback_poll_interval
+
+        def notified():
+            return self._watched.get(run_id) is not None or (cancellation is not None and cancellation.cancelled())
+
+        wake = cancellation.add_callback(self._wake) if cancellation is not None else None
+        try:
+            with self._condition:
+                self._condition.wait_for(notified, timeout)
+                status = self._watched.get(run_id)
+                if status is not None:
+                    self._watched[run_id] = None
+                return status
+        finally:
+            if wake is not None:
+                cancellation.remove_callback(wake)
+
+    def _wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+
+class _NotificationHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        receiver = self.server.receiver
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not receiver.verify_signature(body, self.headers.get(SIGNATURE_HEADER)):
+            self.send_response(403)
+            self.end_headers()
+            return
+
+        try:
+            payload = json.loads(body)
+            notifications = payload.get("notifications") or []
+            run_id = payload.get("run_id")
+        except (ValueError, AttributeError):
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        # Verification requests from Terraform Enterprise have no run
+        if run_id and notifications and notifications[-1].get("run_status"):
+            receiver.notify(run_id, notifications[-1]["run_status"])
+
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,94 @@
+"""
+Results of recent plans, so a plan of unchanged inputs is not queued again.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from te2_sdk.file_store import JSONFileStore
+
+PLAN_PREFIX = "plan:"
+
+
+def variables_fingerprint(variables):
+    """
+    SHA-256 over every variable as listed by get_workspace_variables
+
+    Sensitive values are never returned by the API, so those variables count by ID and version instead, which
+    change whenever the variable is written.
+
+    :param variables: Variable documents
+    :return: Hex digest, independent of the order variables are listed in
+    """
+    entries = []
+    for variable in variables:
+        attributes = variable['attributes']
+        entry = [attributes['key'], attributes.get('category'), bool(attributes.get('hcl')),
+                 bool(attributes.get('sensitive'))]
+        if attributes.get('sensitive'):
+            entry += [variable.get('id'), attributes.get('version-id')]
+        else:
+            entry.append(attributes.get('value'))
+        entries.append(entry)
+
+    return hashlib.sha256(json.dumps(sorted(entries)).encode()).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, path=None, max_age=3600):
+        """
+        The last successful plan of each workspace, with the inputs it was planned from
+
+        :param path: Optional JSON file, so later pipeline runs reuse the plans of earlier ones
+        :param max_age: Seconds a plan is reused for. Changes outside the workspace's configuration and variables,
+                        e.g. to the infrastructure itself, are only noticed once the plan is older than this.
+        """
+        self.max_age = max_age
+        self._store = JSONFileStore(path) if path else None
+        self._lock = threading.Lock()
+        self._plans = {}
+
+    @staticmethod
+    def _key(workspace_id):
+        return PLAN_PREFIX + workspace_id
+
+    @staticmethod
+    def inputs(configuration, variables, destroy=False):
+        """
+        :param configuration: Content hash of the configuration, or a configuration version ID
+        :param variables: variables_fingerprint of the workspace's variables
+        :return: Key identifying the inputs of a plan
+        """
+        return json.dumps([configuration, variables, bool(destroy)])
+
+    def get(self, workspace_id, inputs):
+        """
+        :return: The run of the last successful plan from the same inputs, or None if there is none or it is too old
+        """
+        key = self._key(workspace_id)
+        with self._lock:
+            if self._store is not None:
+                self._plans.update(self._store.load())
+            entry = self._plans.get(key)
+
+        if entry is None or entry["inputs"] != inputs or time.time() - entry["recorded_at"] > self.max_age:
+            return None
+        return entry["run"]
+
+    def record(self, workspace_id, inputs, run):
+        key = self._key(workspace_id)
+        entry = {"inputs": inputs, "recorded_at": time.time(), "run": run}
+
+        with self._lock:
+            self._plans[key] = entry
+            if self._store is not None:
+                self._store.update({key: entry})
+
+    def forget(self, workspace_id):
+        key = self._key(workspace_id)
+
+        with self._lock:
+            self._plans.pop(key, None)
+            if self._store is not None:
+                self._store.update(remove=[key])
@@ -0,0 +1,82 @@
+"""
+Resource change counts of a plan, from the plan object or from the first lines of its log that contain them.
+"""
+import json
+import re
+
+_SUMMARY_PATTERN = re.compile(
+    r"Plan: (?:(?P<imports>\d+) to import, )?(?P<additions>\d+) to add, "
+    r"(?P<changes>\d+) to change, (?P<destructions>\d+) to destroy"
+)
+_NO_CHANGES_PATTERN = re.compile(r"No changes\.")
+_ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def _summary(additions, changes, destructions, imports=0):
+    return {
+        "additions": additions,
+        "changes": changes,
+        "destructions": destructions,
+        "imports": imports,
+        "has-changes": bool(additions or changes or destructions or imports),
+    }
+
+
+def summary_from_plan(plan):
+    """
+    :param plan: Plan document, as returned by get_run_action(run_id, "plan")
+    :return: Summary dict, or None when the plan has no resource counts (older Terraform Enterprise releases)
+    """
+    attributes = plan['attributes']
+    if attributes.get('resource-additions') is None:
+        return None
+
+    return _summary(
+        attributes['resource-additions'],
+        attributes.get('resource-changes') or 0,
+        attributes.get('resource-destructions') or 0,
+        attributes.get('resource-imports') or 0,
+    )
+
+
+def parse_plan_log(lines):
+    """
+    Read a plan log until its summary line, without consuming the rest
+
+    Understands both the human readable log ("Plan: 1 to add, 0 to change, 0 to destroy.") and the JSON lines
+    log of structured run output ({"type": "change_summary", ...}).
+
+    :param lines: Iterable of log lines, str or bytes
+    :return: Summary dict, or None if the log has no summary
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+
+        if line.startswith("{"):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+
+            if isinstance(message, dict) and message.get("type") == "change_summary":
+                changes = message.get("changes", {})
+                return _summary(
+                    changes.get("add", 0), changes.get("change", 0), changes.get("remove", 0), changes.get("import", 0)
+                )
+            if message is not None:
+                continue
+
+        line = _ANSI_PATTERN.sub("", line)
+        match = _SUMMARY_PATTERN.search(line)
+        if match:
+            return _summary(
+                int(match.group("additions")),
+                int(match.group("changes")),
+                int(match.group("destructions")),
+                int(match.group("imports") or 0)
+            )
+        if _NO_CHANGES_PATTERN.search(line):
+            return _summary(0, 0, 0)
+
+    return None
@@ -0,0 +1,36 @@
+"""
+Spread workspace operations across worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _call(client, workspace_name, func, args):
+    return func(client, workspace_name, *args)
+
+
+def map_workspaces(client, workspace_names, func, *args, max_workers=None, mp_context=None):
+    """
+    Call func(client, workspace_name, *args) for every workspace, in a pool of worker processes
+
+    Workspace IDs are resolved once in this process before the workers start. With a WorkspaceCache on the client,
+    the workers then read them from the cache instead of listing every workspace again; a cache with a path is
+    also shared with workers and later runs that outlive this call.
+
+    :param client: TE2Client, pickled to each worker
+    :param workspace_names: Names of the workspaces to operate on
+    :param func: Picklable (module level) callable
+    :param max_workers: Number of worker processes, defaults to the number of CPUs
+    :param mp_context: Optional multiprocessing context, e.g. multiprocessing.get_context("spawn"). Needs
+                       Python 3.7 or later.
+    :return: Dict of workspace name to the result of func. The first exception raised by func is re-raised.
+    """
+    workspace_names = list(workspace_names)
+
+    if client.workspace_cache is not None:
+        client.get_workspace_ids(workspace_names)
+
+    # ProcessPoolExecutor only takes mp_context from Python 3.7
+    options = {"mp_context": mp_context} if mp_context is not None else {}
+    with ProcessPoolExecutor(max_workers=max_workers, **options) as executor:
+        futures = {name: executor.submit(_call, client, name, func, args) for name in workspace_names}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,197 @@
+"""
+Terraform Enterprise run states, and the policy deciding when a run being polled has finished.
+"""
+
+# The run will not change state again
+FINAL_STATES = frozenset([
+    "applied",
+    "planned_and_finished",
+    "planned_and_saved",
+    "discarded",
+    "errored",
+    "canceled",
+    "force_canceled",
+])
+
+# The plan has finished and the run may be waiting for someone to confirm it. Cost estimation, policy checks or
+# run tasks can still follow, the run's actions.is-confirmable says whether it is waiting (see is_confirmable).
+AWAITING_CONFIRMATION_STATES = frozenset([
+    "planned",
+    "cost_estimated",
+    "policy_checked",
+    "post_plan_completed",
+])
+
+# The run was confirmed, by a person or auto-apply, so its plan has finished
+APPLYING_STATES = frozenset([
+    "confirmed",
+    "apply_queued",
+    "pre_apply_running",
+    "pre_apply_completed",
+    "applying",
+])
+
+# The run is paused on a policy or task failure that needs a human decision
+NEEDS_ATTENTION_STATES = frozenset([
+    "policy_override",
+    "policy_soft_failed",
+    "post_plan_awaiting_decision",
+])
+
+# The run is queued or executing and will move on by itself
+TRANSITIONAL_STATES = frozenset([
+    "pending",
+    "fetching",
+    "fetching_completed",
+    "pre_plan_running",
+    "pre_plan_completed",
+    "queuing",
+    "plan_queued",
+    "planning",
+    "cost_estimating",
+    "policy_checking",
+    "post_plan_running",
+    "confirmed",
+    "apply_queued",
+    "pre_apply_running",
+    "pre_apply_completed",
+    "applying",
+])
+
+# States a run request is finished in, by request type. A plan in AWAITING_CONFIRMATION_STATES is only finished
+# once the run is confirmable.
+TERMINAL_STATES = {
+    "plan": FINAL_STATES | AWAITING_CONFIRMATION_STATES | NEEDS_ATTENTION_STATES | APPLYING_STATES,
+    "apply": FINAL_STATES | NEEDS_ATTENTION_STATES,
+}
+
+# States a finished run request succeeded in, by request type
+SUCCESSFUL_STATES = {
+    "plan": frozenset(["planned_and_finished", "planned_and_saved"]) | AWAITING_CONFIRMATION_STATES | APPLYING_STATES,
+    "apply": frozenset(["applied", "planned_and_finished"]),
+}
+
+# Seconds between polls while the run is in a given state
+POLL_INTERVALS = {
+    "pending": 30,
+    "queuing": 15,
+    "plan_queued": 15,
+    "apply_queued": 15,
+    "fetching": 5,
+    "planning": 10,
+    "cost_estimating": 5,
+    "policy_checking": 5,
+    "confirmed": 5,
+    "applying": 5,
+}
+
+DEFAULT_POLL_INTERVAL = 10
+
+
+def is_confirmable(run):
+    """
+    False when the run document says the run cannot be confirmed yet, e.g. while cost estimation or policy checks
+    are still to come after "planned". Without a document, or one without actions, the status alone decides.
+    """
+    if run is None:
+        return True
+    actions = run.get('attributes', {}).get('actions') or {}
+    return actions.get('is-confirmable', True) is not False
+
+
+class RunStatePolicy:
+    def __init__(self, request_type="plan", predicate=None, poll_intervals=None,
+                 default_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Decides when a polled run is complete, and how long to wait between polls.
+
+        :param request_type: "plan" or "apply", selecting the terminal states from TERMINAL_STATES
+        :param predicate: Optional callable taking the run document, returning True once the run is complete.
+                          Runs in a FINAL_STATES state are always complete.
+        :param poll_intervals: Optional per-state poll intervals, overriding POLL_INTERVALS
+        :param default_interval: Poll interval for states without an entry
+        """
+        if request_type not in TERMINAL_STATES:
+            raise KeyError("request_type must be Plan or Apply")
+
+        self.request_type = request_type
+        self.terminal_states = TERMINAL_STATES[request_type]
+        self.predicate = predicate
+        self.poll_intervals = dict(POLL_INTERVALS, **(poll_intervals or {}))
+        self.default_interval = default_interval
+
+    @property
+    def needs_document(self):
+        """True when is_complete() needs the full run document rather than just its status."""
+        return self.predicate is not None
+
+    def needs_actions(self, status):
+        """True when is_complete() needs the run document to tell whether a plan in status has finished"""
+        return self.request_type == "plan" and status in AWAITING_CONFIRMATION_STATES
+
+    def is_complete(self, status, run=None):
+        if status in FINAL_STATES:
+            return True
+        if self.predicate is not None:
+            return bool(self.predicate(run))
+        if self.needs_actions(status):
+            return is_confirmable(run)
+        return status in self.terminal_states
+
+    def first_poll_delay(self):
+        """Seconds to wait after creating the run before polling it for the first time"""
+        return 0
+
+    def poll_interval(self, status, elapsed=None):
+        """
+        :param status: Status of the run at the last poll
+        :param elapsed: Seconds since the run was created for a plan, or confirmed for an apply; None until then
+        """
+        return self.poll_intervals.get(status, self.default_interval)
+
+
+class ScheduledRunStatePolicy(RunStatePolicy):
+    def __init__(self, expected, spread, request_type="plan", dense_interval=2, max_wait=300, **kwargs):
+        """
+        Polls around the time a run is expected to finish, rather than at a fixed interval
+
+        The first poll waits until shortly before the expected completion, polls are dense while the run is
+        likely to finish, and fall back to the per-state intervals once it is overdue. Runs waiting on a person,
+        e.g. for confirmation, are polled at the per-state intervals throughout. An apply is scheduled from the
+        run's confirmation, so the plan, and the confirmation itself, are polled at the per-state intervals.
+
+        :param expected: Expected seconds from creation to the end of a plan, or from confirmation to the end of an
+                         apply, e.g. from RunDurationStats.expected()
+        :param spread: Seconds either side of expected the run usually finishes in
+        :param dense_interval: Poll interval while the run is likely to finish
+        :param max_wait: Longest single wait before the expected window, so early failures are still noticed
+        :param kwargs: Further arguments of RunStatePolicy
+        """
+        super().__init__(request_type=request_type, **kwargs)
+        self.expected = expected
+        self.spread = spread
+        self.dense_interval = dense_interval
+        self.max_wait = max_wait
+
+    @property
+    def window(self):
+        """(start, end) in seconds since polling started, of when the run is likely to finish"""
+        return max(self.expected - self.spread, 0), self.expected + self.spread
+
+    def first_poll_delay(self):
+        if self.request_type == "apply":
+            # The run is only confirmed once planned, the apply schedule starts from there
+            return 0
+        return min(self.window[0], self.max_wait)
+
+    def poll_interval(self, status, elapsed=None):
+        interval = super().poll_interval(status)
+        if elapsed is None or status not in TRANSITIONAL_STATES:
+            return interval
+
+        start, end = self.window
+        if elapsed < start:
+            return min(start - elapsed, self.max_wait)
+        if elapsed <= end:
+            return min(self.dense_interval, interval)
+        return interval
@@ -0,0 +1,215 @@
+"""
+Client-side queue of run requests, so jobs sharing a workspace stop discarding each other's runs.
+"""
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_for
+
+from te2_sdk.cancellation import CancellationToken
+from te2_sdk.te2 import TE2WorkspaceRuns
+
+
+class _RunJob:
+    def __init__(self, workspace_name, priority, sequence, kwargs):
+        self.workspace_name = workspace_name
+        self.priority = priority
+        self.sequence = sequence
+        self.kwargs = kwargs
+        self.future = Future()
+
+    @property
+    def coalesce_key(self):
+        """Jobs with the same key would create the same run, or None if the job must always run"""
+        if self.kwargs.get("request_type", "plan") != "plan" or self.kwargs.get("predicate") is not None:
+            return None
+        return (
+            self.workspace_name,
+            bool(self.kwargs.get("destroy")),
+            self.kwargs.get("configuration_directory"),
+            self.kwargs.get("configuration_version_id"),
+        )
+
+    def __lt__(self, other):
+        # Highest priority first, then first come first served
+        return (-self.priority, self.sequence) < (-other.priority, other.sequence)
+
+
+class TE2RunScheduler:
+    def __init__(self, client, max_concurrent=4, runs_factory=TE2WorkspaceRuns):
+        """
+        Runs request_run for many workspaces, one run at a time per workspace
+
+        Creating a run discards the workspace's pending runs, so two concurrent requests on one workspace keep
+        discarding each other. The scheduler queues requests per workspace and starts the next one only when the
+        previous run has finished. Queued plans with the same arguments are coalesced into one run.
+
+        :param client: TE2Client
+        :param max_concurrent: Maximum number of runs in progress at once, across all workspaces
+        :param runs_factory: Callable of (client, workspace_name) returning a TE2WorkspaceRuns
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+
+        self.client = client
+        self.max_concurrent = max_concurrent
+        self.runs_factory = runs_factory
+
+        self._lock = threading.Lock()
+        self._queues = {}  # workspace name -> heap of queued _RunJob
+        self._coalesced = {}  # coalesce key -> queued _RunJob
+        self._active = set()  # workspace names with a run in progress
+        self._sequence = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="te2-run")
+        self._shutdown = False
+        self._cancellation = CancellationToken()  # Replaced once cancelled, so later submissions still run
+
+    def submit(self, workspace_name, request_type="plan", destroy=False, priority=0, **kwargs):
+        """
+        Queue a run request
+
+        :param workspace_name: Workspace to run
+        :param request_type: "plan" or "apply"
+        :param destroy: Plan to destroy every resource
+        :param priority: Higher priorities start first, across workspaces and within a workspace's queue
+        :param kwargs: Further arguments of TE2WorkspaceRuns.request_run
+        :return: concurrent.futures.Future of the request_run result. A coalesced plan shares the queued future.
+        """
+        kwargs.update(request_type=request_type, destroy=destroy)
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit runs after shutdown")
+
+            job = _RunJob(workspace_name, priority, next(self._sequence), kwargs)
+            key = job.coalesce_key
+            queued = self._coalesced.get(key) if key is not None else None
+
+            if queued is not None and not queued.future.cancelled():
+                if priority > queued.priority:
+                    queued.priority = priority
+                    heapq.heapify(self._queues[workspace_name])
+                return queued.future
+
+            if key is not None:
+                self._coalesced[key] = job
+            heapq.heappush(self._queues.setdefault(workspace_name, []), job)
+            self._dispatch()
+
+        return job.future
+
+    def pending(self, workspace_name=None):
+        """
+        :return: Number of queued requests that have not started, for one workspace or all of them
+        """
+        with self._lock:
+            if workspace_name is not None:
+                return len(self._queues.get(workspace_name, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next_job(self):
+        """Pop the highest priority job of a workspace without a run in progress. Called holding the lock."""
+        best = None
+        for workspace_name, queue in self._queues.items():
+            if workspace_name in self._active:
+                continue
+            while queue and queue[0].future.cancelled():
+                self._forget(heapq.heappop(queue))
+            if queue and (best is None or queue[0] < best):
+                best = queue[0]
+
+        if best is not None:
+            heapq.heappop(self._queues[best.workspace_name])
+            self._forget(best)
+        return best
+
+    def _forget(self, job):
+        key = job.coalesce_key
+        if key is not None and self._coalesced.get(key) is job:
+            del self._coalesced[key]
+
+    def _dispatch(self):
+        """Start queued jobs while there is capacity. Called holding the lock."""
+        while len(self._active) < self.max_concurrent:
+            job = self._next_job()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            self._active.add(job.workspace_name)
+            self._executor.submit(self._run, job, self._cancellation)
+
+        for workspace_name in [name for name, queue in self._queues.items() if not queue]:
+            del self._queues[workspace_name]
+
+        if self._shutdown and not self._active and not self._queues:
+            # Shut down without waiting: the executor was kept until the queue drained
+            self._executor.shutdown(wait=False)
+
+    def _run(self, job, cancellation):
+        token = CancellationToken(cancellation, job.kwargs.get("cancellation"))
+        try:
+            runs = self.runs_factory(self.client, job.workspace_name)
+            result = runs.request_run(**dict(job.kwargs, cancellation=token))
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            token.detach()
+            with self._lock:
+                self._active.discard(job.workspace_name)
+                self._dispatch()
+
+    def cancel(self, reason=None):
+        """
+        Cancel every queued request, and the runs in progress, which are cancelled or discarded in Terraform
+        Enterprise. Requests submitted afterwards run as usual.
+
+        :param reason: Optional message, e.g. which run failed
+        """
+        with self._lock:
+            cancellation, self._cancellation = self._cancellation, CancellationToken()
+            for queue in self._queues.values():
+                for job in queue:
+                    job.future.cancel()
+            self._queues.clear()
+            self._coalesced.clear()
+        cancellation.cancel(reason)
+
+    def shutdown(self, wait=True, cancel_pending=False, cancel_running=False):
+        """
+        Stop accepting requests. Queued requests still run, also without waiting for them, unless cancelled.
+
+        :param wait: Block until every queued and started run has finished
+        :param cancel_pending: Cancel queued requests instead of running them
+        :param cancel_running: Cancel the runs in progress, and the queued requests, see cancel
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_pending:
+                for queue in self._queues.values():
+                    for job in queue:
+                        job.future.cancel()
+                self._queues.clear()
+                self._coalesced.clear()
+            self._dispatch()
+        if cancel_running:
+            self.cancel("scheduler shut down")
+
+        if wait:
+            while True:
+                with self._lock:
+                    futures = [job.future for queue in self._queues.values() for job in queue
+                               if not job.future.cancelled()]
+                if not futures:
+                    break
+                wait_for(futures)
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
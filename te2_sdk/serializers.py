@@ -0,0 +1,223 @@
+"""
+JSON serialisation for request bodies and API responses.
+
+The fastest installed backend is used (orjson, then ujson, then the standard library ``json`` module). Request
+bodies for runs and variables are rendered from precompiled templates, and polling calls can read the run status
+without decoding the whole response document.
+"""
+import json
+import re
+from functools import lru_cache
+
+
+class JSONSerializer:
+    """Standard library backend, always available."""
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonSerializer:
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, escape_forward_slashes=False)
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+SERIALIZERS = {
+    "orjson": OrjsonSerializer,
+    "ujson": UjsonSerializer,
+    "json": JSONSerializer,
+}
+
+
+def get_serializer(serializer=None):
+    """
+    Resolve a serializer
+
+    :param serializer: None for the fastest installed backend, a backend name, or a serializer instance.
+    :return: Serializer instance providing dumps() and loads()
+    """
+    if serializer is None:
+        for backend in SERIALIZERS.values():
+            try:
+                return backend()
+            except ImportError:
+                continue
+
+    if isinstance(serializer, str):
+        if serializer not in SERIALIZERS:
+            raise KeyError("Unknown serializer: " + serializer)
+        return SERIALIZERS[serializer]()
+
+    return serializer
+
+
+def decode(response, serializer):
+    """
+    Decode a full response document with the given serializer.
+
+    Falls back to response.json() for response objects that do not expose raw bytes.
+    """
+    content = getattr(response, "content", None)
+    if isinstance(content, bytes) and content:
+        return serializer.loads(content)
+    return response.json()
+
+
+_STATUS_PATTERN = re.compile(rb'"status"\s*:\s*"([^"\\]*)"')
+
+
+def decode_status(response):
+    """
+    Read data.attributes.status from a run response without decoding the whole document.
+
+    The first "status" key of a run document is the run status; included plan and apply documents always follow the
+    primary data.
+    """
+    content = getattr(response, "content", None)
+    if isinstance(content, bytes):
+        match = _STATUS_PATTERN.search(content)
+        if match:
+            return match.group(1).decode()
+    return response.json()['data']['attributes']['status']
+
+
+def field(name):
+    """Placeholder for a value substituted when a BodyTemplate is rendered."""
+    return "__te2:" + name + "__"
+
+
+_FIELD_PATTERN = re.compile(r'"__te2:(\w+)__"')
+
+
+class BodyTemplate:
+    """
+    A request body compiled once into literal JSON fragments, with values spliced in on render.
+
+    Rendering skips walking and encoding the nested skeleton, which is identical for every request.
+    """
+
+    def __init__(self, skeleton):
+        parts = _FIELD_PATTERN.split(json.dumps(skeleton, separators=(",", ":")))
+        self._literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, **values):
+        body = [self._literals[0]]
+        for name, literal in zip(self.fields, self._literals[1:]):
+            body.append(_encode_value(values[name]))
+            body.append(literal)
+        return "".join(body)
+
+
+def _encode_value(value):
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return json.dumps(value)
+
+
+RUN_REQUEST = BodyTemplate({
+    "data": {
+        "attributes": {
+            "is-destroy": field("destroy")
+        },
+        "relationships": {
+            "workspace": {
+                "data": {
+                    "type": "workspaces",
+                    "id": field("workspace_id")
+                }
+            }
+        },
+        "type": "runs"
+    }
+})
+
+RUN_REQUEST_WITH_CONFIGURATION = BodyTemplate({
+    "data": {
+        "attributes": {
+            "is-destroy": field("destroy")
+        },
+        "relationships": {
+            "workspace": {
+                "data": {
+                    "type": "workspaces",
+                    "id": field("workspace_id")
+                }
+            },
+            "configuration-version": {
+                "data": {
+                    "type": "configuration-versions",
+                    "id": field("configuration_version_id")
+                }
+            }
+        },
+        "type": "runs"
+    }
+})
+
+
+@lru_cache(maxsize=None)
+def variable_request(hcl=False, create=False, update=False):
+    """
+    Template for a variable create (POST) or update (PATCH) body.
+
+    :param hcl: Include "hcl": true in the attributes
+    :param create: Include the organisation/workspace filter used when creating a variable
+    :param update: Include the variable ID used when updating a variable
+    :return: BodyTemplate
+    """
+    attributes = {
+        "key": field("key"),
+        "value": field("value"),
+        "category": field("category"),
+        "sensitive": field("sensitive")
+    }
+    if hcl:
+        attributes["hcl"] = True
+
+    skeleton = {"data": {"type": "vars", "attributes": attributes}}
+
+    if update:
+        skeleton["data"]["id"] = field("id")
+    if create:
+        skeleton["filter"] = {
+            "organization": {"username": field("organisation")},
+            "workspace": {"name": field("workspace_name")}
+        }
+
+    return BodyTemplate(skeleton)
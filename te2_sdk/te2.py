@@ -1,10 +1,84 @@
 import json
+import threading
 import time
-import requests
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+from te2_sdk import events, plan_summary, serializers
+from te2_sdk.cache import workspace_cache_key
+from te2_sdk.configuration import ConfigurationIndex, TE2ConfigurationVersions, content_hash
+from te2_sdk.deadline import Deadline, cap_timeout
+from te2_sdk.events import EventEmitter
+from te2_sdk.plan_cache import PlanCache, variables_fingerprint
+from te2_sdk.run_states import APPLYING_STATES, AWAITING_CONFIRMATION_STATES, FINAL_STATES, \
+    NEEDS_ATTENTION_STATES, SUCCESSFUL_STATES, TERMINAL_STATES, RunStatePolicy, ScheduledRunStatePolicy, is_confirmable
+from te2_sdk.token_pool import TokenPool
+from te2_sdk.transport import RequestsTransport
+
+DISCARD_REQUEST = json.dumps({"comment": "Dropped by automated pipeline build"})
+CANCEL_REQUEST = json.dumps({"comment": "Cancelled by automated pipeline build"})
+CONFIRM_REQUEST = json.dumps({"comment": "Confirmed by automated pipeline build"})
+
+# Run states the discard action applies to, the cancel action applies to the other unfinished states
+DISCARDABLE_STATES = frozenset(["pending"]) | AWAITING_CONFIRMATION_STATES | NEEDS_ATTENTION_STATES
+
+# Seconds to wait for a connection, and between bytes of a response
+DEFAULT_TIMEOUT = (10, 60)
+
+# Compound document type of each run action
+ACTION_TYPES = {"plan": "plans", "apply": "applies"}
+
+# Runs whose finished plan and apply TE2WorkspaceRuns keeps, the least recently used are dropped first
+MAX_KEPT_RUNS = 256
+
+
+def jsonapi_params(fields=None, include=None, params=None):
+    """
+    Query parameters asking for a JSON:API sparse fieldset and compound document
+
+    :param fields: Dict of resource type to the attribute names to return, e.g. {"workspaces": ["name"]}.
+                   The id and type of every resource are always returned.
+    :param include: Names of relationships to return in the same response, e.g. ["plan", "apply"]
+    :param params: Further query parameters
+    :return: Dict of query parameters, or None when there are none
+    """
+    query = dict(params or {})
+    for resource_type, names in (fields or {}).items():
+        query["fields[" + resource_type + "]"] = ",".join(names)
+    if include:
+        query["include"] = ",".join(include)
+    return query or None
 
 
 class TE2Client:
-    def __init__(self, organisation, atlas_token, base_url="https://atlas.hashicorp.com/api/v2"):
+    def __init__(self, organisation, atlas_token, base_url="https://atlas.hashicorp.com/api/v2", serializer=None,
+                 transport=None, workspace_cache=None, events=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Connectivity class, shared by the workspace helpers.
+
+        Clients can be pickled and sent to other processes, e.g. through concurrent.futures.ProcessPoolExecutor.
+        The transport rebuilds its connections in every process it is used in, including after a fork.
+
+        One client can be shared by every thread of a process, together with the bundled transports, caches,
+        token pools and event emitters: their state is guarded by locks or copied on write. Threads that miss
+        the workspace cache at the same time wait for a single listing of the organisation's workspaces.
+        TE2WorkspaceRuns and TE2WorkspaceVariables only add state that is safe to share in the same way, but
+        runs requested concurrently in one workspace still discard each other, queue them with TE2RunScheduler.
+
+        :param atlas_token: API token, or a list of tokens or a TokenPool to spread requests over their rate limits
+        :param serializer: JSON backend name or instance, see te2_sdk.serializers
+        :param transport: Object sending the HTTP requests, defaults to an unpooled RequestsTransport
+        :param workspace_cache: Optional WorkspaceCache for workspace ID lookups
+        :param events: EventEmitter receiving run activity, attach sinks to it to see progress
+        :param timeout: (connect, read) timeout in seconds of every request, or None to wait forever. Requests made
+                        with a deadline are also cut short by it.
+        """
+
+        if isinstance(atlas_token, str):
+            self.token_pool = None
+        else:
+            self.token_pool = atlas_token if isinstance(atlas_token, TokenPool) else TokenPool(atlas_token)
+            atlas_token = self.token_pool.tokens[0]
 
         self.request_header = {
             'Authorization': "Bearer " + atlas_token,
@@ -13,101 +87,346 @@ class TE2Client:
 
         self.organisation = organisation
         self.base_url = base_url
+        self.serializer = serializers.get_serializer(serializer)
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.workspace_cache = workspace_cache
+        self.events = events if events is not None else EventEmitter()
+        self.timeout = timeout
+        self._listing_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_listing_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listing_lock = threading.Lock()
+
+    def _workspace_cache_key(self, workspace_name):
+        return workspace_cache_key(self.base_url, self.organisation, workspace_name)
+
+    def get_workspace_id(self, workspace_name, deadline=None):
+        workspace_id = self.get_workspace_ids([workspace_name], deadline=deadline).get(workspace_name)
+        if workspace_id is None:
+            raise KeyError('Workspace ID Cannot be found')
+        return workspace_id
+
+    def get_workspace_ids(self, workspace_names, deadline=None):
+        """
+        Resolve several workspace IDs with at most one listing of the organisation's workspaces
 
-    def get_workspace_id(self, workspace_name):
-        for obj in self.get_all_workspaces():
-            if obj["attributes"]["name"] == workspace_name:
-                return obj["id"]
-        raise KeyError('Workspace ID Cannot be found')
+        :param workspace_names: Names of the workspaces
+        :param deadline: Optional Deadline
+        :return: Dict of workspace name to ID. Workspaces that cannot be found are left out.
+        """
+        workspace_ids = self._cached_workspace_ids(workspace_names)
+        missing = set(workspace_names) - set(workspace_ids)
+        if missing and self.workspace_cache is not None:
+            # Threads missing the cache together share one listing, the others find its result in the cache
+            deadline = Deadline.resolve(deadline)
+            if not self._listing_lock.acquire(timeout=deadline.cap() if deadline is not None else -1):
+                raise TimeoutError("Deadline of " + str(deadline.seconds) + " seconds exceeded")
+            try:
+                workspace_ids.update(self._cached_workspace_ids(missing))
+                missing -= set(workspace_ids)
+                if missing:
+                    workspace_ids.update(self._list_workspace_ids(missing, deadline))
+            finally:
+                self._listing_lock.release()
+        elif missing:
+            workspace_ids.update(self._list_workspace_ids(missing, deadline))
+
+        return workspace_ids
+
+    def _cached_workspace_ids(self, workspace_names):
+        workspace_ids = {}
+        if self.workspace_cache is not None:
+            for name in workspace_names:
+                workspace_id = self.workspace_cache.get(self._workspace_cache_key(name))
+                if workspace_id is not None:
+                    workspace_ids[name] = workspace_id
+        return workspace_ids
+
+    def _list_workspace_ids(self, workspace_names, deadline=None):
+        workspaces = {
+            obj["attributes"]["name"]: obj["id"]
+            for obj in self.get_all_workspaces(deadline=deadline, fields={"workspaces": ["name"]})
+        }
 
-    def get_all_workspaces(self):
-        request = self.get(path="/organizations/" + self.organisation + "/workspaces")
-        if str(request.status_code).startswith("2"):
-            return request.json()['data']
-        else:
-            raise KeyError('No workspaces can be found under this organisation')
+        if self.workspace_cache is not None:
+            self.workspace_cache.update(
+                {self._workspace_cache_key(name): workspace_id for name, workspace_id in workspaces.items()}
+            )
 
-    def get(self, path, params=None):
-        return requests.get(url=self.base_url + path, headers=self.request_header, params=params)
+        return {name: workspaces[name] for name in workspace_names if name in workspaces}
 
-    def post(self, path, data, params=None):
-        return requests.post(url=self.base_url + path, data=data, headers=self.request_header, params=params)
+    def get_all_workspaces(self, deadline=None, fields=None, page_size=100):
+        """
+        Every workspace of the organisation, following meta.pagination.next-page across as many pages as it has
+
+        :param fields: Optional sparse fieldset, e.g. {"workspaces": ["name"]}, see jsonapi_params
+        :param page_size: Workspaces per request, at most 100
+        """
+        workspaces = []
+        page = 1
+        while page:
+            request = self.get(
+                path="/organizations/" + self.organisation + "/workspaces",
+                params=jsonapi_params(fields=fields, params={"page[number]": page, "page[size]": page_size}),
+                deadline=deadline
+            )
+            if not str(request.status_code).startswith("2"):
+                raise KeyError('No workspaces can be found under this organisation')
+
+            document = self.decode(request)
+            workspaces.extend(document['data'])
+            page = ((document.get('meta') or {}).get('pagination') or {}).get('next-page') if document['data'] else None
+
+        return workspaces
+
+    def decode(self, response):
+        return serializers.decode(response, self.serializer)
 
-    def patch(self, path, data, params=None):
-        return requests.patch(url=self.base_url + path, data=data, headers=self.request_header, params=params)
+    @staticmethod
+    def decode_status(response):
+        return serializers.decode_status(response)
 
-    def delete(self, path, params=None):
-        return requests.delete(url=self.base_url + path, headers=self.request_header, params=params)
+    def request_timeout(self, deadline=None):
+        """
+        :param deadline: Optional Deadline, raising TimeoutError when it has passed
+        :return: The client's timeout, capped by the time left before the deadline
+        """
+        return cap_timeout(self.timeout, deadline)
+
+    def _send(self, method, path, deadline=None, **kwargs):
+        kwargs["timeout"] = self.request_timeout(deadline)
+        if self.token_pool is None:
+            return self.transport.request(method, self.base_url + path, headers=self.request_header, **kwargs)
+
+        token = self.token_pool.acquire()
+        response = None
+        try:
+            response = self.transport.request(
+                method, self.base_url + path, headers=dict(self.request_header, Authorization="Bearer " + token),
+                **kwargs
+            )
+            return response
+        finally:
+            self.token_pool.release(token, response)
+
+    def get(self, path, params=None, deadline=None):
+        return self._send("GET", path, params=params, deadline=deadline)
+
+    def post(self, path, data, params=None, deadline=None):
+        return self._send("POST", path, params=params, data=data, deadline=deadline)
+
+    def patch(self, path, data, params=None, deadline=None):
+        return self._send("PATCH", path, params=params, data=data, deadline=deadline)
+
+    def delete(self, path, params=None, deadline=None):
+        return self._send("DELETE", path, params=params, deadline=deadline)
 
 
 class TE2WorkspaceRuns:
-    def __init__(self, client, workspace_name, base_api_url=None):
+    def __init__(self, client, workspace_name, base_api_url=None, notifications=None, configuration_index=None,
+                 sparse_polling=False, duration_stats=None, plan_cache=None):
 
         self.client = client
         self.workspace_name = workspace_name
         self.workspace_id = self.client.get_workspace_id(workspace_name)
-
-    def _render_run_request(self, destroy=False):
-        return {
-            "data": {
-                "attributes": {
-                    "is-destroy": destroy
-                },
-                "relationships": {
-                    "workspace": {
-                        "data": {
-                            "type": "workspaces",
-                            "id": self.workspace_id
-                        }
-                    }
-                },
-                "type": "runs"
-            }
-        }
-
-    def _request_run_request(self, run_id=None, destroy=False):
+        self.notifications = notifications  # Optional TE2NotificationReceiver, replacing most polls
+        # Uploaded configuration hashes, pass a ConfigurationIndex with a path to share it between pipeline runs
+        self.configuration_index = configuration_index if configuration_index is not None else ConfigurationIndex()
+        # Poll for the run status only, then fetch the finished run with its plan and apply in one request
+        self.sparse_polling = sparse_polling
+        # run ID -> {"plan": document, "apply": document} of finished actions, of at most MAX_KEPT_RUNS runs
+        self._actions = OrderedDict()
+        self._actions_lock = threading.Lock()
+        # Optional RunDurationStats, so runs are polled around the time they usually finish
+        self.duration_stats = duration_stats
+        self._learned_durations = False
+        # Optional PlanCache, returning the last plan instead of planning unchanged inputs again
+        self.plan_cache = plan_cache
+
+    def _request_run_request(self, run_id=None, destroy=False, configuration_version_id=None, deadline=None):
         if run_id:  # Run an apply
             path = "/runs/" + run_id + "/actions/apply"
 
         else:  # Else, Run a Plan (and discard all existing plans)
-            self.discard_all_pending_runs()
+            self.discard_all_pending_runs(deadline=deadline)
             path = "/runs"
 
         if destroy:
-            vars = TE2WorkspaceVariables(client=self.client, workspace_name=self.workspace_name)
-            vars.create_or_update_workspace_variable(key="CONFIRM_DESTROY", value="1", category="env")
+            vars = TE2WorkspaceVariables(client=self.client, workspace_name=self.workspace_name,
+                                         workspace_id=self.workspace_id)
+            vars.create_or_update_workspace_variable(key="CONFIRM_DESTROY", value="1", category="env",
+                                                     deadline=deadline)
+
+        if configuration_version_id:
+            request_data = serializers.RUN_REQUEST_WITH_CONFIGURATION.render(
+                workspace_id=self.workspace_id, destroy=destroy, configuration_version_id=configuration_version_id
+            )
+        else:
+            request_data = serializers.RUN_REQUEST.render(workspace_id=self.workspace_id, destroy=destroy)
 
-        request = self.client.post(path=path, data=json.dumps(self._render_run_request(destroy)))
+        request = self.client.post(path=path, data=request_data, deadline=deadline)
 
         if str(request.status_code).startswith("2"):
-            return request.json()['data']
+            return self.client.decode(request)['data']
 
         else:
             raise SyntaxError("Invalid call to Terraform Enterprise 2")
 
-    def _get_run_results(self, run_id, request_type="plan", timeout_count=120):
+    def _get_run_results(self, run_id, request_type="plan", timeout_count=120, predicate=None, policy=None,
+                         deadline=None, cancellation=None, confirm=False):
         """
         Wait for plan/apply results, else timeout
 
         :param run_id: ID for the run
+        :param request_type: "plan" or "apply"
+        :param timeout_count: Maximum number of polls before giving up
+        :param predicate: Optional callable taking the run document, returning True once the run is complete
+        :param policy: Optional RunStatePolicy, replacing the default terminal states and poll intervals
+        :param deadline: Optional Deadline capping every poll and sleep, raising TimeoutError when it passes
+        :param cancellation: Optional CancellationToken. Once cancelled, the run is cancelled or discarded and
+                             concurrent.futures.CancelledError is raised.
+        :param confirm: Confirm the run once its plan awaits confirmation, so an apply goes ahead on workspaces
+                        without auto-apply
         :return: Returns object of the results.
         """
 
-        if request_type is not "plan" and request_type is not "apply":
-            raise KeyError("request_type must be Plan or Apply")
+        if policy is None:
+            policy = self._run_state_policy(request_type, predicate)
 
-        for x in range(0, timeout_count):
+        if self.notifications is not None:
+            self.notifications.watch(run_id)
 
-            request = self.client.get(path="/runs/" + run_id).json()
-            if request['data']['attributes']['status'] is not "planning" and \
-                            request['data']['attributes']['status'] is not "applying":
-                return request['data']
-
-            print("Job Status: " + request_type + "ing | " + str(x * 10) + " seconds")
-            time.sleep(10)
+        try:
+            elapsed = 0
+            first_poll_delay = policy.first_poll_delay()
+            if first_poll_delay and self.notifications is None:
+                elapsed += self._sleep(first_poll_delay, deadline, cancellation)
+
+            sparse = self.sparse_polling and not policy.needs_document
+            # actions tells whether a run that has planned is waiting for confirmation, or for later checks
+            params = jsonapi_params(fields={"runs": ["status", "actions"]}) if sparse else None
+
+            confirmed = False
+            # elapsed when the request type's own work started, which the policy schedules polls from: the run's
+            # creation for a plan, its confirmation for an apply
+            scheduled_from = 0 if policy.request_type == "plan" else None
+            for x in range(0, timeout_count):
+                if cancellation is not None:
+                    cancellation.check()
+
+                request = self.client.get(path="/runs/" + run_id, params=params, deadline=deadline)
+                status = self.client.decode_status(request)
+                needs_run = policy.needs_document or status in AWAITING_CONFIRMATION_STATES
+                run = self.client.decode(request)['data'] if needs_run else None
+
+                if policy.is_complete(status, run):
+                    if sparse:
+                        run = self.get_run_by_id(run_id, include=["plan", "apply"], deadline=deadline)
+                    elif run is None:
+                        run = self.client.decode(request)['data']
+                    self._record_duration(request_type, run)
+                    return run
+
+                if confirm and not confirmed and status in AWAITING_CONFIRMATION_STATES and is_confirmable(run):
+                    # Tried again at the next poll when the confirmation is rejected
+                    confirmed = self.confirm_run(run_id, deadline=deadline)
+                if scheduled_from is None and (confirmed or status in APPLYING_STATES):
+                    scheduled_from = elapsed
+
+                self.client.events.emit(
+                    events.RUN_POLLED, run_id=run_id, workspace=self.workspace_name, status=status, elapsed=elapsed
+                )
+                elapsed += self._wait_for_run(
+                    run_id, status, policy, deadline, elapsed - scheduled_from if scheduled_from is not None else None,
+                    cancellation
+                )
+        except CancelledError:
+            self.cancel_run(run_id)
+            raise
+        finally:
+            if self.notifications is not None:
+                self.notifications.unwatch(run_id)
 
         raise TimeoutError("Plan took too long to resolve")
 
+    def _run_state_policy(self, request_type, predicate=None):
+        """
+        A policy polling around the usual duration of request_type in this workspace, when it is known
+        """
+        if self.duration_stats is None:
+            return RunStatePolicy(request_type=request_type, predicate=predicate)
+
+        expected = self.duration_stats.expected(self.workspace_id, request_type)
+        if expected is None and not self._learned_durations:
+            self.learn_durations()
+            expected = self.duration_stats.expected(self.workspace_id, request_type)
+
+        if expected is None:
+            return RunStatePolicy(request_type=request_type, predicate=predicate)
+        return ScheduledRunStatePolicy(*expected, request_type=request_type, predicate=predicate)
+
+    def learn_durations(self):
+        """
+        Seed duration_stats from the timestamps of the workspace's past runs
+        """
+        self._learned_durations = True
+        try:
+            runs = self.get_workspace_runs(self.workspace_id)
+        except KeyError:
+            return
+        self.duration_stats.learn(self.workspace_id, runs)
+
+    def _record_duration(self, request_type, run):
+        if self.duration_stats is not None and run['attributes']['status'] in SUCCESSFUL_STATES[request_type]:
+            self.duration_stats.record_run(self.workspace_id, request_type, run)
+
+    @staticmethod
+    def _sleep(interval, deadline=None, cancellation=None):
+        if deadline is not None:
+            interval = deadline.cap(interval)
+        if cancellation is None:
+            time.sleep(interval)
+        elif cancellation.wait(interval):
+            cancellation.check()
+        return interval
+
+    def _wait_for_run(self, run_id, status, policy, deadline=None, elapsed=None, cancellation=None):
+        """
+        Wait until the run is worth polling again
+
+        Without a notification receiver this sleeps for the poll interval of the current state. With one, it
+        waits for a notification that may complete the run, or for the receiver's fallback poll interval.
+        Either wait is cut short by the deadline, and by the cancellation token.
+
+        :param elapsed: Seconds since the work of the request type started, None while it has not
+        :return: Seconds waited
+        """
+        if self.notifications is None:
+            return self._sleep(policy.poll_interval(status, elapsed), deadline, cancellation)
+
+        started = time.monotonic()
+        wait_until = started + self.notifications.fallback_poll_interval
+        if deadline is not None:
+            wait_until = min(wait_until, started + deadline.cap())
+        while True:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+
+            notified = self.notifications.wait(run_id, timeout=remaining, cancellation=cancellation)
+            if cancellation is not None:
+                cancellation.check()
+            if notified is None or policy.needs_document or policy.is_complete(notified):
+                break
+
+        return time.monotonic() - started
+
     def get_run_status(self, run_id):
         run = self.get_run_by_id(run_id)
 
@@ -116,26 +435,66 @@ class TE2WorkspaceRuns:
         else:
             raise KeyError("Run does not exist")
 
-    def get_workspace_runs(self, workspace_id):
-        run = self.client.get("/workspaces/" + workspace_id + "/runs")
+    def get_workspace_runs(self, workspace_id, deadline=None, fields=None):
+        run = self.client.get(
+            "/workspaces/" + workspace_id + "/runs", params=jsonapi_params(fields=fields), deadline=deadline
+        )
 
         if str(run.status_code).startswith("2"):
-            return run.json()['data']
+            return self.client.decode(run)['data']
         else:
             raise KeyError("Run does not exist")
 
-    def get_run_by_id(self, run_id):
-        run = self.client.get("/runs/" + run_id)
+    def get_run_by_id(self, run_id, include=None, fields=None, deadline=None):
+        """
+        :param include: Run actions to return in the same response, e.g. ["plan", "apply"]. Finished actions are
+                        kept, and get_run_action returns them without another request.
+        :param fields: Optional sparse fieldset, e.g. {"runs": ["status"]}, see jsonapi_params
+        """
+        run = self.client.get(
+            "/runs/" + run_id, params=jsonapi_params(fields=fields, include=include), deadline=deadline
+        )
 
         if str(run.status_code).startswith("2"):
-            return run.json()['data']
+            document = self.client.decode(run)
+            if document.get('included'):
+                self._remember_actions(document['data'], document['included'])
+            return document['data']
         else:
             raise KeyError("Run does not exist")
 
-    def discard_all_pending_runs(self):
+    def _remember_actions(self, run, included):
+        """Keep the included plan and apply of a run once they can no longer change"""
+        included = {(obj['type'], obj['id']): obj for obj in included}
+        status = run['attributes'].get('status')
+        finished = {"plan": status in TERMINAL_STATES["plan"], "apply": status in FINAL_STATES}
+
+        for request_type, action_type in ACTION_TYPES.items():
+            relationship = run.get('relationships', {}).get(request_type, {}).get('data') or {}
+            action = included.get((action_type, relationship.get('id')))
+            if action is not None and finished[request_type]:
+                with self._actions_lock:
+                    self._actions.setdefault(run['id'], {})[request_type] = action
+                    self._actions.move_to_end(run['id'])
+                    while len(self._actions) > MAX_KEPT_RUNS:
+                        self._actions.popitem(last=False)
+
+    def _kept_action(self, run_id, request_type):
+        with self._actions_lock:
+            actions = self._actions.get(run_id)
+            if actions is None:
+                return None
+            self._actions.move_to_end(run_id)
+            return actions.get(request_type)
+
+    def discard_all_pending_runs(self, deadline=None):
+        """
+        :param deadline: Optional Deadline, or budget in seconds, for the whole operation
+        """
+        deadline = Deadline.resolve(deadline)
 
         # Get Status of all pending plans
-        print("Discarding pending runs")
+        self.client.events.emit(events.RUNS_DISCARDING, workspace=self.workspace_name)
 
         runs_to_discard = True
         while runs_to_discard:
@@ -146,7 +505,11 @@ class TE2WorkspaceRuns:
             The list needs to be pulled on each iteration
             """
 
-            run_list = self.client.get(path="/workspaces/" + self.workspace_id + "/runs").json()['data']
+            run_list = self.client.decode(self.client.get(
+                path="/workspaces/" + self.workspace_id + "/runs",
+                params=jsonapi_params(fields={"runs": ["status"]}),
+                deadline=deadline
+            ))['data']
 
             for run in run_list:
 
@@ -154,17 +517,20 @@ class TE2WorkspaceRuns:
 
                 if run_status == "planned" or run_status == "pending" or run_status == "planning":
                     if run_status == "planned":
-                        print("Discarding: " + run["id"])
-                        self.discard_plan(run["id"])
+                        self.client.events.emit(
+                            events.RUN_DISCARDED, run_id=run["id"], workspace=self.workspace_name, status=run_status
+                        )
+                        self.discard_plan_by_id(run["id"], deadline=deadline)
                 else:
                     runs_to_discard = False
         return True
 
-    def discard_plan_by_id(self, run_id):
+    def discard_plan_by_id(self, run_id, deadline=None):
 
         request = self.client.post(
             path="/runs/" + run_id + "/actions/discard",
-            data=json.dumps({"comment": "Dropped by automated pipeline build"})
+            data=DISCARD_REQUEST,
+            deadline=deadline
         )
 
         if str(request.status_code).startswith("2"):
@@ -172,52 +538,245 @@ class TE2WorkspaceRuns:
         else:
             raise KeyError("Plan has already been discarded")
 
-    def get_run_action(self, run_id, request_type):
+    def confirm_run(self, run_id, deadline=None):
+        """
+        Confirm a run whose plan awaits confirmation, so it is applied
+
+        :return: True if the run was confirmed, False if Terraform Enterprise refused, e.g. as it is not
+                 confirmable yet
+        """
+        request = self.client.post(
+            path="/runs/" + run_id + "/actions/apply", data=CONFIRM_REQUEST, deadline=deadline
+        )
+        return str(request.status_code).startswith("2")
+
+    def cancel_run(self, run_id, status=None):
+        """
+        Stop a run in Terraform Enterprise, so it no longer holds the workspace
+
+        Runs waiting in the queue or for confirmation are discarded, runs planning or applying are cancelled.
+        Finished runs are left alone. Errors are not raised, the run may have finished in the meantime.
+
+        :param status: Current status of the run, looked up when not given
+        :return: "discard" or "cancel", the action taken, or None
+        """
+        try:
+            if status is None:
+                status = self.get_run_by_id(run_id, fields={"runs": ["status"]})['attributes']['status']
+            if status in FINAL_STATES:
+                return None
+
+            action = "discard" if status in DISCARDABLE_STATES else "cancel"
+            request = self.client.post(
+                path="/runs/" + run_id + "/actions/" + action,
+                data=DISCARD_REQUEST if action == "discard" else CANCEL_REQUEST
+            )
+        except (KeyError, OSError):
+            return None
+
+        if not str(request.status_code).startswith("2"):
+            return None
+
+        self.client.events.emit(
+            events.RUN_CANCELLED, run_id=run_id, workspace=self.workspace_name, status=status, action=action
+        )
+        return action
+
+    def get_run_action(self, run_id, request_type, use_included=True):
+        """
+        :param use_included: Return the action kept from an earlier compound document, when there is one
+        """
+        action = self._kept_action(run_id, request_type) if use_included else None
+        if action is not None:
+            return action
+
         run = self.client.get("/runs/" + run_id + "/" + request_type)
 
         if str(run.status_code).startswith("2"):
-            return run.json()['data']
+            return self.client.decode(run)['data']
 
         raise IndexError("Run or Action does not exist")
 
     # TODO: Get Run Log STUB
     def get_plan_log(self, run_id, request_type="plan"):
-        return self.get_run_action(run_id, request_type=request_type)['attributes']['log-read-url']
+        # Log URLs expire, so never read one from a kept action
+        return self.get_run_action(run_id, request_type=request_type, use_included=False)['attributes']['log-read-url']
 
-    def request_run(self, request_type="plan", destroy=False):
+    def get_plan_summary(self, run_id):
+        """
+        Resources the plan of a run will add, change and destroy
 
-        results = {}
+        Read from the plan object when it carries resource counts, else from the plan log.
 
+        :param run_id: ID for the run
+        :return: Dict of "additions", "changes", "destructions", "imports" and "has-changes"
+        """
+        kept = self._kept_action(run_id, "plan") is not None
+        plan = self.get_run_action(run_id, request_type="plan")
+
+        summary = plan_summary.summary_from_plan(plan)
+        if summary is None:
+            # The log URL of a kept plan may have expired, look a new one up
+            log_read_url = None if kept else plan['attributes']['log-read-url']
+            summary = self.stream_plan_summary(run_id, log_read_url=log_read_url)
+        return summary
+
+    def stream_plan_summary(self, run_id, log_read_url=None):
+        """
+        Read the plan log only as far as its summary line
+
+        :param run_id: ID for the run
+        :param log_read_url: The plan's log-read-url, looked up when not given
+        :return: Summary dict as from get_plan_summary, or None if the log has no summary (yet)
+        """
+        if log_read_url is None:
+            log_read_url = self.get_plan_log(run_id)
+
+        response = self.client.transport.request("GET", log_read_url, stream=True, timeout=self.client.timeout)
         try:
-            request = self._request_run_request(destroy=destroy)
-        except SyntaxError:
-            results = {}
-        else:
-            print("New Run: " + request['id'])
+            if not str(response.status_code).startswith("2"):
+                raise IndexError("Plan log does not exist")
+            return plan_summary.parse_plan_log(response.iter_lines())
+        finally:
+            response.close()
 
-            results = self._get_run_results(run_id=request['id'], request_type=request_type)
+    def upload_configuration(self, directory, **kwargs):
+        """
+        Upload a Terraform configuration directory, unless an identical configuration is already uploaded
 
-            if results['attributes']['status'] == "errored":
-                print("Job Status: Failed")
+        :return: Dict with the configuration version "id", "content-hash" and whether it was "uploaded"
+        """
+        return TE2ConfigurationVersions(
+            self.client, self.workspace_name, workspace_id=self.workspace_id, index=self.configuration_index
+        ).upload(directory, **kwargs)
 
-            elif results['attributes']['status'] == "planned":
-                if results['attributes']['has-changes']:
-                    print("Job Status: Changes Detected")
-                else:
-                    print("Job Status: No Changes Detected")
+    def get_current_configuration_version_id(self, deadline=None):
+        """
+        :return: ID of the configuration version runs use when none is given, or None if the workspace has none
+        """
+        workspace = self.client.get(
+            "/workspaces/" + self.workspace_id,
+            params=jsonapi_params(fields={"workspaces": ["current-configuration-version"]}), deadline=deadline
+        )
+
+        if str(workspace.status_code).startswith("2"):
+            relationships = self.client.decode(workspace)['data'].get('relationships', {})
+            return (relationships.get('current-configuration-version', {}).get('data') or {}).get('id')
+        else:
+            raise KeyError("Workspace does not exist")
+
+    def _plan_inputs(self, destroy, configuration, deadline=None):
+        """
+        :param configuration: content_hash of the directory to upload, or the configuration version ID to run.
+                              None for the workspace's current configuration version.
+        :return: PlanCache inputs of a plan, or None when the configuration it would run is not known
+        """
+        try:
+            if configuration is None:
+                configuration = self.get_current_configuration_version_id(deadline=deadline)
+                if configuration is None:
+                    return None
+            variables = TE2WorkspaceVariables(
+                client=self.client, workspace_name=self.workspace_name, workspace_id=self.workspace_id
+            ).get_workspace_variables(deadline=deadline)
+        except KeyError:
+            return None
+        # Destroy plans set CONFIRM_DESTROY themselves, so it only tells whether a destroy plan ran before. Whether
+        # this plan destroys is part of the inputs instead.
+        variables = [variable for variable in variables if variable['attributes']['key'] != "CONFIRM_DESTROY"]
+        return PlanCache.inputs(configuration, variables_fingerprint(variables), destroy)
+
+    def request_run(self, request_type="plan", destroy=False, predicate=None, configuration_directory=None,
+                    configuration_version_id=None, deadline=None, cancellation=None):
+        """
+        Create a run and wait for its results
+
+        :param request_type: "plan", or "apply" to confirm the run once planned and wait until it is applied
+        :param destroy: Plan to destroy every resource
+        :param predicate: Optional callable taking the run document, returning True once the run is complete
+        :param configuration_directory: Optional Terraform directory to upload and run, see upload_configuration
+        :param configuration_version_id: Optional configuration version to run, instead of the workspace's latest
+        :param deadline: Optional Deadline, or budget in seconds, for everything from discarding pending runs to
+                         the last poll
+        :param cancellation: Optional CancellationToken. Cancelling it stops waiting, and cancels or discards the run.
+        :return: The run, or an empty dict if it could not be created, did not finish before the deadline or was
+                 cancelled. With a plan_cache, a plan of the same configuration and variables as a recent successful
+                 plan returns that plan's run instead of creating one.
+        """
 
-            elif results['attributes']['status'] == "applied":
-                print("Job Status: Apply Successful")
+        results = {}
+        deadline = Deadline.resolve(deadline)
+        plan_inputs = None
+        digest = None
+
+        try:
+            if cancellation is not None:
+                cancellation.check()
+            if configuration_directory is not None:
+                # Hashed once, for both the plan cache and the check for an identical upload
+                digest = content_hash(configuration_directory)
+            if self.plan_cache is not None and request_type == "plan" and predicate is None:
+                plan_inputs = self._plan_inputs(
+                    destroy, digest if digest is not None else configuration_version_id, deadline
+                )
+                cached = self.plan_cache.get(self.workspace_id, plan_inputs) if plan_inputs is not None else None
+                if cached is not None:
+                    self.client.events.emit(
+                        events.PLAN_SKIPPED, run_id=cached['id'], workspace=self.workspace_name,
+                        status=cached['attributes']['status']
+                    )
+                    results = cached
+                    return results
+            if configuration_directory is not None:
+                configuration_version_id = self.upload_configuration(
+                    configuration_directory, deadline=deadline, digest=digest
+                )['id']
+            request = self._request_run_request(
+                destroy=destroy, configuration_version_id=configuration_version_id, deadline=deadline
+            )
+        except SyntaxError:
+            results = {}
+        else:
+            started = time.monotonic()
+            self.client.events.emit(events.RUN_CREATED, run_id=request['id'], workspace=self.workspace_name)
+
+            try:
+                results = self._get_run_results(
+                    run_id=request['id'], request_type=request_type, predicate=predicate, deadline=deadline,
+                    cancellation=cancellation, confirm=request_type == "apply"
+                )
+            except BaseException as e:
+                self.client.events.emit(
+                    events.RUN_ABANDONED, run_id=request['id'], workspace=self.workspace_name,
+                    elapsed=time.monotonic() - started, request_type=request_type, error=type(e).__name__
+                )
+                raise
+
+            self.client.events.emit(
+                events.RUN_COMPLETED,
+                run_id=request['id'],
+                workspace=self.workspace_name,
+                status=results['attributes']['status'],
+                elapsed=time.monotonic() - started,
+                request_type=request_type,
+                has_changes=results['attributes'].get('has-changes')
+            )
+
+            if plan_inputs is not None and results['attributes']['status'] in SUCCESSFUL_STATES["plan"]:
+                self.plan_cache.record(self.workspace_id, plan_inputs, results)
 
         finally:
             return results
 
 
 class TE2WorkspaceVariables():
-    def __init__(self, client, workspace_name):
+    def __init__(self, client, workspace_name, workspace_id=None, fingerprint_store=None):
         self.client = client  # Connectivity class to provide function calls.
         self.workspace_name = workspace_name
-        self.workspace_id = client.get_workspace_id(workspace_name)
+        # The ID can be passed in when it is already known, e.g. from a single listing of many workspaces
+        self.workspace_id = workspace_id if workspace_id is not None else client.get_workspace_id(workspace_name)
+        # Optional FingerprintStore, so unchanged sensitive variables are not rewritten
+        self.fingerprint_store = fingerprint_store
 
     @staticmethod
     def _render_request_data_workplace_variable_attributes(key, value, category, sensitive, hcl=False):
@@ -248,11 +807,11 @@ class TE2WorkspaceVariables():
             }
         }
 
-    def get_variable_by_name(self, name):
-        vars = self.get_workspace_variables()
+    def get_variable_by_name(self, name, deadline=None):
+        vars = self.get_workspace_variables(deadline=deadline)
 
         if vars:
-            for var in self.get_workspace_variables():
+            for var in vars:
                 if var['attributes']['key'] == name:
                     return var
         raise KeyError('Name: \'' + name + "\' does not exist")
@@ -280,44 +839,100 @@ class TE2WorkspaceVariables():
         for variable in variables:
             self.delete_variable_by_id(variable["id"])
 
-    def get_workspace_variables(self):
+    def get_workspace_variables(self, deadline=None):
         params = {
             "filter[organization][username]": self.client.organisation,
             "filter[workspace][name]": self.workspace_name
         }
 
-        request = self.client.get(path="/vars", params=params)
+        request = self.client.get(path="/vars", params=params, deadline=deadline)
 
         if str(request.status_code).startswith("2"):
-            return request.json()['data']
+            return self.client.decode(request)['data']
         else:
             raise KeyError('Keys or Workspace do not exist')  # TODO: Split later
 
-    # TODO: Error Handling
-    def create_or_update_workspace_variable(self, key, value, category="terraform", sensitive=False,
-                                            hcl=False):
-        # Data Validation
-        if category is not "env" and category is not "terraform":
+    @staticmethod
+    def _validate_variable(category, sensitive, hcl):
+        if category not in ("env", "terraform"):
             raise SyntaxError("Category should be 'env' or 'terraform")
         if sensitive is not True and sensitive is not False:
             raise SyntaxError('Sensitive should be True or False')
         if hcl is not True and hcl is not False:
             raise SyntaxError('hcl should be True or False')
 
-        request_data = self._render_request_data_workplace_variable_attributes(
-            key.replace(' ', '_'), value.replace(' ', '_'), category, sensitive, hcl
-        )
+    # TODO: Error Handling
+    def create_or_update_workspace_variable(self, key, value, category="terraform", sensitive=False,
+                                            hcl=False, deadline=None):
+        self._validate_variable(category, sensitive, hcl)
+        deadline = Deadline.resolve(deadline)
 
         try:
-            existing_variable = self.get_variable_by_name(key)
+            existing_variable = self.get_variable_by_name(key, deadline=deadline)
         except KeyError:
-            request_data["filter"] = self._render_request_data_workplace_filter()
-            request = self.client.post(path="/vars", data=json.dumps(request_data))
+            existing_variable = None
+
+        if self._is_unchanged(existing_variable, key, value, category, sensitive, hcl):
+            return True
+
+        return self._write_workspace_variable(key, value, category, sensitive, hcl, existing_variable, deadline)
+
+    def _is_unchanged(self, existing_variable, key, value, category, sensitive, hcl, normalise=True):
+        """
+        True when writing the variable would not change existing_variable
+
+        Sensitive values are never returned by the API, so they only compare equal through the fingerprint store.
+
+        :param normalise: Compare as create_or_update_workspace_variable writes, with spaces replaced by underscores
+        """
+        if existing_variable is None:
+            return False
+
+        attributes = existing_variable['attributes']
+        if attributes.get('category') != category or attributes.get('sensitive') != sensitive or \
+                bool(attributes.get('hcl')) != hcl:
+            return False
+
+        if normalise:
+            key, value = key.replace(' ', '_'), value.replace(' ', '_')
+        if not sensitive:
+            return attributes.get('value') == value
+
+        return self.fingerprint_store is not None and \
+            self.fingerprint_store.matches(self.workspace_id, key, value, category, hcl)
+
+    def _write_workspace_variable(self, key, value, category, sensitive, hcl, existing_variable=None, deadline=None,
+                                  normalise=True):
+        """
+        Create the variable, or update existing_variable (as returned by get_workspace_variables) in place
+
+        :param normalise: Replace spaces in the key and value with underscores, otherwise they are written verbatim
+        :return: True, or raises SyntaxError when the write is rejected
+        """
+        if normalise:
+            key, value = key.replace(' ', '_'), value.replace(' ', '_')
+        values = {
+            "key": key,
+            "value": value,
+            "category": category,
+            "sensitive": sensitive
+        }
+
+        if existing_variable is None:
+            request_data = serializers.variable_request(hcl=hcl, create=True).render(
+                organisation=self.client.organisation, workspace_name=self.workspace_name, **values
+            )
+            request = self.client.post(path="/vars", data=request_data, deadline=deadline)
         else:
-            request_data["data"]["id"] = existing_variable
-            request = self.client.patch(path="/vars/" + existing_variable, data=json.dumps(request_data))
+            variable_id = existing_variable['id']
+            request_data = serializers.variable_request(hcl=hcl, update=True).render(id=variable_id, **values)
+            request = self.client.patch(path="/vars/" + variable_id, data=request_data, deadline=deadline)
 
         if str(request.status_code).startswith("2"):
+            if self.fingerprint_store is not None and sensitive:
+                self.fingerprint_store.record(self.workspace_id, values["key"], values["value"], category, hcl)
             return True
         else:
+            if self.fingerprint_store is not None:
+                self.fingerprint_store.forget(self.workspace_id, values["key"])
             raise SyntaxError('Invalid Syntax')
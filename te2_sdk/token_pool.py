@@ -0,0 +1,124 @@
+"""
+Several API tokens shared by one client, each with its own rate limit.
+"""
+import threading
+import time
+
+DEFAULT_COOLDOWN = 60  # Seconds a throttled token rests when the response does not say how long
+
+
+def _header(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class _TokenState:
+    def __init__(self, token):
+        self.token = token
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.limit = None  # X-RateLimit-Limit of the last response
+        self.remaining = None  # X-RateLimit-Remaining of the last response
+        self.cooled_until = 0.0  # time.monotonic() before which the token is not used, unless all are cooling
+
+    def headroom(self):
+        if self.remaining is None:
+            return float("inf")
+        return self.remaining - self.in_flight
+
+
+class TokenPool:
+    def __init__(self, tokens, cooldown=DEFAULT_COOLDOWN):
+        """
+        Routes each request to the least loaded token
+
+        The token with the fewest requests in flight is used, then the one with the most rate limit headroom left
+        according to the X-RateLimit-Remaining header of its last response. A token answered with 429 Too Many
+        Requests rests until X-RateLimit-Reset (or Retry-After) has passed, cooldown seconds otherwise. When every
+        token is resting, the one that recovers first is used.
+
+        :param tokens: API tokens, e.g. of several team or user accounts
+        :param cooldown: Seconds a throttled token rests when the response does not say how long
+        """
+        tokens = list(tokens)
+        if not tokens:
+            raise ValueError("TokenPool needs at least one token")
+
+        self.tokens = tokens
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._states = {token: _TokenState(token) for token in tokens}
+
+    def acquire(self):
+        """
+        :return: Token to send the next request with. Pass it back to release once the response has arrived.
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = [self._states[token] for token in self.tokens]
+            ready = [state for state in states if state.cooled_until <= now]
+            if ready:
+                state = min(ready, key=lambda state: (state.in_flight, -state.headroom()))
+            else:
+                state = min(states, key=lambda state: state.cooled_until)
+
+            state.in_flight += 1
+            state.requests += 1
+            return state.token
+
+    def release(self, token, response=None):
+        """
+        :param token: Token returned by acquire
+        :param response: Response the request got, None if it failed without one
+        """
+        headers = (getattr(response, "headers", None) or {}) if response is not None else {}
+        limit = _header(headers, "X-RateLimit-Limit")
+        remaining = _header(headers, "X-RateLimit-Remaining")
+        reset = _header(headers, "X-RateLimit-Reset")
+        throttled = response is not None and response.status_code == 429
+
+        with self._lock:
+            state = self._states[token]
+            state.in_flight -= 1
+            if limit is not None:
+                state.limit = limit
+            if remaining is not None:
+                state.remaining = remaining
+
+            if throttled:
+                state.throttled += 1
+                wait = reset if reset is not None else _header(headers, "Retry-After")
+                state.cooled_until = time.monotonic() + (wait if wait is not None else self.cooldown)
+            elif remaining is not None and remaining <= 0 and reset is not None:
+                # Out of requests until the window resets, rest before getting a 429
+                state.cooled_until = time.monotonic() + reset
+
+    def stats(self):
+        """
+        :return: List of dicts per token, in the order given, without the tokens themselves
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "throttled": state.throttled,
+                    "limit": state.limit,
+                    "remaining": state.remaining,
+                    "cooling_for": max(state.cooled_until - now, 0.0),
+                }
+                for state in (self._states[token] for token in self.tokens)
+            ]
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getstate__(self):
+        return {"tokens": self.tokens, "cooldown": self.cooldown}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
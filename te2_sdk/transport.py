@@ -0,0 +1,232 @@
+"""
+HTTP transports used by TE2Client to send requests.
+"""
+import asyncio
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RequestsTransport:
+    def __init__(self, pooled=False, pool_maxsize=None):
+        """
+        Sends requests with the requests library.
+
+        Safe to share between threads: a pooled transport has one session per process, whose connection pool
+        hands each connection to one thread at a time.
+
+        :param pooled: Reuse connections through a requests.Session. The session belongs to the process that
+                       created it, and a new one is built after a fork or when the transport is unpickled.
+        :param pool_maxsize: Connections kept open per host, requests' default of 10 when None. Set it to the
+                             number of threads sharing the transport, or the connections beyond it are closed
+                             after every request.
+        """
+        self.pooled = pooled
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = self._session
+        if session is not None and self._pid == os.getpid():
+            return session
+
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                # Never close a session inherited over fork, its sockets are shared with the parent
+                session = requests.Session()
+                if self.pool_maxsize is not None:
+                    adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        """
+        :param stream: Return before the body is downloaded, read it with response.iter_lines() or iter_content()
+        :param timeout: Seconds, or a (connect, read) tuple, before requests raises requests.Timeout
+        """
+        kwargs = {"url": url, "headers": headers, "params": params}
+        if data is not None:
+            kwargs["data"] = data
+        if stream:
+            kwargs["stream"] = True
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        if self.pooled:
+            return self.session.request(method, **kwargs)
+        return getattr(requests, method.lower())(**kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+
+    def __getstate__(self):
+        return {"pooled": self.pooled, "pool_maxsize": self.pool_maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+async def _async_chunks(chunks):
+    """Yield the chunks of a blocking iterator, e.g. archive_chunks, without blocking the event loop"""
+    chunks = iter(chunks)
+    loop = asyncio.get_event_loop()  # The running loop, get_running_loop only exists from Python 3.7
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class _HTTPXResponse:
+    """A httpx response read like a requests one, e.g. iter_lines yields bytes"""
+
+    def __init__(self, response, run):
+        self._response = response
+        self._run = run  # Runs a coroutine on the transport's event loop
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    @property
+    def content(self):
+        return self._run(self._response.aread())
+
+    @property
+    def text(self):
+        self._run(self._response.aread())
+        return self._response.text
+
+    def json(self):
+        self._run(self._response.aread())
+        return self._response.json()
+
+    def _iterate(self, iterator):
+        while True:
+            try:
+                yield self._run(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def iter_content(self, chunk_size=1):
+        return self._iterate(self._response.aiter_bytes(chunk_size))
+
+    def iter_lines(self, chunk_size=None, delimiter=None):
+        for line in self._iterate(self._response.aiter_lines()):
+            yield line.encode("utf-8")
+
+    def close(self):
+        self._run(self._response.aclose())
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class HTTPXTransport:
+    def __init__(self, http2=True, max_connections=10, **client_options):
+        """
+        Sends requests with httpx, multiplexing concurrent requests over a few HTTP/2 connections.
+
+        Needs the http2 extra (pip install te2_sdk[http2]). Servers that do not offer HTTP/2 are spoken to over
+        pooled HTTP/1.1 connections. Requests from every thread are handed to one httpx.AsyncClient running on
+        an event loop thread, as httpx's synchronous HTTP/2 connections cannot be written to by several threads
+        at once. Like a pooled RequestsTransport, the loop and client belong to the process that started them.
+        Responses read like requests responses, and failed requests raise requests.Timeout or
+        requests.ConnectionError.
+
+        :param http2: Offer HTTP/2 to the server
+        :param max_connections: Connections open at most, each carrying many concurrent HTTP/2 requests
+        :param client_options: Passed on to httpx.AsyncClient, e.g. verify or http1=False for HTTP/2 without TLS
+        """
+        import httpx
+        if http2:
+            import h2  # noqa: F401  httpx only complains about a missing h2 when the first client is built
+
+        self._httpx = httpx
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.client_options = client_options
+        self._client = None
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                # As with sessions, a loop inherited over fork is left alone, its thread did not survive anyway
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="te2-http2", daemon=True).start()
+                self._loop = loop
+                self._client = self._run(self._create_client())
+                self._pid = os.getpid()
+            return self._client
+
+    async def _create_client(self):
+        return self._httpx.AsyncClient(
+            http2=self.http2,
+            limits=self._httpx.Limits(max_connections=self.max_connections),
+            **self.client_options
+        )
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    @property
+    def client(self):
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        return self._start()
+
+    def _timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self._httpx.Timeout(read, connect=connect)
+        return self._httpx.Timeout(timeout)
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        """
+        :param stream: Return before the body is downloaded, read it with response.iter_lines() or iter_content()
+        :param timeout: Seconds, or a (connect, read) tuple, before requests.Timeout is raised. None waits forever.
+        """
+        if isinstance(params, dict):
+            # requests leaves parameters set to None out of the query
+            params = {key: value for key, value in params.items() if value is not None}
+        if data is not None and not isinstance(data, (bytes, str)):
+            data = _async_chunks(data)
+
+        client = self.client
+        request = client.build_request(
+            method, url, headers=headers, params=params, content=data, timeout=self._timeout(timeout)
+        )
+        try:
+            response = self._run(client.send(request, stream=stream))
+        except self._httpx.TimeoutException as error:
+            raise requests.Timeout(str(error)) from error
+        except self._httpx.TransportError as error:
+            raise requests.ConnectionError(str(error)) from error
+        return _HTTPXResponse(response, self._run)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._run(self._client.aclose())
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._client = None
+            self._loop = None
+
+    def __getstate__(self):
+        return dict(self.client_options, http2=self.http2, max_connections=self.max_connections)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
@@ -0,0 +1,92 @@
+"""
+A local HTTP/2 server speaking cleartext HTTP/2 (h2c, prior knowledge), for tests and benchmarks.
+
+Every request is answered with a run document named after the last path segment, after delay seconds. Answers
+are sent from timer threads, so concurrent requests on one connection overlap like they would against the API.
+"""
+import json
+import socket
+import threading
+
+import h2.config
+import h2.connection
+import h2.events
+
+
+class H2StandIn:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(64)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:" + str(self._socket.getsockname()[1])
+
+    def close(self):
+        self._socket.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, sock):
+        connection = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        lock = threading.Lock()  # H2Connection and the socket are shared with the timer threads
+        paths = {}
+
+        def respond(stream_id, path):
+            body = json.dumps({"data": {"id": path.rsplit("/", 1)[-1], "type": "runs",
+                                        "attributes": {"status": "applied"}}}).encode()
+            with lock:
+                try:
+                    connection.send_headers(stream_id, [(":status", "200"),
+                                                        ("content-type", "application/vnd.api+json"),
+                                                        ("content-length", str(len(body)))])
+                    connection.send_data(stream_id, body, end_stream=True)
+                    sock.sendall(connection.data_to_send())
+                except Exception:
+                    pass  # The client went away
+
+        with lock:
+            connection.initiate_connection()
+            sock.sendall(connection.data_to_send())
+
+        while True:
+            try:
+                data = sock.recv(65535)
+            except OSError:
+                break
+            if not data:
+                break
+
+            with lock:
+                received = connection.receive_data(data)
+                for event in received:
+                    if isinstance(event, h2.events.RequestReceived):
+                        paths[event.stream_id] = dict(event.headers)[b":path"].decode()
+                    elif isinstance(event, h2.events.DataReceived):
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                sock.sendall(connection.data_to_send())
+
+            for event in received:
+                if isinstance(event, h2.events.StreamEnded):
+                    with self._lock:
+                        self.requests += 1
+                    timer = threading.Timer(self.delay, respond, (event.stream_id, paths.pop(event.stream_id)))
+                    timer.daemon = True
+                    timer.start()
+
+        sock.close()
@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.responses import responses as sample_responses
+from te2_sdk.bulk_variables import TE2MultiWorkspaceVariables, clone_variables, export_variables, \
+    import_variables, read_variable_snapshot
+from te2_sdk.te2 import TE2Client
+
+WORKSPACES = [
+    {"id": "ws-app-1-prod", "attributes": {"name": "app-1-prod"}},
+    {"id": "ws-app-2-prod", "attributes": {"name": "app-2-prod"}},
+    {"id": "ws-app-1-dev", "attributes": {"name": "app-1-dev"}},
+]
+
+
+def mock_get(path, params=None, deadline=None):
+    if params["filter[workspace][name]"] == "app-1-prod":
+        return MockResponse({"data": [dict(sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE, id="var-existing")]}, 200)
+    if params["filter[workspace][name]"] == "app-2-prod":
+        return MockResponse({"data": []}, 200)
+    return MockResponse(None, 404)
+
+
+class TestTE2MultiWorkspaceVariables(TestCase):
+    def setUp(self):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        patches = [
+            mock.patch.object(self.client, 'get_all_workspaces', return_value=WORKSPACES),
+            mock.patch.object(self.client, 'get', side_effect=mock_get),
+            mock.patch.object(self.client, 'post', return_value=MockResponse(None, 201)),
+            mock.patch.object(self.client, 'patch', return_value=MockResponse(None, 200)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_requires_selection(self):
+        self.assertRaises(KeyError, lambda: TE2MultiWorkspaceVariables(self.client))
+
+    def test_resolve_pattern(self):
+        workspace_ids, missing = TE2MultiWorkspaceVariables(self.client, pattern="app-*-prod").resolve_workspaces()
+        self.assertEqual(workspace_ids, {"app-1-prod": "ws-app-1-prod", "app-2-prod": "ws-app-2-prod"})
+        self.assertEqual(missing, set())
+        self.client.get_all_workspaces.assert_called_once_with(deadline=None, fields={"workspaces": ["name"]})
+
+    def test_resolve_names_single_listing(self):
+        workspace_ids, missing = TE2MultiWorkspaceVariables(
+            self.client, workspace_names=["app-1-dev", "app-3-prod"]
+        ).resolve_workspaces()
+
+        self.assertEqual(workspace_ids, {"app-1-dev": "ws-app-1-dev"})
+        self.assertEqual(missing, {"app-3-prod"})
+        self.assertEqual(self.client.get_all_workspaces.call_count, 1)
+
+    def test_push(self):
+        report = TE2MultiWorkspaceVariables(self.client, pattern="app-*-prod").push({
+            "key1": "rotated",
+            "TOKEN": {"value": "secret", "category": "env", "sensitive": True},
+        })
+
+        self.assertEqual(report["app-1-prod"]["updated"], ["key1"])
+        self.assertEqual(report["app-1-prod"]["created"], ["TOKEN"])
+        self.assertEqual(sorted(report["app-2-prod"]["created"]), ["TOKEN", "key1"])
+        self.assertEqual(self.client.patch.call_args[1]["path"], "/vars/var-existing")
+
+        created = [json.loads(call[1]["data"]) for call in self.client.post.call_args_list]
+        token = [body for body in created if body["data"]["attributes"]["key"] == "TOKEN"][0]
+        self.assertTrue(token["data"]["attributes"]["sensitive"])
+        self.assertEqual(token["data"]["attributes"]["category"], "env")
+
+    def test_push_skips_unchanged(self):
+        report = TE2MultiWorkspaceVariables(self.client, workspace_names=["app-1-prod"]).push({
+            "key1": {"value": "val-1", "category": "terraform"}
+        })
+
+        self.assertEqual(report["app-1-prod"]["unchanged"], ["key1"])
+        self.client.patch.assert_not_called()
+
+    def test_push_writes_values_verbatim(self):
+        push = TE2MultiWorkspaceVariables(self.client, workspace_names=["app-2-prod"]).push
+        report = push({"tags": {"value": '{ env = "prod" }', "hcl": True}})
+
+        self.assertEqual(report["app-2-prod"]["created"], ["tags"])
+        attributes = json.loads(self.client.post.call_args[1]["data"])["data"]["attributes"]
+        self.assertEqual(attributes["value"], '{ env = "prod" }')
+
+        written = {"id": "var-tags", "attributes": dict(attributes, hcl=True)}
+        with mock.patch.object(self.client, 'get', return_value=MockResponse({"data": [written]}, 200)):
+            report = push({"tags": {"value": '{ env = "prod" }', "hcl": True}})
+        self.assertEqual(report["app-2-prod"]["unchanged"], ["tags"])
+
+    def test_push_reports_errors(self):
+        self.client.post.return_value = MockResponse(None, 422)
+        report = TE2MultiWorkspaceVariables(self.client, workspace_names=["app-2-prod", "app-1-dev", "gone"]).push({
+            "key1": "value"
+        })
+
+        self.assertEqual(report["app-2-prod"]["errors"], {"key1": "Invalid Syntax"})
+        self.assertEqual(report["app-1-dev"]["error"], "Keys or Workspace do not exist")
+        self.assertEqual(report["gone"]["error"], "Workspace ID Cannot be found")
+
+    def test_push_validates_before_writing(self):
+        self.assertRaises(
+            SyntaxError,
+            lambda: TE2MultiWorkspaceVariables(self.client, pattern="*").push({"key1": {"value": "v", "category": "x"}})
+        )
+        self.client.get_all_workspaces.assert_not_called()
+
+
+TEMPLATE_VARIABLES = [
+    sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE,
+    {"id": "var-2", "attributes": {"key": "region", "value": "eu-west-1", "category": "env", "sensitive": False}},
+    {"id": "var-3", "attributes": {"key": "TOKEN", "value": None, "category": "env", "sensitive": True}},
+]
+
+
+def mock_template_get(path, params=None, deadline=None):
+    if params["filter[workspace][name]"] == "template":
+        return MockResponse({"data": TEMPLATE_VARIABLES}, 200)
+    return mock_get(path, params, deadline)
+
+
+class TestVariableSnapshots(TestCase):
+    def setUp(self):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+        workspaces = WORKSPACES + [{"id": "ws-template", "attributes": {"name": "template"}}]
+        patches = [
+            mock.patch.object(self.client, 'get_all_workspaces', return_value=workspaces),
+            mock.patch.object(self.client, 'get', side_effect=mock_template_get),
+            mock.patch.object(self.client, 'post', return_value=MockResponse(None, 201)),
+            mock.patch.object(self.client, 'patch', return_value=MockResponse(None, 200)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_export_import(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "template.jsonl")
+            self.assertEqual(export_variables(self.client, "template", path), 3)
+
+            snapshot = read_variable_snapshot(path)
+            self.assertEqual(snapshot[1], {"key": "region", "value": "eu-west-1", "category": "env",
+                                           "sensitive": False, "hcl": False})
+
+            report = import_variables(self.client, "app-1-prod", path)
+
+        self.assertEqual(report["unchanged"], ["key1"])
+        self.assertEqual(report["created"], ["region"])
+        self.assertEqual(report["skipped"], ["TOKEN"])
+
+    def test_clone(self):
+        report = clone_variables(self.client, "template", "app-2-prod")
+
+        self.assertEqual(sorted(report["created"]), ["key1", "region"])
+        self.assertEqual(report["skipped"], ["TOKEN"])
+        self.assertEqual(self.client.post.call_count, 2)
+        sources = [call for call in self.client.get.call_args_list
+                   if call[1]["params"]["filter[workspace][name]"] == "template"]
+        self.assertEqual(len(sources), 1)
+
+    def test_clone_to_many(self):
+        report = clone_variables(self.client, "template", ["app-1-prod", "app-2-prod"], max_workers=2)
+
+        self.assertEqual(report["app-1-prod"]["unchanged"], ["key1"])
+        self.assertEqual(sorted(report["app-2-prod"]["created"]), ["key1", "region"])
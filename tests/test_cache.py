@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import TestCase, mock, skipIf
+from tests.mocks import mocked_terraform_responses_gets as mock_gets
+from te2_sdk.cache import WorkspaceCache
+from te2_sdk import file_store
+from te2_sdk.file_store import JSONFileStore
+from te2_sdk.te2 import TE2Client
+
+
+def write_keys(path, prefix, count=25):
+    store = JSONFileStore(path)
+    for number in range(count):
+        store.update({prefix + str(number): number})
+
+
+class TestJSONFileStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "nested", "store.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_missing(self):
+        self.assertEqual(JSONFileStore(self.path).load(), {})
+
+    def test_update_merges(self):
+        JSONFileStore(self.path).update({"a": 1})
+        JSONFileStore(self.path).update({"b": 2})
+        self.assertEqual(JSONFileStore(self.path).load(), {"a": 1, "b": 2})
+
+    def test_update_remove(self):
+        store = JSONFileStore(self.path)
+        store.update({"a": 1, "b": 2})
+        self.assertEqual(store.update(remove=["a"]), {"b": 2})
+
+    @skipIf(file_store.fcntl is None, "writers in other processes are only serialised with fcntl")
+    def test_processes_keep_each_others_keys(self):
+        processes = [multiprocessing.Process(target=write_keys, args=(self.path, "process-" + str(number) + "-"))
+                     for number in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual([process.exitcode for process in processes], [0, 0, 0, 0])
+        self.assertEqual(len(JSONFileStore(self.path).load()), 100)
+
+    def test_load_corrupt(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(JSONFileStore(self.path).load(), {})
+
+
+class TestWorkspaceCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "workspaces.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_in_memory(self):
+        cache = WorkspaceCache()
+        cache.update({"key": "ws-1"})
+        self.assertEqual(cache.get("key"), "ws-1")
+        self.assertIsNone(cache.get("other"))
+
+    def test_shared_on_disk(self):
+        WorkspaceCache(self.path).update({"key": "ws-1"})
+        self.assertEqual(WorkspaceCache(self.path).get("key"), "ws-1")
+
+    def test_ttl(self):
+        cache = WorkspaceCache(ttl=60)
+        cache.update({"key": "ws-1"})
+        with mock.patch('te2_sdk.cache.time.time', return_value=cache._entries["key"][1] + 61):
+            self.assertIsNone(cache.get("key"))
+
+    def test_invalidate(self):
+        cache = WorkspaceCache(self.path)
+        cache.update({"key": "ws-1"})
+        cache.invalidate("key")
+        self.assertIsNone(WorkspaceCache(self.path).get("key"))
+
+
+class TestTE2ClientWorkspaceCache(TestCase):
+    def setUp(self):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com",
+            workspace_cache=WorkspaceCache()
+        )
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_one_listing_for_many_lookups(self, get):
+        self.assertEqual(self.client.get_workspace_id("Example_Workspace_1"), "ws-example1")
+        self.client.get_workspace_id("Example_Workspace_1")
+        self.assertEqual(get.call_count, 1)
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_get_workspace_ids(self, get):
+        self.assertEqual(
+            self.client.get_workspace_ids(["Example_Workspace_1", "Fake_Workspace"]),
+            {"Example_Workspace_1": "ws-example1"}
+        )
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_missing_workspace(self, get):
+        self.assertRaises(KeyError, lambda: self.client.get_workspace_id("Fake_Workspace"))
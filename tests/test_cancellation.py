@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.test_run_states import run_response
+from te2_sdk.cancellation import CancellationToken
+from te2_sdk.dag import CANCELLED, SKIPPED, TE2WorkspaceGraph
+from te2_sdk.notifications import TE2NotificationReceiver
+from te2_sdk.scheduler import TE2RunScheduler
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+class TestCancellationToken(TestCase):
+    def test_cancel(self):
+        token = CancellationToken()
+        token.check()
+        self.assertTrue(token.cancel("ws_a failed"))
+        self.assertFalse(token.cancel("again"))
+        self.assertTrue(token.cancelled())
+        self.assertEqual(token.reason, "ws_a failed")
+        self.assertRaises(CancelledError, token.check)
+
+    def test_callbacks(self):
+        token = CancellationToken()
+        called = []
+        token.add_callback(lambda: called.append(1))
+        removed = token.add_callback(lambda: called.append(2))
+        token.remove_callback(removed)
+        token.cancel()
+        token.add_callback(lambda: called.append(3))
+        self.assertEqual(called, [1, 3])
+
+    def test_parents(self):
+        parent, other = CancellationToken(), CancellationToken()
+        child = CancellationToken(parent, other)
+        parent.cancel("batch failed")
+        self.assertTrue(child.cancelled())
+        self.assertEqual(child.reason, "batch failed")
+
+        detached = CancellationToken(other)
+        detached.detach()
+        other.cancel()
+        self.assertFalse(detached.cancelled())
+
+    def test_wait_interrupted(self):
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        started = time.monotonic()
+        self.assertTrue(token.wait(5))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class TestRunCancellation(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    def test_cancel_run_action(self):
+        for status, action in [("planning", "cancel"), ("applying", "cancel"), ("pending", "discard"),
+                               ("planned", "discard"), ("applied", None)]:
+            with mock.patch.object(self.client, 'post', return_value=MockResponse({}, 202)) as post:
+                self.assertEqual(self.runs.cancel_run("run-testID", status=status), action)
+            if action is None:
+                post.assert_not_called()
+            else:
+                self.assertEqual(post.call_args[1]["path"], "/runs/run-testID/actions/" + action)
+
+    def test_cancel_run_looks_up_status(self):
+        with mock.patch.object(self.client, 'get', return_value=run_response("planning")) as get, \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({}, 409)):
+            self.assertIsNone(self.runs.cancel_run("run-testID"))
+        self.assertEqual(get.call_args[1]["params"], {"fields[runs]": "status"})
+
+    def test_cancel_interrupts_sleep(self):
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+
+        started = time.monotonic()
+        with mock.patch.object(self.client, 'get', return_value=run_response("planning")), \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({}, 202)) as post:
+            self.assertRaises(CancelledError, lambda: self.runs._get_run_results("run-testID", cancellation=token))
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(post.call_args[1]["path"], "/runs/run-testID/actions/cancel")
+
+    def test_cancel_interrupts_notification_wait(self):
+        self.runs.notifications = TE2NotificationReceiver(token="secret", fallback_poll_interval=30)
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+
+        started = time.monotonic()
+        with mock.patch.object(self.client, 'get', return_value=run_response("planning")), \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({}, 202)):
+            self.assertRaises(CancelledError, lambda: self.runs._get_run_results("run-testID", cancellation=token))
+        self.runs.notifications.stop()
+
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_request_run_cancelled_before_start(self):
+        token = CancellationToken()
+        token.cancel()
+        with mock.patch.object(self.client, 'post') as post:
+            self.assertEqual(self.runs.request_run(cancellation=token), {})
+        post.assert_not_called()
+
+
+class BlockingRuns:
+    """Fails one workspace straight away, the others wait until cancelled"""
+
+    def __init__(self, workspace_name, failing, log):
+        self.workspace_name = workspace_name
+        self.failing = failing
+        self.log = log
+
+    def request_run(self, request_type="plan", cancellation=None, **kwargs):
+        self.log.append(self.workspace_name)
+        if self.workspace_name == self.failing:
+            return {"attributes": {"status": "errored"}}
+        if cancellation.wait(5):
+            return {}
+        return {"attributes": {"status": "applied"}}
+
+
+class TestBatchFailFast(TestCase):
+    def test_graph_fail_fast(self):
+        log = []
+        graph = TE2WorkspaceGraph(
+            None, {"a": [], "b": [], "c": ["b"]}, max_workers=2,
+            runs_factory=lambda client, name: BlockingRuns(name, "a", log)
+        )
+
+        started = time.monotonic()
+        report = graph.run(fail_fast=True)
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertFalse(report["succeeded"])
+        statuses = {name: node["status"] for name, node in report["workspaces"].items()}
+        self.assertEqual(statuses, {"a": "errored", "b": CANCELLED, "c": SKIPPED})
+        self.assertNotIn("c", log)
+
+    def test_scheduler_cancel(self):
+        scheduler = TE2RunScheduler(
+            client=None, max_concurrent=1, runs_factory=lambda client, name: BlockingRuns(name, None, [])
+        )
+        running = scheduler.submit("ws_a", "apply")
+        queued = scheduler.submit("ws_b", "apply")
+
+        scheduler.cancel("pipeline failed")
+        self.assertEqual(running.result(5), {})
+        self.assertTrue(queued.cancelled())
+
+        # Requests submitted after cancel run, and their own tokens still cancel them
+        own = CancellationToken()
+        later = scheduler.submit("ws_c", "apply", cancellation=own)
+        own.cancel()
+        self.assertEqual(later.result(5), {})
+        scheduler.shutdown()
@@ -0,0 +1,126 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.mocks import mocked_terraform_responses_gets as mock_gets
+from tests.responses import responses as sample_responses
+from te2_sdk.cassette import CassetteResponse, RecordingTransport, ReplayTransport
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+class FakeTransport:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        if data is not None and not isinstance(data, (str, bytes)):
+            data = b"".join(data)
+        self.calls.append((method, url, params, data))
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+class TestCassette(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cassette.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self, responses, path=None):
+        return RecordingTransport(path or self.path, transport=FakeTransport(responses))
+
+    def test_record_and_replay(self):
+        recorder = self.record([MockResponse({"data": {"id": "run-1"}}, 201), MockResponse({"data": []}, 200)])
+        recorder.request("POST", "https://tf-api.com/runs", headers={"Authorization": "Bearer secret"}, data='{"a":1}')
+        recorder.request("GET", "https://tf-api.com/vars", params={"filter[workspace][name]": "ws"})
+
+        with open(self.path) as f:
+            self.assertNotIn("secret", f.read())
+
+        replay = ReplayTransport(self.path, time_scale=0)
+        response = replay.request("GET", "https://tf-api.com/vars", params={"filter[workspace][name]": "ws"})
+        self.assertEqual(response.json(), {"data": []})
+        self.assertEqual(replay.request("POST", "https://tf-api.com/runs", data=b'{"a":1}').status_code, 201)
+        self.assertEqual(replay.remaining(), 0)
+
+    def test_repeated_requests_replay_in_order(self):
+        recorder = self.record([MockResponse({"status": status}, 200) for status in ("planning", "planned")])
+        for _ in range(2):
+            recorder.request("GET", "https://tf-api.com/runs/run-1")
+
+        replay = ReplayTransport(self.path, time_scale=0)
+        statuses = [replay.request("GET", "https://tf-api.com/runs/run-1").json()["status"] for _ in range(3)]
+        self.assertEqual(statuses, ["planning", "planned", "planned"])
+
+    def test_unrecorded_request(self):
+        self.record([MockResponse({}, 200)]).request("GET", "https://tf-api.com/runs/run-1")
+
+        replay = ReplayTransport(self.path, time_scale=0)
+        self.assertRaises(KeyError, lambda: replay.request("GET", "https://tf-api.com/runs/run-2"))
+        self.assertRaises(KeyError, lambda: replay.request("POST", "https://tf-api.com/runs/run-1", data="{}"))
+
+        strict = ReplayTransport(self.path, time_scale=0, repeat_last=False)
+        strict.request("GET", "https://tf-api.com/runs/run-1")
+        self.assertRaises(KeyError, lambda: strict.request("GET", "https://tf-api.com/runs/run-1"))
+
+    def test_streamed_body_and_binary_response(self):
+        binary = CassetteResponse(200, b"\x1f\x8b\x00\xff")
+        self.record([binary]).request("PUT", "https://archivist/upload", data=iter([b"chunk-1", b"chunk-2"]))
+
+        response = ReplayTransport(self.path, time_scale=0).request(
+            "PUT", "https://archivist/upload", data=iter([b"chunk-1", b"chunk-2"])
+        )
+        self.assertEqual(response.content, b"\x1f\x8b\x00\xff")
+
+    def test_gzip_cassette(self):
+        path = self.path + ".gz"
+        self.record([MockResponse({"data": []}, 200)], path=path).request("GET", "https://tf-api.com/runs/run-1")
+
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(json.loads(f.readline())["url"], "https://tf-api.com/runs/run-1")
+        self.assertEqual(ReplayTransport(path, time_scale=0).request("GET", "https://tf-api.com/runs/run-1").json(),
+                         {"data": []})
+
+    @mock.patch('te2_sdk.cassette.time.sleep')
+    def test_time_scale(self, sleep):
+        self.record([MockResponse({}, 200)]).request("GET", "https://tf-api.com/runs/run-1")
+        with open(self.path) as f:
+            interaction = json.loads(f.readline())
+
+        ReplayTransport(self.path, time_scale=0.5).request("GET", "https://tf-api.com/runs/run-1")
+        sleep.assert_called_once_with(interaction["latency"] * 0.5)
+
+    def test_iter_lines(self):
+        response = CassetteResponse(200, b"line 1\nline 2\n")
+        self.assertEqual(list(response.iter_lines()), [b"line 1", b"line 2"])
+        self.assertEqual(list(response.iter_lines(decode_unicode=True)), ["line 1", "line 2"])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_replay_run_through_client(self, *args, **kwargs):
+        run = MockResponse({"data": sample_responses.SAMPLE_GET_WORKSPACE_RUN}, 200)
+        recorder = self.record([run])
+        client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com",
+                           transport=recorder)
+        with mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1"):
+            runs = TE2WorkspaceRuns(client=client, workspace_name="Example_Workspace_1")
+        recorded = runs._get_run_results("run-testID", request_type="apply")
+
+        client.transport = ReplayTransport(self.path, time_scale=0)
+        self.assertEqual(runs._get_run_results("run-testID", request_type="apply"), recorded)
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_record_default_transport(self, *args, **kwargs):
+        client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com",
+                           transport=RecordingTransport(self.path))
+        self.assertEqual(client.get_workspace_id("Example_Workspace_1"), "ws-example1")
+
+        client.transport = ReplayTransport(self.path, time_scale=0)
+        self.assertEqual(client.get_all_workspaces(fields={"workspaces": ["name"]}),
+                         sample_responses.SAMPLE_GET_WORKSPACES_RESPONSE)
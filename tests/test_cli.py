@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.responses import responses as sample_responses
+from te2_sdk import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GLOBAL_ARGS = ["--organisation", "TestOrg", "--token", "Test_Token", "--base-url", "https://tf-api.com", "-q"]
+
+
+def run_with_changes(status, has_changes):
+    run = json.loads(json.dumps(sample_responses.SAMPLE_GET_WORKSPACE_RUN))
+    run['attributes']['status'] = status
+    run['attributes']['has-changes'] = has_changes
+    return run
+
+
+class TestCLI(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.directory.name, "workspaces.json")
+        self.args = GLOBAL_ARGS + ["--cache", self.cache]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def main(self, *argv):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            exit_code = cli.main(self.args + list(argv))
+        return exit_code, stdout.getvalue()
+
+    def test_cached_workspace_id_does_not_import_requests(self):
+        with open(self.cache, "w") as f:
+            json.dump({"https://tf-api.com/organizations/TestOrg/workspaces/example": ["ws-example1", 4102444800]}, f)
+
+        script = (
+            "import sys; from te2_sdk.cli import main; code = main(sys.argv[1:]); "
+            "assert 'requests' not in sys.modules, 'requests was imported'; sys.exit(code)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script] + self.args + ["workspace-id", "example"],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "ws-example1")
+
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', side_effect=KeyError('Workspace ID Cannot be found'))
+    def test_unknown_workspace_id(self, *args, **kwargs):
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            self.assertEqual(self.main("workspace-id", "missing")[0], cli.EXIT_FAILED)
+
+    def test_missing_credentials(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertRaises(SystemExit, lambda: cli.main(["--cache", self.cache, "status", "run-testID"]))
+
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.request_run', return_value=run_with_changes("planned", True))
+    def test_plan_detailed_exitcode(self, request_run, *args, **kwargs):
+        exit_code, output = self.main("plan", "Example_Workspace_1", "--detailed-exitcode")
+
+        self.assertEqual(exit_code, cli.EXIT_CHANGES)
+        self.assertEqual(json.loads(output)['attributes']['status'], "planned")
+        request_run.assert_called_once_with(
+            request_type="plan", destroy=False, configuration_directory=None, deadline=None
+        )
+
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.request_run', autospec=True,
+                return_value=run_with_changes("planned", False))
+    def test_plan_reuse(self, request_run, *args, **kwargs):
+        self.assertEqual(self.main("plan", "Example_Workspace_1", "--reuse-plan", "600")[0], cli.EXIT_OK)
+        self.assertEqual(request_run.call_args[0][0].plan_cache.max_age, 600)
+
+        self.main("plan", "Example_Workspace_1")
+        self.assertIsNone(request_run.call_args[0][0].plan_cache)
+
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.request_run', return_value=run_with_changes("planned", True))
+    def test_plan_without_detailed_exitcode(self, *args, **kwargs):
+        self.assertEqual(self.main("plan", "Example_Workspace_1")[0], cli.EXIT_OK)
+
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.request_run', return_value=run_with_changes("errored", False))
+    def test_apply_errored(self, request_run, *args, **kwargs):
+        self.assertEqual(self.main("apply", "Example_Workspace_1", "--destroy")[0], cli.EXIT_FAILED)
+        request_run.assert_called_once_with(
+            request_type="apply", destroy=True, configuration_directory=None, deadline=None
+        )
+
+    @mock.patch('te2_sdk.transport.requests.get',
+                return_value=MockResponse({"data": sample_responses.SAMPLE_GET_WORKSPACE_RUN}, 200))
+    def test_status(self, get):
+        exit_code, output = self.main("status", "run-testID")
+        self.assertEqual(exit_code, cli.EXIT_OK)
+        self.assertEqual(output.strip(), sample_responses.SAMPLE_GET_WORKSPACE_RUN['attributes']['status'])
+        self.assertEqual(get.call_args[1]['url'], "https://tf-api.com/runs/run-testID")
+
+    @mock.patch('te2_sdk.bulk_variables.TE2MultiWorkspaceVariables.push')
+    def test_vars_sync(self, push):
+        push.return_value = {"ws_a": {"created": ["region"], "updated": [], "unchanged": [], "errors": {}, "error": None}}
+
+        exit_code, output = self.main("vars", "sync", "ws_a", "--set", "region=eu-west-1", "--category", "env")
+
+        self.assertEqual(exit_code, cli.EXIT_OK)
+        self.assertEqual(json.loads(output)["ws_a"]["created"], ["region"])
+        push.assert_called_once_with(
+            {"region": {"value": "eu-west-1", "category": "env", "sensitive": False, "hcl": False}}, deadline=None
+        )
+
+    def test_vars_sync_bad_assignment(self):
+        self.assertRaises(SystemExit, lambda: self.main("vars", "sync", "ws_a", "--set", "region"))
@@ -0,0 +1,174 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.configuration import TE2ConfigurationVersions, ConfigurationIndex, archive_chunks, content_hash
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+def configuration_version(status="pending"):
+    return MockResponse({"data": {
+        "id": "cv-testID",
+        "type": "configuration-versions",
+        "attributes": {"status": status, "upload-url": "https://archivist.com/upload"}
+    }}, 200)
+
+
+class ConfigurationDirectoryTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.write("main.tf", 'resource "null_resource" "a" {}\n')
+        self.write("modules/app/main.tf", 'variable "name" {}\n')
+        self.write(".terraform/plugins/provider", "binary")
+        self.write(".git/HEAD", "ref: refs/heads/master")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+class TestArchive(ConfigurationDirectoryTestCase):
+    def test_content_hash_stable(self):
+        self.assertEqual(content_hash(self.directory.name), content_hash(self.directory.name))
+
+    def test_content_hash_ignores_excluded(self):
+        digest = content_hash(self.directory.name)
+        self.write(".terraform/plugins/provider", "changed")
+        self.assertEqual(content_hash(self.directory.name), digest)
+
+    def test_content_hash_changes(self):
+        digest = content_hash(self.directory.name)
+        self.write("modules/app/main.tf", 'variable "other" {}\n')
+        self.assertNotEqual(content_hash(self.directory.name), digest)
+
+    def test_archive_contents(self):
+        archive = io.BytesIO(b"".join(archive_chunks(self.directory.name)))
+        with tarfile.open(fileobj=archive, mode="r:gz") as tar:
+            self.assertEqual(sorted(tar.getnames()), ["main.tf", "modules/app/main.tf"])
+            self.assertEqual(tar.extractfile("main.tf").read(), b'resource "null_resource" "a" {}\n')
+
+    @mock.patch('te2_sdk.configuration.CHUNK_SIZE', 1024)
+    def test_archive_streams_chunks(self):
+        self.write("large.tf", os.urandom(64 * 1024).hex())
+        chunks = list(archive_chunks(self.directory.name, max_buffered_chunks=2))
+        self.assertGreater(len(chunks), 2)
+
+    def test_archive_abandoned(self):
+        self.write("large.tf", os.urandom(256 * 1024).hex())
+        chunks = archive_chunks(self.directory.name, max_buffered_chunks=1)
+        next(chunks)
+        chunks.close()  # Must not leave the producer thread blocked
+
+
+class TestTE2ConfigurationVersions(ConfigurationDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.uploads = []
+
+        def put(method, url, headers=None, params=None, data=None, timeout=None):
+            self.uploads.append(b"".join(data))
+            return MockResponse(None, 200)
+
+        patches = [
+            mock.patch.object(self.client, 'post', return_value=configuration_version()),
+            mock.patch.object(self.client, 'get', return_value=configuration_version("uploaded")),
+            mock.patch.object(self.client.transport, 'request', side_effect=put),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.versions = TE2ConfigurationVersions(self.client, "Example_Workspace_1", workspace_id="ws-example1")
+
+    def test_upload(self):
+        result = self.versions.upload(self.directory.name)
+
+        self.assertEqual(
+            result,
+            {"id": "cv-testID", "content-hash": content_hash(self.directory.name), "uploaded": True}
+        )
+        self.assertEqual(len(self.uploads), 1)
+        self.assertEqual(self.client.post.call_args[1]["path"], "/workspaces/ws-example1/configuration-versions")
+        self.assertFalse(json.loads(self.client.post.call_args[1]["data"])["data"]["attributes"]["auto-queue-runs"])
+
+    def test_identical_upload_skipped(self):
+        self.versions.upload(self.directory.name)
+        result = self.versions.upload(self.directory.name)
+
+        self.assertFalse(result["uploaded"])
+        self.assertEqual(result["id"], "cv-testID")
+        self.assertEqual(len(self.uploads), 1)
+
+    def test_index_shared_on_disk(self):
+        index_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(index_directory.cleanup)
+        path = os.path.join(index_directory.name, "configurations.json")
+
+        TE2ConfigurationVersions(self.client, "ws", "ws-example1", index=ConfigurationIndex(path)).upload(
+            self.directory.name
+        )
+        result = TE2ConfigurationVersions(self.client, "ws", "ws-example1", index=ConfigurationIndex(path)).upload(
+            self.directory.name
+        )
+        self.assertFalse(result["uploaded"])
+
+    def test_changed_configuration_uploaded(self):
+        self.versions.upload(self.directory.name)
+        self.write("main.tf", "# changed\n")
+        self.assertTrue(self.versions.upload(self.directory.name)["uploaded"])
+
+    def test_missing_version_uploaded_again(self):
+        self.versions.upload(self.directory.name)
+        self.client.get.side_effect = [MockResponse(None, 404), configuration_version("uploaded")]
+        self.assertTrue(self.versions.upload(self.directory.name)["uploaded"])
+        self.assertEqual(len(self.uploads), 2)
+
+    @mock.patch('te2_sdk.configuration.time.sleep')
+    def test_upload_errored(self, *args, **kwargs):
+        self.client.get.return_value = configuration_version("errored")
+        self.assertRaises(SyntaxError, lambda: self.versions.upload(self.directory.name))
+
+
+class TestRunWithConfiguration(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
+    def test_request_run_request_configuration(self, *args, **kwargs):
+        with mock.patch.object(self.client, 'post', return_value=MockResponse({"data": {"id": "run-1"}}, 201)) as post:
+            self.runs._request_run_request(configuration_version_id="cv-testID")
+
+        request = json.loads(post.call_args[1]["data"])
+        self.assertEqual(request['data']['relationships']['configuration-version']['data'],
+                         {"type": "configuration-versions", "id": "cv-testID"})
+        self.assertEqual(request['data']['relationships']['workspace']['data']['id'], "ws-example1")
+        self.assertFalse(request['data']['attributes']['is-destroy'])
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', return_value={"attributes": {"status": "planned"}})
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request', return_value={"id": "run-1"})
+    @mock.patch('te2_sdk.te2.TE2ConfigurationVersions.upload', return_value={"id": "cv-testID"})
+    @mock.patch('te2_sdk.te2.content_hash', return_value="digest")
+    def test_request_run_uploads_directory(self, content_hash, upload, request_run_request, *args, **kwargs):
+        self.runs.request_run(configuration_directory="/config")
+
+        upload.assert_called_once_with("/config", deadline=None, digest="digest")
+        self.assertEqual(request_run_request.call_args[1]["configuration_version_id"], "cv-testID")
@@ -0,0 +1,115 @@
+import threading
+import time
+from unittest import TestCase
+from te2_sdk.dag import TE2WorkspaceGraph
+
+
+class FakeRuns:
+    def __init__(self, outcomes, log, workspace_name):
+        self.outcomes = outcomes
+        self.log = log
+        self.workspace_name = workspace_name
+
+    def request_run(self, request_type="plan", **kwargs):
+        self.log.append(self.workspace_name)
+        delay, status = self.outcomes.get(self.workspace_name, (0, "applied"))
+        time.sleep(delay)
+        if isinstance(status, Exception):
+            raise status
+        if status is None:
+            return {}
+        return {"id": "run-" + self.workspace_name, "attributes": {"status": status}}
+
+
+class TestWorkspaceGraph(TestCase):
+    def graph(self, dependencies, outcomes=None, max_workers=4):
+        self.log = []
+        outcomes = outcomes or {}
+        return TE2WorkspaceGraph(
+            client=None,
+            dependencies=dependencies,
+            max_workers=max_workers,
+            runs_factory=lambda client, name: FakeRuns(outcomes, self.log, name)
+        )
+
+    def test_waves(self):
+        graph = self.graph({"cluster": ["network"], "app_a": ["cluster"], "app_b": ["cluster"], "dns": []})
+        self.assertEqual(graph.waves(), [["dns", "network"], ["cluster"], ["app_a", "app_b"]])
+
+    def test_cycle(self):
+        self.assertRaises(ValueError, lambda: self.graph({"a": ["b"], "b": ["a"]}))
+
+    def test_applies_in_dependency_order(self):
+        report = self.graph({"cluster": ["network"], "app": ["cluster"]}).run()
+
+        self.assertTrue(report["succeeded"])
+        self.assertEqual(self.log, ["network", "cluster", "app"])
+        self.assertEqual({name: node["status"] for name, node in report["workspaces"].items()},
+                         {"network": "applied", "cluster": "applied", "app": "applied"})
+        self.assertLessEqual(report["workspaces"]["network"]["finished"], report["workspaces"]["cluster"]["started"])
+
+    def test_independent_workspaces_run_in_parallel(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        class CountingRuns(FakeRuns):
+            def request_run(self, request_type="plan", **kwargs):
+                with lock:
+                    running.append(self.workspace_name)
+                    peak.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.remove(self.workspace_name)
+                return {"attributes": {"status": "applied"}}
+
+        graph = TE2WorkspaceGraph(None, {"a": [], "b": [], "c": []}, max_workers=3,
+                                  runs_factory=lambda client, name: CountingRuns({}, [], name))
+        self.assertTrue(graph.run()["succeeded"])
+        self.assertEqual(max(peak), 3)
+
+    def test_dependent_starts_without_waiting_for_wave(self):
+        report = self.graph(
+            {"slow": [], "fast": [], "after_fast": ["fast"]},
+            {"slow": (0.2, "applied"), "fast": (0, "applied")}
+        ).run()
+        self.assertLess(report["workspaces"]["after_fast"]["started"], report["workspaces"]["slow"]["finished"])
+
+    def test_errored_parent_skips_descendants(self):
+        report = self.graph(
+            {"cluster": ["network"], "app": ["cluster"], "dns": []},
+            {"network": (0, "errored")}
+        ).run()
+
+        workspaces = report["workspaces"]
+        self.assertFalse(report["succeeded"])
+        self.assertEqual(workspaces["network"]["status"], "errored")
+        self.assertEqual(workspaces["cluster"]["status"], "skipped")
+        self.assertEqual(workspaces["app"]["status"], "skipped")
+        self.assertEqual(workspaces["dns"]["status"], "applied")
+        self.assertNotIn("cluster", self.log)
+
+    def test_exception_and_uncreated_run_fail(self):
+        report = self.graph(
+            {"a": [], "b": [], "child": ["b"]},
+            {"a": (0, SyntaxError("Invalid call to Terraform Enterprise 2")), "b": (0, None)}
+        ).run()
+
+        self.assertEqual(report["workspaces"]["a"]["status"], "failed")
+        self.assertEqual(report["workspaces"]["a"]["error"], "Invalid call to Terraform Enterprise 2")
+        self.assertEqual(report["workspaces"]["b"]["status"], "failed")
+        self.assertEqual(report["workspaces"]["child"]["status"], "skipped")
+
+    def test_plan_success_states(self):
+        report = self.graph({"app": ["network"]}, {"network": (0, "planned"), "app": (0, "planned_and_finished")}).run(request_type="plan")
+        self.assertTrue(report["succeeded"])
+
+    def test_critical_path(self):
+        report = self.graph(
+            {"cluster": ["network", "iam"], "app": ["cluster"]},
+            {"network": (0.1, "applied"), "iam": (0, "applied")}
+        ).run()
+
+        self.assertEqual(report["critical_path"], ["network", "cluster", "app"])
+        self.assertGreaterEqual(report["critical_path_seconds"], 0.1)
+        self.assertLessEqual(report["critical_path_seconds"], report["elapsed"])
@@ -0,0 +1,115 @@
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.mocks import mocked_terraform_responses_gets as mock_gets
+from tests.test_run_states import run_response
+from te2_sdk.deadline import Deadline, cap_timeout
+from te2_sdk.te2 import DEFAULT_TIMEOUT, TE2Client, TE2WorkspaceRuns, TE2WorkspaceVariables
+
+
+class TestDeadline(TestCase):
+    def test_resolve(self):
+        deadline = Deadline(5)
+        self.assertIs(Deadline.resolve(deadline), deadline)
+        self.assertIsNone(Deadline.resolve(None))
+        self.assertAlmostEqual(Deadline.resolve(30).remaining(), 30, delta=1)
+
+    def test_cap(self):
+        deadline = Deadline(5)
+        self.assertEqual(deadline.cap(1), 1)
+        self.assertLessEqual(deadline.cap(60), 5)
+        self.assertLessEqual(deadline.cap(), 5)
+
+    def test_expired(self):
+        deadline = Deadline(0)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertRaises(TimeoutError, deadline.check)
+        self.assertRaises(TimeoutError, lambda: deadline.cap(1))
+
+    def test_cap_timeout(self):
+        self.assertEqual(cap_timeout((10, 60), None), (10, 60))
+        connect, read = cap_timeout((10, 60), Deadline(30))
+        self.assertEqual(connect, 10)
+        self.assertLessEqual(read, 30)
+        self.assertLessEqual(cap_timeout(None, Deadline(30)), 30)
+        self.assertLessEqual(cap_timeout(60, Deadline(30)), 30)
+
+
+class TestClientTimeouts(TestCase):
+    def setUp(self):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_default_timeout(self, get):
+        self.client.get(path="/runs/run-testID")
+        self.assertEqual(get.call_args[1]["timeout"], DEFAULT_TIMEOUT)
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_deadline_caps_timeout(self, get):
+        self.client.get(path="/runs/run-testID", deadline=Deadline(5))
+        connect, read = get.call_args[1]["timeout"]
+        self.assertLessEqual(connect, 5)
+        self.assertLessEqual(read, 5)
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_no_timeout(self, get):
+        TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com",
+                  timeout=None).get(path="/runs/run-testID")
+        self.assertNotIn("timeout", get.call_args[1])
+
+    @mock.patch('te2_sdk.transport.requests.post')
+    def test_expired_deadline_sends_nothing(self, post):
+        self.assertRaises(TimeoutError, lambda: self.client.post(path="/runs", data="{}", deadline=Deadline(0)))
+        post.assert_not_called()
+
+
+class TestOperationDeadlines(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_sleep_capped_by_deadline(self, sleep):
+        deadline = Deadline(2)
+        with mock.patch.object(self.client, 'get', side_effect=[run_response("pending"), run_response("planned")]):
+            self.runs._get_run_results(run_id="run-testID", deadline=deadline)
+        self.assertLessEqual(sleep.call_args[0][0], 2)
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_poll_past_deadline(self, sleep):
+        deadline = Deadline(60)
+        responses = [run_response("pending")] * 3
+
+        def get(path, params=None, deadline=None):
+            deadline.expires_at = 0
+            return responses.pop()
+
+        with mock.patch.object(self.client, 'get', side_effect=get):
+            self.assertRaises(TimeoutError, lambda: self.runs._get_run_results(run_id="run-testID", deadline=deadline))
+        sleep.assert_not_called()
+
+    @mock.patch('te2_sdk.transport.requests.get')
+    @mock.patch('te2_sdk.transport.requests.post')
+    def test_request_run_expired_deadline(self, post, get):
+        self.assertEqual(self.runs.request_run(deadline=0), {})
+        get.assert_not_called()
+        post.assert_not_called()
+
+    def test_discard_passes_deadline(self):
+        runs = MockResponse({"data": [{"id": "run-1", "attributes": {"status": "applied"}}]}, 200)
+        with mock.patch.object(self.client, 'get', return_value=runs) as client_get:
+            self.runs.discard_all_pending_runs(deadline=60)
+        self.assertIsInstance(client_get.call_args[1]["deadline"], Deadline)
+
+    @mock.patch('te2_sdk.transport.requests.patch', return_value=MockResponse(None, 200))
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_variable_sync_deadline(self, get, patch):
+        variables = TE2WorkspaceVariables(self.client, "Example_Workspace_1", workspace_id="ws-example1")
+        variables.create_or_update_workspace_variable(key="key1", value="new value", deadline=60)
+
+        for call in get.call_args_list + patch.call_args_list:
+            self.assertLessEqual(call[1]["timeout"][1], 60)
+        self.assertRaises(
+            TimeoutError, lambda: variables.create_or_update_workspace_variable(key="key1", value="x", deadline=0)
+        )
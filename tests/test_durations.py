@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.durations import RunDurationStats, parse_timestamp, run_duration
+from te2_sdk.run_states import DEFAULT_POLL_INTERVAL, POLL_INTERVALS, ScheduledRunStatePolicy
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+with open(os.path.join(os.path.dirname(__file__), "responses", "get_runs.json")) as f:
+    SAMPLE_RUNS = json.load(f)["data"]
+
+
+def finished_run(status="planned", created="2020-01-01T00:00:00.000Z", **timestamps):
+    return {
+        "id": "run-testID",
+        "type": "runs",
+        "attributes": {"status": status, "created-at": created, "status-timestamps": timestamps}
+    }
+
+
+class TestRunDuration(TestCase):
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("2017-10-11T11:38:13.576Z").microsecond, 576000)
+        self.assertIsNone(parse_timestamp(None))
+        self.assertIsNone(parse_timestamp("yesterday"))
+        self.assertEqual(parse_timestamp("2017-10-11T13:38:13+02:00"), parse_timestamp("2017-10-11T11:38:13.000Z"))
+        self.assertEqual(parse_timestamp("2017-10-11T11:38:13.1234567Z").microsecond, 123456)
+
+    def test_run_duration(self):
+        self.assertAlmostEqual(run_duration(SAMPLE_RUNS[0], "plan"), 14.424, places=3)
+        self.assertEqual(run_duration(SAMPLE_RUNS[0], "apply"), 72)  # From confirmed-at
+
+    def test_apply_from_confirmation(self):
+        run = finished_run("applied", **{"planned-at": "2020-01-01T00:01:00+00:00",
+                                         "apply-queued-at": "2020-01-01T01:00:00+00:00",
+                                         "applied-at": "2020-01-01T01:00:30+00:00"})
+        self.assertEqual(run_duration(run, "apply"), 30)  # The hour waiting for confirmation is left out
+        del run["attributes"]["status-timestamps"]["apply-queued-at"]
+        self.assertIsNone(run_duration(run, "apply"))
+
+    def test_latest_plan_timestamp(self):
+        run = finished_run(**{"planned-at": "2020-01-01T00:01:00+00:00",
+                              "policy-checked-at": "2020-01-01T00:01:30+00:00"})
+        self.assertEqual(run_duration(run, "plan"), 90)
+        self.assertIsNone(run_duration(run, "apply"))
+
+
+class TestRunDurationStats(TestCase):
+    def test_expected(self):
+        stats = RunDurationStats(min_samples=3)
+        for seconds in (100, 110, 120):
+            self.assertIsNone(stats.expected("ws-example1", "plan"))
+            stats.record("ws-example1", "plan", seconds)
+
+        self.assertEqual(stats.expected("ws-example1", "plan"), (110, 10))
+        self.assertIsNone(stats.expected("ws-example1", "apply"))
+
+    def test_window(self):
+        stats = RunDurationStats(window=2)
+        for seconds in (1, 2, 3):
+            stats.record("ws-example1", "plan", seconds)
+        self.assertEqual(stats.durations("ws-example1", "plan"), [2, 3])
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "durations.json")
+            RunDurationStats(path).record("ws-example1", "apply", 42)
+            self.assertEqual(RunDurationStats(path).durations("ws-example1", "apply"), [42])
+
+    def test_learn(self):
+        stats = RunDurationStats()
+        stats.record("ws-example1", "plan", 999)
+        stats.learn("ws-example1", SAMPLE_RUNS)
+
+        self.assertEqual(len(stats.durations("ws-example1", "plan")), len(SAMPLE_RUNS))
+        self.assertNotIn(999, stats.durations("ws-example1", "plan"))
+
+
+class TestScheduledRunStatePolicy(TestCase):
+    def setUp(self):
+        self.policy = ScheduledRunStatePolicy(expected=120, spread=20, request_type="plan", dense_interval=2)
+
+    def test_first_poll_before_window(self):
+        self.assertEqual(self.policy.first_poll_delay(), 100)
+        self.assertEqual(ScheduledRunStatePolicy(1000, 0, max_wait=300).first_poll_delay(), 300)
+
+    def test_intervals(self):
+        self.assertEqual(self.policy.poll_interval("planning", 40), 60)
+        self.assertEqual(self.policy.poll_interval("planning", 110), 2)
+        self.assertEqual(self.policy.poll_interval("planning", 200), POLL_INTERVALS["planning"])
+
+    def test_apply_first_poll_not_delayed(self):
+        self.assertEqual(ScheduledRunStatePolicy(250, 10, request_type="apply").first_poll_delay(), 0)
+
+    def test_waiting_on_people_uses_state_interval(self):
+        self.assertEqual(self.policy.poll_interval("policy_override", 110), 10)
+
+
+class TestDurationAwarePolling(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+        self.stats = RunDurationStats()
+        for seconds in (60, 60, 60):
+            self.stats.record("ws-example1", "plan", seconds)
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1",
+                                     duration_stats=self.stats)
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_first_poll_near_expected_completion(self, sleep):
+        planned = finished_run(**{"planned-at": "2020-01-01T00:01:05+00:00"})
+        responses = [MockResponse({"data": finished_run("planning")}, 200), MockResponse({"data": planned}, 200)]
+
+        with mock.patch.object(self.client, 'get', side_effect=responses):
+            self.runs._get_run_results("run-testID", request_type="plan")
+
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [60, 2])
+        self.assertEqual(self.stats.durations("ws-example1", "plan"), [60, 60, 60, 65])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_apply_scheduled_from_confirmation(self, sleep):
+        for seconds in (60, 60, 60):
+            self.stats.record("ws-example1", "apply", seconds)
+        responses = [
+            MockResponse({"data": finished_run("planned")}, 200),
+            MockResponse({"data": finished_run("applying")}, 200),
+            MockResponse({"data": finished_run("applied")}, 200),
+        ]
+
+        with mock.patch.object(self.client, 'get', side_effect=responses), \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({}, 202)) as post:
+            self.runs._get_run_results("run-testID", request_type="apply", confirm=True)
+
+        # Confirmed at the first poll, rather than after a wait for the usual apply time
+        self.assertEqual(post.call_args[1]["path"], "/runs/run-testID/actions/apply")
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [DEFAULT_POLL_INTERVAL, 50])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_errored_runs_not_recorded(self, *args, **kwargs):
+        errored = finished_run("errored", **{"errored-at": "2020-01-01T00:00:05+00:00"})
+        with mock.patch.object(self.client, 'get', return_value=MockResponse({"data": errored}, 200)):
+            self.runs._get_run_results("run-testID", request_type="plan")
+        self.assertEqual(self.stats.durations("ws-example1", "plan"), [60, 60, 60])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_learns_from_past_runs(self, sleep):
+        self.runs.duration_stats = RunDurationStats(min_samples=2)
+        listing = MockResponse({"data": SAMPLE_RUNS}, 200)
+        applied = MockResponse({"data": SAMPLE_RUNS[0]}, 200)
+
+        with mock.patch.object(self.client, 'get', side_effect=[listing, applied, applied]) as get:
+            self.runs._get_run_results("run-testID", request_type="plan")
+            self.runs.duration_stats = RunDurationStats(min_samples=2)
+            self.runs._get_run_results("run-testID", request_type="plan")
+
+        self.assertEqual(get.call_count, 3)  # the past runs are listed once
+        self.assertGreater(sleep.call_args_list[0][0][0], 0)
@@ -0,0 +1,166 @@
+import gc
+import io
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import weakref
+from unittest import TestCase, mock
+from tests.responses import responses as sample_responses
+from te2_sdk import events
+from te2_sdk.events import EventEmitter, LoggingSink, JSONLinesSink, CallbackSink, RunEvent, format_event
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+class TestEventEmitter(TestCase):
+    def test_no_sink_no_worker(self):
+        emitter = EventEmitter()
+        self.assertFalse(emitter)
+        emitter.emit(events.RUN_POLLED, run_id="run-testID")
+        self.assertIsNone(emitter._queue)
+
+    def test_delivers_to_sinks(self):
+        received = []
+        emitter = EventEmitter(sinks=[received.append])
+        emitter.emit(events.RUN_POLLED, run_id="run-testID", workspace="ws", status="planning", elapsed=10)
+        emitter.flush()
+
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].kind, events.RUN_POLLED)
+        self.assertEqual(received[0].status, "planning")
+
+    def test_failing_sink_does_not_stop_delivery(self):
+        received = []
+
+        def broken(event):
+            raise ValueError()
+
+        emitter = EventEmitter(sinks=[broken, received.append])
+        with self.assertLogs("te2_sdk.events", level=logging.ERROR):
+            emitter.emit(events.RUN_CREATED)
+            emitter.emit(events.RUN_COMPLETED)
+            emitter.flush()
+        self.assertEqual([event.kind for event in received], [events.RUN_CREATED, events.RUN_COMPLETED])
+
+    def test_drops_when_full(self):
+        emitter = EventEmitter(sinks=[lambda event: None], max_buffered=1)
+        with mock.patch.object(emitter, '_worker_queue') as worker_queue:
+            worker_queue.return_value.put_nowait.side_effect = events.queue.Full
+            emitter.emit(events.RUN_POLLED)
+        self.assertEqual(emitter.dropped, 1)
+
+    @mock.patch('te2_sdk.events.WORKER_IDLE_TIMEOUT', 0.05)
+    def test_idle_worker_exits_and_restarts(self):
+        received = []
+        emitter = EventEmitter(sinks=[received.append])
+        emitter.emit(events.RUN_CREATED)
+        emitter.flush()
+        time.sleep(0.3)
+        self.assertFalse(emitter._delivering)
+
+        emitter.emit(events.RUN_COMPLETED)
+        emitter.flush()
+        self.assertEqual([event.kind for event in received], [events.RUN_CREATED, events.RUN_COMPLETED])
+
+    def test_event_queued_as_worker_stops(self):
+        received = []
+        emitter = EventEmitter(sinks=[received.append])
+
+        class RacingQueue(events.queue.Queue):
+            def put_nowait(self, item):
+                emitter._stop_delivering(self)  # The idle thread gives up just before the event is queued
+                super().put_nowait(item)
+
+        emitter._queue, emitter._pid, emitter._delivering = RacingQueue(), os.getpid(), True
+        emitter.emit(events.RUN_CREATED)
+
+        flushed = threading.Thread(target=emitter.flush, daemon=True)
+        flushed.start()
+        flushed.join(2)
+        self.assertFalse(flushed.is_alive())
+        self.assertEqual([event.kind for event in received], [events.RUN_CREATED])
+
+    def test_unused_emitter_collected(self):
+        emitter = EventEmitter(sinks=[lambda event: None])
+        emitter.emit(events.RUN_CREATED)
+        emitter.flush()
+        reference = weakref.ref(emitter)
+        self.assertIn(emitter, events._emitters)
+
+        del emitter
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_pickle_drops_sinks(self):
+        emitter = EventEmitter(sinks=[JSONLinesSink(io.StringIO())])
+        emitter.emit(events.RUN_CREATED)
+        emitter.flush()
+        self.assertFalse(pickle.loads(pickle.dumps(emitter)))
+
+
+class TestSinks(TestCase):
+    def setUp(self):
+        self.event = RunEvent(events.RUN_COMPLETED, "run-testID", "ws", "planned", 12.5, 0, {"has_changes": True})
+
+    def test_format_event(self):
+        self.assertEqual(
+            format_event(self.event),
+            "run_completed workspace=ws run=run-testID status=planned elapsed=12s has_changes=True"
+        )
+
+    def test_logging_sink(self):
+        with self.assertLogs("te2_sdk", level=logging.INFO) as logs:
+            LoggingSink()(self.event)
+        self.assertIn("run=run-testID", logs.output[0])
+
+    def test_json_lines_sink(self):
+        stream = io.StringIO()
+        JSONLinesSink(stream)(self.event)
+        line = json.loads(stream.getvalue())
+        self.assertEqual(line["run_id"], "run-testID")
+        self.assertTrue(line["has_changes"])
+
+    def test_callback_sink_filters_kinds(self):
+        received = []
+        sink = CallbackSink(received.append, kinds=[events.RUN_CREATED])
+        sink(self.event)
+        self.assertEqual(received, [])
+
+
+class TestRunEvents(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.received = []
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com",
+            events=EventEmitter(sinks=[self.received.append])
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request',
+                return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results',
+                return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_CHANGES)
+    def test_request_run_events(self, *args, **kwargs):
+        self.runs.request_run(request_type="plan")
+        self.client.events.flush()
+
+        self.assertEqual([event.kind for event in self.received], [events.RUN_CREATED, events.RUN_COMPLETED])
+        self.assertEqual(self.received[1].status, "planned")
+        self.assertEqual(self.received[1].workspace, "Example_Workspace_1")
+        self.assertTrue(self.received[1].details["has_changes"])
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request',
+                return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', side_effect=TimeoutError("Run took too long"))
+    def test_request_run_abandoned(self, *args, **kwargs):
+        self.assertEqual(self.runs.request_run(request_type="plan"), {})
+        self.client.events.flush()
+
+        self.assertEqual([event.kind for event in self.received], [events.RUN_CREATED, events.RUN_ABANDONED])
+        self.assertEqual(self.received[1].run_id, self.received[0].run_id)
+        self.assertEqual(self.received[1].details["error"], "TimeoutError")
@@ -0,0 +1,112 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.fingerprints import FingerprintStore
+from te2_sdk.te2 import TE2Client, TE2WorkspaceVariables
+
+SENSITIVE_VARIABLE = {
+    "id": "var-secret",
+    "type": "vars",
+    "attributes": {"key": "secret", "value": None, "category": "env", "sensitive": True, "hcl": False}
+}
+
+
+class TestFingerprintStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "fingerprints.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matches_recorded_value(self):
+        store = FingerprintStore()
+        store.record("ws-1", "secret", "value", "env", False)
+        self.assertTrue(store.matches("ws-1", "secret", "value", "env", False))
+        self.assertFalse(store.matches("ws-1", "secret", "other", "env", False))
+        self.assertFalse(store.matches("ws-1", "secret", "value", "terraform", False))
+        self.assertFalse(store.matches("ws-2", "secret", "value", "env", False))
+
+    def test_values_not_stored(self):
+        store = FingerprintStore(self.path)
+        store.record("ws-1", "secret", "hunter2", "env", False)
+        with open(self.path) as f:
+            self.assertNotIn("hunter2", f.read())
+
+    def test_salted(self):
+        self.assertNotEqual(
+            FingerprintStore().fingerprint("value", "env", False),
+            FingerprintStore().fingerprint("value", "env", False)
+        )
+
+    def test_shared_on_disk(self):
+        FingerprintStore(self.path).record("ws-1", "secret", "value", "env", False)
+        self.assertTrue(FingerprintStore(self.path).matches("ws-1", "secret", "value", "env", False))
+
+    def test_new_salt_discards_fingerprints(self):
+        FingerprintStore(self.path).record("ws-1", "secret", "value", "env", False)
+        self.assertFalse(FingerprintStore(self.path, salt="other").matches("ws-1", "secret", "value", "env", False))
+
+    def test_forget(self):
+        store = FingerprintStore(self.path)
+        store.record("ws-1", "secret", "value", "env", False)
+        store.forget("ws-1", "secret")
+        self.assertFalse(FingerprintStore(self.path).matches("ws-1", "secret", "value", "env", False))
+
+
+class TestSkipUnchangedVariables(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.store = FingerprintStore()
+        self.variables = TE2WorkspaceVariables(
+            client=self.client,
+            workspace_name="Example_Workspace_1",
+            fingerprint_store=self.store
+        )
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value=SENSITIVE_VARIABLE)
+    def test_sensitive_written_once(self, *args, **kwargs):
+        with mock.patch.object(self.client, 'patch', return_value=MockResponse(None, 200)) as patch:
+            for _ in range(3):
+                self.assertTrue(self.variables.create_or_update_workspace_variable(
+                    key="secret", value="value", category="env", sensitive=True
+                ))
+        self.assertEqual(patch.call_count, 1)
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value=SENSITIVE_VARIABLE)
+    def test_sensitive_changed_value_written(self, *args, **kwargs):
+        with mock.patch.object(self.client, 'patch', return_value=MockResponse(None, 200)) as patch:
+            self.variables.create_or_update_workspace_variable(key="secret", value="one", category="env", sensitive=True)
+            self.variables.create_or_update_workspace_variable(key="secret", value="two", category="env", sensitive=True)
+        self.assertEqual(patch.call_count, 2)
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value=SENSITIVE_VARIABLE)
+    def test_failed_write_forgotten(self, *args, **kwargs):
+        self.store.record("ws-example1", "secret", "value", "env", False)
+        with mock.patch.object(self.client, 'patch', return_value=MockResponse(None, 422)):
+            self.assertRaises(SyntaxError, lambda: self.variables.create_or_update_workspace_variable(
+                key="secret", value="new", category="env", sensitive=True
+            ))
+        self.assertFalse(self.store.matches("ws-example1", "secret", "value", "env", False))
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value={
+        "id": "var-1", "attributes": {"key": "key1", "value": "value", "category": "env", "sensitive": False}
+    })
+    def test_non_sensitive_unchanged_skipped(self, *args, **kwargs):
+        with mock.patch.object(self.client, 'patch') as patch:
+            self.assertTrue(self.variables.create_or_update_workspace_variable(
+                key="key1", value="value", category="env"
+            ))
+        patch.assert_not_called()
+
+    def test_changed_attributes_not_skipped(self):
+        self.store.record("ws-example1", "secret", "value", "env", False)
+        self.assertFalse(self.variables._is_unchanged(SENSITIVE_VARIABLE, "secret", "value", "env", True, True))
+        self.assertFalse(self.variables._is_unchanged(SENSITIVE_VARIABLE, "secret", "value", "env", False, False))
+        self.assertTrue(self.variables._is_unchanged(SENSITIVE_VARIABLE, "secret", "value", "env", True, False))
@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest import TestCase
+from tests.mocks import MockResponse
+from te2_sdk.hedging import HedgingTransport
+from te2_sdk.te2 import TE2Client
+
+
+class SlowTransport:
+    """Answers each attempt after the delay listed for it, in the order the attempts are made"""
+
+    def __init__(self, delays, fail=()):
+        self.delays = list(delays)
+        self.fail = set(fail)
+        self.calls = []
+        self.closed = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        with self._lock:
+            attempt = len(self.calls)
+            self.calls.append((method, url))
+            delay = self.delays[attempt] if attempt < len(self.delays) else 0
+        time.sleep(delay)
+        if attempt in self.fail:
+            raise ConnectionError("attempt " + str(attempt) + " failed")
+
+        transport = self
+
+        class Response(MockResponse):
+            def close(self):
+                transport.closed.append(attempt)
+
+        return Response({"attempt": attempt}, 200)
+
+    def close(self):
+        pass
+
+
+class TestHedgingTransport(TestCase):
+    def hedging(self, delays, **kwargs):
+        self.inner = SlowTransport(delays, kwargs.pop("fail", ()))
+        kwargs.setdefault("initial_delay", 0.05)
+        return HedgingTransport(self.inner, **kwargs)
+
+    def test_fast_request_not_hedged(self):
+        transport = self.hedging([0])
+        self.assertEqual(transport.request("GET", "https://tf-api.com/runs/run-1").json(), {"attempt": 0})
+        self.assertEqual(len(self.inner.calls), 1)
+        self.assertEqual(transport.metrics.as_dict()["hedged"], 0)
+
+    def test_slow_request_hedged(self):
+        transport = self.hedging([0.5, 0])
+        self.assertEqual(transport.request("GET", "https://tf-api.com/runs/run-1").json(), {"attempt": 1})
+
+        metrics = transport.metrics.as_dict()
+        self.assertEqual((metrics["requests"], metrics["hedged"], metrics["hedge_wins"]), (1, 1, 1))
+        self.assertEqual(metrics["hedge_win_rate"], 1.0)
+
+        time.sleep(0.6)
+        self.assertEqual(self.inner.closed, [0])
+
+    def test_lost_attempt_latency_recorded(self):
+        transport = self.hedging([0.5, 0])
+        transport.request("GET", "https://tf-api.com/runs/run-1")
+
+        latencies = sorted(transport._latencies)
+        self.assertEqual(len(latencies), 2)
+        self.assertGreaterEqual(latencies[1], 0.05)
+
+    def test_first_attempt_wins_after_hedge(self):
+        transport = self.hedging([0.1, 0.5])
+        self.assertEqual(transport.request("GET", "https://tf-api.com/runs/run-1").json(), {"attempt": 0})
+        self.assertEqual(transport.metrics.as_dict()["hedge_wins"], 0)
+        self.assertEqual(transport.metrics.as_dict()["hedged"], 1)
+
+    def test_failed_attempt_falls_back(self):
+        transport = self.hedging([0.1, 0.2], fail=[0])
+        self.assertEqual(transport.request("GET", "https://tf-api.com/runs/run-1").json(), {"attempt": 1})
+
+    def test_both_attempts_fail(self):
+        transport = self.hedging([0.1, 0.1], fail=[0, 1])
+        self.assertRaises(ConnectionError, lambda: transport.request("GET", "https://tf-api.com/runs/run-1"))
+
+    def test_writes_not_hedged(self):
+        transport = self.hedging([0.2])
+        transport.request("POST", "https://tf-api.com/runs", data="{}")
+        self.assertEqual(len(self.inner.calls), 1)
+        self.assertEqual(transport.metrics.as_dict()["requests"], 0)
+
+    def test_delay_from_percentile(self):
+        transport = self.hedging([], percentile=90, min_samples=10, min_delay=0, max_delay=10)
+        self.assertEqual(transport.hedge_delay(), 0.05)
+
+        for latency in range(1, 11):
+            transport._observe(latency / 100.0)
+        self.assertEqual(transport.hedge_delay(), 0.1)
+
+        transport.max_delay = 0.08
+        self.assertEqual(transport.hedge_delay(), 0.08)
+
+    def test_invalid_percentile(self):
+        self.assertRaises(ValueError, lambda: HedgingTransport(SlowTransport([]), percentile=100))
+
+    def test_client_with_hedging(self):
+        transport = self.hedging([0.5, 0])
+        client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com",
+                           transport=transport)
+        self.assertEqual(client.decode(client.get(path="/runs/run-1")), {"attempt": 1})
@@ -0,0 +1,111 @@
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.history import RunHistory, run_row
+from te2_sdk.te2 import TE2Client
+
+
+def history_run(run_id, created, status="applied", plan=None, apply=None, queue=5):
+    """Run created at minute `created` of 2020-01-01, planning `plan` and applying `apply` seconds"""
+    created_at = "2020-01-01T00:%02d:00+00:00" % created
+    timestamps = {}
+    if plan is not None:
+        timestamps["planning-at"] = "2020-01-01T00:%02d:%02d+00:00" % (created, queue)
+        timestamps["planned-at"] = "2020-01-01T00:%02d:%02d+00:00" % (created, queue + plan)
+    if apply is not None:
+        timestamps["applying-at"] = "2020-01-01T01:%02d:00+00:00" % created
+        timestamps["applied-at"] = "2020-01-01T01:%02d:%02d+00:00" % (created, apply)
+    return {
+        "id": run_id,
+        "type": "runs",
+        "attributes": {
+            "status": status, "created-at": created_at, "status-timestamps": timestamps, "has-changes": True
+        }
+    }
+
+
+def runs_page(runs, next_page=None):
+    return MockResponse({"data": runs, "meta": {"pagination": {"next-page": next_page}}}, 200)
+
+
+class TestRunRow(TestCase):
+    def test_durations(self):
+        row = run_row(history_run("run-1", 0, plan=20, apply=30), "ws-1", "example")
+        self.assertEqual(row["queue_seconds"], 5)
+        self.assertEqual(row["plan_seconds"], 20)
+        self.assertEqual(row["apply_seconds"], 30)
+        self.assertEqual(row["has_changes"], 1)
+        self.assertEqual(row["workspace_name"], "example")
+
+    def test_unfinished(self):
+        row = run_row(history_run("run-1", 0, status="pending"), "ws-1")
+        self.assertIsNone(row["plan_seconds"])
+        self.assertIsNone(row["finished_at"])
+
+
+class TestRunHistory(TestCase):
+    def setUp(self):
+        self.client = TE2Client(organisation="example", atlas_token="token")
+        self.history = RunHistory()
+
+    def tearDown(self):
+        self.history.close()
+
+    def test_sync_pages(self):
+        pages = [
+            runs_page([history_run("run-3", 3, plan=30), history_run("run-2", 2, plan=20)], next_page=2),
+            runs_page([history_run("run-1", 1, plan=10)]),
+        ]
+        with mock.patch.object(self.client, "get", side_effect=pages) as mock_get:
+            self.assertEqual(self.history.sync(self.client, "example", workspace_id="ws-1"), 3)
+
+        self.assertEqual(mock_get.call_count, 2)
+        params = mock_get.call_args_list[1][1]["params"]
+        self.assertEqual(params["page[number]"], 2)
+        self.assertIn("fields[runs]", params)
+        self.assertEqual([row["id"] for row in self.history.runs("example")], ["run-3", "run-2", "run-1"])
+
+    def test_incremental_sync(self):
+        first = [runs_page([history_run("run-2", 2, status="planning"), history_run("run-1", 1, plan=10)])]
+        with mock.patch.object(self.client, "get", side_effect=first):
+            self.history.sync(self.client, "example", workspace_id="ws-1")
+
+        # The newest page reaches back past the unfinished run-2, so no further page is requested
+        second = [
+            runs_page([history_run("run-3", 3, plan=30), history_run("run-2", 2, plan=20),
+                       history_run("run-1", 1, plan=10)], next_page=2),
+        ]
+        with mock.patch.object(self.client, "get", side_effect=second) as mock_get:
+            self.history.sync(self.client, "example", workspace_id="ws-1")
+
+        self.assertEqual(mock_get.call_count, 1)
+        rows = {row["id"]: row for row in self.history.runs()}
+        self.assertEqual(rows["run-2"]["status"], "applied")
+        self.assertEqual(rows["run-2"]["plan_seconds"], 20)
+
+    def test_sync_error(self):
+        with mock.patch.object(self.client, "get", return_value=MockResponse({}, 404)):
+            with self.assertRaises(KeyError):
+                self.history.sync(self.client, "example", workspace_id="ws-1")
+
+    def test_duration_percentile(self):
+        self.history.store([history_run("run-%d" % i, i, plan=i + 1) for i in range(20)], "ws-1", "example")
+        self.history.store([history_run("run-other", 30, plan=50)], "ws-2", "other")
+
+        self.assertEqual(self.history.duration_percentile("plan", 95, workspace_name="example"), 20)
+        self.assertEqual(self.history.duration_percentile("plan", 50, workspace_name="example"), 11)
+        self.assertEqual(self.history.duration_percentile("plan", 99), 50)
+        self.assertEqual(self.history.duration_percentile("queue", 50), 5)
+        self.assertIsNone(self.history.duration_percentile("apply"))
+
+        with self.assertRaises(KeyError):
+            self.history.duration_percentile("build")
+
+    def test_slowest_workspaces(self):
+        self.history.store([history_run("run-1", 1, plan=10), history_run("run-2", 2, plan=30)], "ws-1", "fast")
+        self.history.store([history_run("run-3", 3, plan=50)], "ws-2", "slow")
+
+        slowest = self.history.slowest_workspaces("plan", limit=2)
+        self.assertEqual([row["workspace_name"] for row in slowest], ["slow", "fast"])
+        self.assertEqual(slowest[1]["runs"], 2)
+        self.assertEqual(slowest[1]["mean_seconds"], 20)
+        self.assertEqual(slowest[1]["max_seconds"], 30)
@@ -0,0 +1,132 @@
+import json
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from unittest import TestCase, mock, skipUnless
+import requests
+from te2_sdk._http_server import ThreadingHTTPServer
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+try:
+    import h2  # noqa: F401
+    import httpx  # noqa: F401
+    from te2_sdk.transport import HTTPXTransport
+    from tests.h2_server import H2StandIn
+    HTTPX_INSTALLED = True
+except ImportError:
+    HTTPX_INSTALLED = False
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        if self.path.startswith("/slow"):
+            time.sleep(1)
+        body = json.dumps({
+            "method": self.command,
+            "path": self.path,
+            "authorization": self.headers.get("Authorization"),
+            "body": self._read_body(),
+        }).encode() + b"\nPlan: 1 to add, 0 to change, 0 to destroy.\n"
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up waiting, e.g. in test_errors_raised_as_requests_errors
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline(), 16)
+                chunk = self.rfile.read(size + 2)[:size]
+                if not size:
+                    return b"".join(chunks).decode()
+                chunks.append(chunk)
+
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode() if length else None
+
+    do_GET = do_POST = do_PATCH = _reply
+
+
+@skipUnless(HTTPX_INSTALLED, "needs the http2 extra")
+class TestHTTPXTransport(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:" + str(self.server.server_address[1])
+        self.transport = HTTPXTransport()
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reads_like_requests(self):
+        response = self.transport.request("POST", self.url + "/vars", headers={"Authorization": "Bearer Token"},
+                                          params={"page[size]": 20, "include": None}, data='{"data":{}}')
+
+        self.assertEqual(response.status_code, 200)
+        document = json.loads(response.content.split(b"\n")[0])
+        self.assertEqual(document, {"method": "POST", "path": "/vars?page%5Bsize%5D=20",
+                                    "authorization": "Bearer Token", "body": '{"data":{}}'})
+        self.assertEqual(response.http_version, "HTTP/1.1")
+
+    def test_chunked_upload(self):
+        response = self.transport.request("PATCH", self.url + "/upload", data=iter([b'{"a":', b'1}']))
+        self.assertEqual(json.loads(response.content.split(b"\n")[0])["body"], '{"a":1}')
+
+    def test_stream(self):
+        response = self.transport.request("GET", self.url + "/log", stream=True, timeout=(5, 5))
+        try:
+            lines = list(response.iter_lines())
+        finally:
+            response.close()
+        self.assertEqual(lines[1], b"Plan: 1 to add, 0 to change, 0 to destroy.")
+
+    def test_errors_raised_as_requests_errors(self):
+        self.assertRaises(requests.Timeout, lambda: self.transport.request("GET", self.url + "/slow", timeout=0.1))
+        self.assertRaises(requests.ConnectionError, lambda: self.transport.request("GET", "http://127.0.0.1:1/"))
+
+    def test_pickle(self):
+        transport = HTTPXTransport(max_connections=2, http1=False)
+        restored = pickle.loads(pickle.dumps(transport))
+        self.assertEqual((restored.max_connections, restored.client_options), (2, {"http1": False}))
+        self.assertIsNone(restored._client)
+
+
+@skipUnless(HTTPX_INSTALLED, "needs the http2 extra")
+class TestMultiplexing(TestCase):
+    def setUp(self):
+        self.server = H2StandIn(delay=0.2)
+        # Cleartext HTTP/2, the API itself negotiates it over TLS
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url=self.server.url,
+                                transport=HTTPXTransport(max_connections=2, http1=False))
+
+    def tearDown(self):
+        self.client.transport.close()
+        self.server.close()
+
+    def test_concurrent_polls_share_connections(self):
+        with mock.patch.object(TE2Client, "get_workspace_id", return_value="ws-1"):
+            runs = TE2WorkspaceRuns(self.client, "Example_Workspace_1")
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(32) as pool:
+            results = list(pool.map(lambda number: runs.get_run_by_id("run-" + str(number)), range(64)))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([run["id"] for run in results], ["run-" + str(number) for number in range(64)])
+        self.assertEqual(self.server.requests, 64)
+        self.assertLessEqual(self.server.connections, 2)
+        # 64 answers taking 0.2 seconds each, over two connections: only concurrent streams finish this soon
+        self.assertLess(elapsed, 2)
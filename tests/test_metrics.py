@@ -0,0 +1,146 @@
+import pickle
+import urllib.request
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk import events
+from te2_sdk.cache import WorkspaceCache
+from te2_sdk.events import RunEvent
+from te2_sdk.metrics import MetricsRegistry, MetricsSink, MetricsTransport, endpoint, instrument
+from te2_sdk.te2 import TE2Client
+
+
+class FakeTransport:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False, timeout=None):
+        if self.status_code is None:
+            raise OSError("connection reset")
+        return MockResponse({"data": []}, self.status_code)
+
+    def close(self):
+        pass
+
+
+def event(kind, status=None, elapsed=None, **details):
+    return RunEvent(kind, "run-testID", "Example_Workspace_1", status, elapsed, 0, details)
+
+
+class TestEndpoint(TestCase):
+    def test_ids_replaced(self):
+        self.assertEqual(endpoint("https://tf-api.com/api/v2/runs/run-CZcmD7eagjhyX0vN/actions/apply"),
+                         "/api/v2/runs/:id/actions/apply")
+        self.assertEqual(endpoint("https://tf-api.com/api/v2/organizations/TestOrg/workspaces/app-1-prod"),
+                         "/api/v2/organizations/:organisation/workspaces/:workspace")
+        self.assertEqual(endpoint("https://archivist.com/v1/object/" + "a" * 64), "/v1/object/:token")
+
+
+class TestRegistry(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter("te2_test_total", "Test counter", ("code",))
+        counter.inc(code=200)
+        counter.inc(2, code=200)
+        self.assertEqual(counter.value(code=200), 3)
+        self.assertIs(self.registry.counter("te2_test_total", "Test counter", ("code",)), counter)
+        self.assertRaises(ValueError, lambda: counter.inc(status=200))
+        self.assertRaises(ValueError, lambda: self.registry.gauge("te2_test_total", "Test gauge"))
+
+    def test_render(self):
+        self.registry.gauge("te2_gauge", "A gauge").set(1.5)
+        self.registry.counter("te2_requests_total", "Requests", ("endpoint",)).inc(endpoint='/a"b')
+        histogram = self.registry.histogram("te2_latency_seconds", "Latency", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE te2_gauge gauge\nte2_gauge 1.5\n", text)
+        self.assertIn('te2_requests_total{endpoint="/a\\"b"} 1\n', text)
+        self.assertIn('te2_latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('te2_latency_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('te2_latency_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn("te2_latency_seconds_sum 5.55\n", text)
+        self.assertIn("te2_latency_seconds_count 3\n", text)
+
+    def test_serve(self):
+        self.registry.counter("te2_test_total", "Test counter").inc()
+        with self.registry.serve() as server:
+            with urllib.request.urlopen(server.url, timeout=5) as response:
+                self.assertIn("text/plain", response.headers["Content-Type"])
+                self.assertIn("te2_test_total 1", response.read().decode())
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_transport(self):
+        transport = MetricsTransport(self.registry, FakeTransport(404))
+        transport.request("GET", "https://tf-api.com/api/v2/runs/run-1234abcd")
+
+        self.assertEqual(transport.requests.value(method="GET", endpoint="/api/v2/runs/:id", code="404"), 1)
+        self.assertEqual(transport.latency.count(method="GET", endpoint="/api/v2/runs/:id"), 1)
+        self.assertEqual(transport.in_flight.value(), 0)
+
+    def test_transport_error(self):
+        transport = MetricsTransport(self.registry, FakeTransport(None))
+        self.assertRaises(OSError, lambda: transport.request("POST", "https://tf-api.com/api/v2/runs"))
+        self.assertEqual(transport.requests.value(method="POST", endpoint="/api/v2/runs", code="error"), 1)
+
+    def test_transport_pickle(self):
+        restored = pickle.loads(pickle.dumps(MetricsTransport(self.registry, FakeTransport())))
+        self.assertIsInstance(restored.transport, FakeTransport)
+
+    def test_sink(self):
+        sink = MetricsSink(self.registry)
+        sink(event(events.RUN_CREATED))
+        sink(event(events.RUN_POLLED, status="planning"))
+        self.assertEqual(sink.runs_in_progress.value(), 1)
+
+        sink(event(events.RUN_COMPLETED, status="applied", elapsed=90, request_type="apply"))
+        self.assertEqual(sink.runs_in_progress.value(), 0)
+        self.assertEqual(sink.polls.value(), 1)
+        self.assertEqual(sink.run_duration.count(request_type="apply", status="applied"), 1)
+
+        sink(event(events.PLAN_SKIPPED, status="planned"))
+        self.assertEqual(sink.plans_skipped.value(), 1)
+
+    def test_sink_runs_in_progress(self):
+        sink = MetricsSink(self.registry)
+        sink(event(events.RUN_CANCELLED, status="planning", action="cancel"))  # A run this sink never counted
+        self.assertEqual(sink.runs_in_progress.value(), 0)
+
+        sink(event(events.RUN_CREATED))
+        sink(event(events.RUN_CANCELLED, status="planning", action="cancel"))
+        sink(event(events.RUN_ABANDONED, error="CancelledError"))
+        self.assertEqual(sink.runs_in_progress.value(), 0)
+        self.assertEqual(sink.cancelled.value(action="cancel"), 2)
+
+        sink(event(events.RUN_CREATED))
+        sink(event(events.RUN_ABANDONED, error="TimeoutError"))
+        self.assertEqual(sink.runs_in_progress.value(), 0)
+
+    def test_instrument_client(self):
+        cache = WorkspaceCache()
+        cache.update({"known": "ws-1"})
+        client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", transport=FakeTransport(),
+                           workspace_cache=cache)
+        instrument(client, self.registry)
+
+        client.get(path="/runs/run-1234abcd")
+        cache.get("known")
+        cache.get("unknown")
+
+        text = self.registry.render()
+        self.assertIn('te2_requests_total{method="GET",endpoint="/api/v2/runs/:id",code="200"} 1', text)
+        self.assertIn('te2_workspace_cache_lookups_total{result="hit"} 1', text)
+        self.assertIn("te2_workspace_cache_hit_ratio 0.5", text)
+
+        with mock.patch.object(client.transport, "request") as request:
+            instrument(client, self.registry)
+            client.get(path="/runs/run-1234abcd")
+        request.assert_called_once()
+        self.assertEqual(len(client.events.sinks), 1)
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.notifications import TE2NotificationReceiver, SIGNATURE_HEADER, sign
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+def post_notification(receiver, run_id, status, token="Notification_Token"):
+    """Stand-in for Terraform Enterprise posting a run notification."""
+    body = json.dumps({
+        "payload_version": 1,
+        "run_id": run_id,
+        "workspace_name": "Example_Workspace_1",
+        "notifications": [{"trigger": "run:completed", "run_status": status}]
+    }).encode()
+
+    request = urllib.request.Request(receiver.url, data=body, headers={SIGNATURE_HEADER: sign(token, body)})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status
+
+
+def run_response(status):
+    return MockResponse({"data": {"id": "run-testID", "type": "runs", "attributes": {"status": status}}}, 200)
+
+
+class TestTE2NotificationReceiver(TestCase):
+    def setUp(self):
+        self.receiver = TE2NotificationReceiver(token="Notification_Token").start()
+
+    def tearDown(self):
+        self.receiver.stop()
+
+    def test_notification_resolves_waiter(self):
+        self.receiver.watch("run-testID")
+        self.assertEqual(post_notification(self.receiver, "run-testID", "planned"), 200)
+        self.assertEqual(self.receiver.wait("run-testID", timeout=5), "planned")
+
+    def test_notification_consumed_once(self):
+        self.receiver.watch("run-testID")
+        post_notification(self.receiver, "run-testID", "planned")
+        self.receiver.wait("run-testID", timeout=5)
+        self.assertIsNone(self.receiver.wait("run-testID", timeout=0.01))
+
+    def test_unwatched_run_ignored(self):
+        post_notification(self.receiver, "run-other", "planned")
+        self.receiver.watch("run-other")
+        self.assertIsNone(self.receiver.wait("run-other", timeout=0.01))
+
+    def test_invalid_signature_rejected(self):
+        self.receiver.watch("run-testID")
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            post_notification(self.receiver, "run-testID", "planned", token="Wrong_Token")
+
+        self.assertEqual(error.exception.code, 403)
+        self.assertIsNone(self.receiver.wait("run-testID", timeout=0.01))
+
+    def test_verification_request_accepted(self):
+        body = json.dumps({"payload_version": 1, "run_id": None, "notifications": [{"trigger": "verification"}]})
+        request = urllib.request.Request(
+            self.receiver.url,
+            data=body.encode(),
+            headers={SIGNATURE_HEADER: sign("Notification_Token", body.encode())}
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            self.assertEqual(response.status, 200)
+
+
+class TestRunResultsWithNotifications(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.receiver = TE2NotificationReceiver(token="Notification_Token", fallback_poll_interval=30).start()
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(
+            client=self.client,
+            workspace_name="Example_Workspace_1",
+            notifications=self.receiver
+        )
+
+    def tearDown(self):
+        self.receiver.stop()
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_notification_replaces_polling(self, sleep):
+        def notify_later():
+            threading.Event().wait(0.1)
+            post_notification(self.receiver, "run-testID", "planning")
+            post_notification(self.receiver, "run-testID", "planned")
+
+        get = mock.Mock(side_effect=[run_response("pending"), run_response("planned")])
+        threading.Thread(target=notify_later).start()
+
+        started = time.monotonic()
+        with mock.patch.object(self.client, 'get', get):
+            result = self.runs._get_run_results(run_id="run-testID", request_type="plan")
+
+        self.assertEqual(result['attributes']['status'], "planned")
+        self.assertEqual(get.call_count, 2)
+        self.assertLess(time.monotonic() - started, 10)
+        sleep.assert_not_called()
+
+    def test_falls_back_to_polling(self):
+        self.receiver.fallback_poll_interval = 0.05
+        get = mock.Mock(side_effect=[run_response("pending"), run_response("pending"), run_response("planned")])
+
+        with mock.patch.object(self.client, 'get', get):
+            result = self.runs._get_run_results(run_id="run-testID", request_type="plan")
+
+        self.assertEqual(result['attributes']['status'], "planned")
+        self.assertEqual(get.call_count, 3)
@@ -0,0 +1,141 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.responses import responses as sample_responses
+from tests.test_run_states import run_response
+from te2_sdk.plan_cache import PlanCache, variables_fingerprint
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+SENSITIVE_VARIABLE = {
+    "id": "var-2", "attributes": {"key": "TOKEN", "value": None, "category": "env", "sensitive": True,
+                                  "version-id": "v1"}
+}
+
+
+class TestVariablesFingerprint(TestCase):
+    def test_order_independent(self):
+        variables = [sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE, SENSITIVE_VARIABLE]
+        self.assertEqual(variables_fingerprint(variables), variables_fingerprint(list(reversed(variables))))
+
+    def test_changes(self):
+        fingerprint = variables_fingerprint([sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE, SENSITIVE_VARIABLE])
+
+        changed = {"id": "var-1", "attributes": dict(sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE["attributes"],
+                                                     value="val-2")}
+        self.assertNotEqual(variables_fingerprint([changed, SENSITIVE_VARIABLE]), fingerprint)
+
+        rewritten = {"id": "var-2", "attributes": dict(SENSITIVE_VARIABLE["attributes"], **{"version-id": "v2"})}
+        self.assertNotEqual(
+            variables_fingerprint([sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE, rewritten]), fingerprint
+        )
+
+
+class TestPlanCache(TestCase):
+    def test_get(self):
+        cache = PlanCache(max_age=60)
+        inputs = PlanCache.inputs("hash", "variables")
+        cache.record("ws-example1", inputs, {"id": "run-1"})
+
+        self.assertEqual(cache.get("ws-example1", inputs), {"id": "run-1"})
+        self.assertIsNone(cache.get("ws-example1", PlanCache.inputs("hash", "variables", destroy=True)))
+        self.assertIsNone(cache.get("ws-example2", inputs))
+
+        cache.forget("ws-example1")
+        self.assertIsNone(cache.get("ws-example1", inputs))
+
+    @mock.patch('te2_sdk.plan_cache.time.time')
+    def test_max_age(self, now):
+        cache = PlanCache(max_age=60)
+        now.return_value = 1000
+        cache.record("ws-example1", "inputs", {"id": "run-1"})
+
+        now.return_value = 1060
+        self.assertIsNotNone(cache.get("ws-example1", "inputs"))
+        now.return_value = 1061
+        self.assertIsNone(cache.get("ws-example1", "inputs"))
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plans.json")
+            PlanCache(path).record("ws-example1", "inputs", {"id": "run-1"})
+            self.assertEqual(PlanCache(path).get("ws-example1", "inputs"), {"id": "run-1"})
+
+
+class TestSkippedPlans(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(organisation="TestOrg", atlas_token="Test_Token", base_url="https://tf-api.com")
+        self.runs = TE2WorkspaceRuns(
+            client=self.client, workspace_name="Example_Workspace_1", plan_cache=PlanCache()
+        )
+        self.variables = [sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE]
+        self.current_configuration = {"id": "cv-current", "type": "configuration-versions"}
+        self.runs.discard_all_pending_runs = mock.Mock(return_value=True)
+
+    def mock_get(self, path, params=None, deadline=None):
+        if path == "/vars":
+            return MockResponse({"data": self.variables}, 200)
+        if path == "/workspaces/ws-example1":
+            return MockResponse({"data": {"id": "ws-example1", "type": "workspaces", "relationships": {
+                "current-configuration-version": {"data": self.current_configuration}
+            }}}, 200)
+        return run_response("planned_and_finished")
+
+    def request_plan(self, **kwargs):
+        with mock.patch.object(self.client, 'get', side_effect=self.mock_get), \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({"data": {"id": "run-new"}}, 201)) \
+                as post:
+            run = self.runs.request_run(request_type="plan", **kwargs)
+        return run, post.call_count
+
+    def test_unchanged_plan_skipped(self):
+        run, posts = self.request_plan(configuration_version_id="cv-1")
+        self.assertEqual(run['attributes']['status'], "planned_and_finished")
+        self.assertEqual(posts, 1)
+
+        skipped, posts = self.request_plan(configuration_version_id="cv-1")
+        self.assertEqual(skipped, run)
+        self.assertEqual(posts, 0)
+
+    def test_changed_inputs_plan_again(self):
+        self.request_plan(configuration_version_id="cv-1")
+
+        self.assertEqual(self.request_plan(configuration_version_id="cv-2")[1], 1)
+
+        self.variables = [{"id": "var-1", "attributes": dict(self.variables[0]["attributes"], value="val-2")}]
+        self.assertEqual(self.request_plan(configuration_version_id="cv-2")[1], 1)
+
+    @mock.patch('te2_sdk.te2.TE2ConfigurationVersions.upload', return_value={"id": "cv-1", "uploaded": False})
+    @mock.patch('te2_sdk.te2.content_hash', return_value="digest")
+    def test_directory_hashed_once(self, content_hash, upload):
+        self.request_plan(configuration_directory="/config")
+        self.assertEqual(self.request_plan(configuration_directory="/config")[1], 0)
+
+        self.assertEqual(content_hash.call_count, 2)  # Once per plan
+        self.assertEqual(upload.call_args[1]["digest"], "digest")
+
+    def test_current_configuration_cached(self):
+        self.request_plan()
+        self.assertEqual(self.request_plan()[1], 0)
+
+        self.current_configuration = {"id": "cv-pushed", "type": "configuration-versions"}
+        self.assertEqual(self.request_plan()[1], 1)
+
+    def test_unknown_configuration_not_cached(self):
+        self.current_configuration = None
+        self.request_plan()
+        self.assertEqual(self.request_plan()[1], 1)
+
+    def test_destroy_plans_keyed_apart(self):
+        self.request_plan(configuration_version_id="cv-1")
+        with mock.patch.object(self.runs, '_request_run_request', return_value={"id": "run-destroy"}) as destroy:
+            self.request_plan(configuration_version_id="cv-1", destroy=True)
+        destroy.assert_called_once()
+
+        # The CONFIRM_DESTROY the destroy plan set does not stop it being reused
+        self.variables = self.variables + [{"id": "var-3", "attributes": {
+            "key": "CONFIRM_DESTROY", "value": "1", "category": "env", "sensitive": False}}]
+        with mock.patch.object(self.runs, '_request_run_request') as destroy:
+            self.request_plan(configuration_version_id="cv-1", destroy=True)
+        destroy.assert_not_called()
@@ -0,0 +1,112 @@
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from tests.responses import responses as sample_responses
+from te2_sdk.plan_summary import parse_plan_log, summary_from_plan
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+PLAN_WITH_COUNTS = {
+    "id": "plan-testid",
+    "type": "plans",
+    "attributes": {
+        "has-changes": True,
+        "resource-additions": 2,
+        "resource-changes": 1,
+        "resource-destructions": 0,
+        "log-read-url": "https://logurl.com"
+    }
+}
+
+
+class StreamedLog(MockResponse):
+    def __init__(self, lines, status_code=200):
+        super().__init__(None, status_code)
+        self.lines = lines
+        self.read = 0
+        self.closed = False
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class TestParsePlanLog(TestCase):
+    def test_summary_line(self):
+        self.assertEqual(
+            parse_plan_log([b"Refreshing state...", b"Plan: 3 to add, 1 to change, 2 to destroy."]),
+            {"additions": 3, "changes": 1, "destructions": 2, "imports": 0, "has-changes": True}
+        )
+
+    def test_summary_line_with_imports(self):
+        self.assertEqual(parse_plan_log(["Plan: 1 to import, 0 to add, 0 to change, 0 to destroy."])["imports"], 1)
+
+    def test_coloured_summary_line(self):
+        summary = parse_plan_log(["\x1b[0m\x1b[1mPlan:\x1b[0m 1 to add, 0 to change, 0 to destroy."])
+        self.assertEqual(summary["additions"], 1)
+
+    def test_no_changes(self):
+        summary = parse_plan_log(["No changes. Your infrastructure matches the configuration."])
+        self.assertFalse(summary["has-changes"])
+
+    def test_structured_log(self):
+        summary = parse_plan_log([
+            '{"@level":"info","type":"version","terraform":"1.5.0"}',
+            '{"@level":"info","type":"change_summary","changes":{"add":0,"change":2,"remove":1,"operation":"plan"}}',
+        ])
+        self.assertEqual(summary, {"additions": 0, "changes": 2, "destructions": 1, "imports": 0, "has-changes": True})
+
+    def test_stops_at_summary(self):
+        log = StreamedLog(["Plan: 1 to add, 0 to change, 0 to destroy.", "never read"])
+        parse_plan_log(log.iter_lines())
+        self.assertEqual(log.read, 1)
+
+    def test_no_summary(self):
+        self.assertIsNone(parse_plan_log(["Refreshing state..."]))
+
+    def test_summary_from_plan(self):
+        self.assertEqual(
+            summary_from_plan(PLAN_WITH_COUNTS),
+            {"additions": 2, "changes": 1, "destructions": 0, "imports": 0, "has-changes": True}
+        )
+
+    def test_summary_from_plan_without_counts(self):
+        self.assertIsNone(summary_from_plan(sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLAN))
+
+
+class TestPlanSummary(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.get_run_action', return_value=PLAN_WITH_COUNTS)
+    def test_get_plan_summary_from_plan(self, get_run_action):
+        with mock.patch.object(self.client.transport, 'request') as request:
+            self.assertEqual(self.runs.get_plan_summary("run-testID")["additions"], 2)
+        request.assert_not_called()
+        get_run_action.assert_called_once_with("run-testID", request_type="plan")
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.get_run_action',
+                return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLAN)
+    def test_get_plan_summary_from_log(self, *args, **kwargs):
+        log = StreamedLog([b"Plan: 0 to add, 0 to change, 4 to destroy.", b"more output"])
+        with mock.patch.object(self.client.transport, 'request', return_value=log) as request:
+            self.assertEqual(self.runs.get_plan_summary("run-testID")["destructions"], 4)
+
+        request.assert_called_once_with("GET", "https://logurl.com", stream=True, timeout=self.client.timeout)
+        self.assertTrue(log.closed)
+        self.assertEqual(log.read, 1)
+
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.get_plan_log', return_value="https://logurl.com")
+    def test_stream_plan_summary_missing_log(self, *args, **kwargs):
+        log = StreamedLog([], status_code=404)
+        with mock.patch.object(self.client.transport, 'request', return_value=log):
+            self.assertRaises(IndexError, lambda: self.runs.stream_plan_summary("run-testID"))
+        self.assertTrue(log.closed)
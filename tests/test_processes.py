@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+from unittest import TestCase, mock, skipIf
+from tests.mocks import mocked_terraform_responses_gets as mock_gets
+from te2_sdk.cache import WorkspaceCache
+from te2_sdk.processes import map_workspaces
+from te2_sdk.te2 import TE2Client
+from te2_sdk.transport import RequestsTransport
+
+
+def workspace_id_and_pid(client, workspace_name, suffix):
+    return client.get_workspace_id(workspace_name) + suffix, os.getpid()
+
+
+class TestRequestsTransport(TestCase):
+    def test_session_reused(self):
+        transport = RequestsTransport(pooled=True)
+        self.assertIs(transport.session, transport.session)
+
+    def test_session_rebuilt_after_fork(self):
+        transport = RequestsTransport(pooled=True)
+        session = transport.session
+        transport._pid = -1  # As seen from a forked child
+        self.assertIsNot(transport.session, session)
+
+    def test_pickle_drops_session(self):
+        transport = RequestsTransport(pooled=True)
+        transport.session
+        restored = pickle.loads(pickle.dumps(transport))
+        self.assertTrue(restored.pooled)
+        self.assertIsNone(restored._session)
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_unpooled_uses_requests(self, get):
+        RequestsTransport().request("GET", "https://tf-api.com/runs/run-testID")
+        get.assert_called_once_with(url="https://tf-api.com/runs/run-testID", headers=None, params=None)
+
+
+class TestPicklableClient(TestCase):
+    def test_pickle_client(self):
+        client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com",
+            transport=RequestsTransport(pooled=True),
+            workspace_cache=WorkspaceCache()
+        )
+        client.transport.session
+        restored = pickle.loads(pickle.dumps(client))
+
+        self.assertEqual(restored.request_header, client.request_header)
+        self.assertEqual(restored.serializer.name, client.serializer.name)
+        self.assertIsNone(restored.transport._session)
+
+
+class TestMapWorkspaces(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com",
+            workspace_cache=WorkspaceCache(os.path.join(self.directory.name, "workspaces.json"))
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @skipIf(sys.version_info < (3, 7), "mp_context needs Python 3.7")
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_map_workspaces_in_processes(self, get):
+        # Spawned workers do not inherit the mock, so lookups must be served from the shared cache
+        results = map_workspaces(
+            self.client,
+            ["Example_Workspace_1", "Example_Workspace_2"],
+            workspace_id_and_pid,
+            "-checked",
+            max_workers=2,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+        self.assertEqual(results["Example_Workspace_1"][0], "ws-example1-checked")
+        self.assertEqual(results["Example_Workspace_2"][0], "ws-example2-checked")
+        self.assertNotIn(os.getpid(), [pid for _, pid in results.values()])
+        self.assertEqual(get.call_count, 1)
@@ -0,0 +1,160 @@
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.run_states import RunStatePolicy, POLL_INTERVALS, DEFAULT_POLL_INTERVAL
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns
+
+
+def run_response(status, **attributes):
+    attributes["status"] = status
+    return MockResponse({"data": {"id": "run-testID", "type": "runs", "attributes": attributes}}, 200)
+
+
+class TestRunStatePolicy(TestCase):
+    def test_invalid_request_type(self):
+        self.assertRaises(KeyError, lambda: RunStatePolicy(request_type="invalid"))
+
+    def test_plan_terminal_states(self):
+        policy = RunStatePolicy(request_type="plan")
+        for status in ["planned", "policy_checked", "policy_soft_failed", "errored", "planned_and_finished"]:
+            self.assertTrue(policy.is_complete(status), status)
+        for status in ["pending", "plan_queued", "planning", "policy_checking", "cost_estimating"]:
+            self.assertFalse(policy.is_complete(status), status)
+
+    def test_plan_waits_for_later_checks(self):
+        policy = RunStatePolicy(request_type="plan")
+        self.assertTrue(policy.needs_actions("planned"))
+        self.assertFalse(policy.is_complete("planned", {"attributes": {"actions": {"is-confirmable": False}}}))
+        self.assertTrue(policy.is_complete("policy_checked", {"attributes": {"actions": {"is-confirmable": True}}}))
+        self.assertTrue(policy.is_complete("apply_queued"))  # Confirmed by auto-apply
+
+    def test_apply_terminal_states(self):
+        policy = RunStatePolicy(request_type="apply")
+        for status in ["applied", "errored", "discarded", "policy_override"]:
+            self.assertTrue(policy.is_complete(status), status)
+        for status in ["pending", "planned", "confirmed", "apply_queued", "applying"]:
+            self.assertFalse(policy.is_complete(status), status)
+
+    def test_unknown_state_is_transitional(self):
+        self.assertFalse(RunStatePolicy().is_complete("some_new_state"))
+
+    def test_predicate(self):
+        policy = RunStatePolicy(predicate=lambda run: run['attributes']['has-changes'])
+        self.assertTrue(policy.needs_document)
+        self.assertTrue(policy.is_complete("planning", {"attributes": {"has-changes": True}}))
+        self.assertFalse(policy.is_complete("planned", {"attributes": {"has-changes": False}}))
+
+    def test_predicate_final_state_always_complete(self):
+        policy = RunStatePolicy(predicate=lambda run: False)
+        self.assertTrue(policy.is_complete("errored", None))
+
+    def test_poll_intervals(self):
+        policy = RunStatePolicy(poll_intervals={"pending": 60})
+        self.assertEqual(policy.poll_interval("pending"), 60)
+        self.assertEqual(policy.poll_interval("applying"), POLL_INTERVALS["applying"])
+        self.assertEqual(policy.poll_interval("unknown"), DEFAULT_POLL_INTERVAL)
+
+
+class TestRunResultsPolling(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_polls_through_transitional_states(self, sleep):
+        responses = [
+            run_response("pending"),
+            run_response("planning"),
+            run_response("planned", **{"has-changes": True})
+        ]
+        with mock.patch.object(self.client, 'get', side_effect=responses):
+            result = self.runs._get_run_results(run_id="run-testID", request_type="plan")
+
+        self.assertEqual(result['attributes']['status'], "planned")
+        self.assertEqual(
+            [call[0][0] for call in sleep.call_args_list],
+            [POLL_INTERVALS["pending"], POLL_INTERVALS["planning"]]
+        )
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_apply_waits_past_planned(self, sleep):
+        responses = [run_response("planned"), run_response("applying"), run_response("applied")]
+        with mock.patch.object(self.client, 'get', side_effect=responses):
+            result = self.runs._get_run_results(run_id="run-testID", request_type="apply")
+
+        self.assertEqual(result['attributes']['status'], "applied")
+        self.assertEqual(sleep.call_count, 2)
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_apply_confirms_planned_run(self, sleep):
+        confirmations = []
+
+        def get(path, params=None, deadline=None):
+            # Without auto-apply the run stays planned until it is confirmed
+            return run_response("applied" if confirmations else "planned")
+
+        def post(path, data=None, deadline=None):
+            confirmations.append(path)
+            return MockResponse({}, 202)
+
+        created = {"id": "run-testID", "type": "runs", "attributes": {"status": "pending"}}
+        with mock.patch.object(self.client, 'get', side_effect=get), \
+                mock.patch.object(self.client, 'post', side_effect=post), \
+                mock.patch.object(self.runs, '_request_run_request', return_value=created):
+            result = self.runs.request_run(request_type="apply")
+
+        self.assertEqual(result['attributes']['status'], "applied")
+        self.assertEqual(confirmations, ["/runs/run-testID/actions/apply"])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_plan_polls_through_policy_checks(self, sleep):
+        responses = [
+            run_response("planned", actions={"is-confirmable": False}),
+            run_response("cost_estimated", actions={"is-confirmable": False}),
+            run_response("policy_checking", actions={"is-confirmable": False}),
+            run_response("policy_checked", actions={"is-confirmable": True}),
+        ]
+        with mock.patch.object(self.client, 'get', side_effect=responses):
+            result = self.runs._get_run_results(run_id="run-testID", request_type="plan")
+
+        self.assertEqual(result['attributes']['status'], "policy_checked")
+        self.assertEqual(sleep.call_count, 3)
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_apply_confirms_once_confirmable(self, sleep):
+        responses = [
+            run_response("planned", actions={"is-confirmable": False}),
+            run_response("policy_checked", actions={"is-confirmable": True}),
+            run_response("applied"),
+        ]
+        with mock.patch.object(self.client, 'get', side_effect=responses), \
+                mock.patch.object(self.client, 'post', return_value=MockResponse({}, 202)) as post:
+            result = self.runs._get_run_results(run_id="run-testID", request_type="apply", confirm=True)
+
+        self.assertEqual(result['attributes']['status'], "applied")
+        self.assertEqual([call[1]["path"] for call in post.call_args_list], ["/runs/run-testID/actions/apply"])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_predicate_completes_early(self, sleep):
+        responses = [
+            run_response("planning", **{"has-changes": False}),
+            run_response("planning", **{"has-changes": True})
+        ]
+        with mock.patch.object(self.client, 'get', side_effect=responses):
+            result = self.runs._get_run_results(
+                run_id="run-testID",
+                predicate=lambda run: run['attributes']['has-changes']
+            )
+
+        self.assertTrue(result['attributes']['has-changes'])
+        self.assertEqual(sleep.call_count, 1)
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_timeout(self, sleep):
+        with mock.patch.object(self.client, 'get', return_value=run_response("pending")):
+            self.assertRaises(TimeoutError, lambda: self.runs._get_run_results(run_id="run-testID", timeout_count=3))
+        self.assertEqual(sleep.call_count, 3)
@@ -0,0 +1,151 @@
+import threading
+from concurrent.futures import CancelledError
+from unittest import TestCase
+from te2_sdk.scheduler import TE2RunScheduler
+
+
+class FakeRuns:
+    """Stands in for TE2WorkspaceRuns, recording when each run starts and blocking until released."""
+
+    def __init__(self, log, gates, client, workspace_name):
+        self.log = log
+        self.gates = gates
+        self.workspace_name = workspace_name
+
+    def request_run(self, request_type="plan", destroy=False, **kwargs):
+        self.log.append(("start", self.workspace_name, request_type, kwargs.get("tag")))
+        self.gates.setdefault(self.workspace_name, threading.Event()).wait(5)
+        self.log.append(("end", self.workspace_name, request_type, kwargs.get("tag")))
+        if kwargs.get("fail"):
+            raise SyntaxError("Invalid call to Terraform Enterprise 2")
+        return {"workspace": self.workspace_name, "request_type": request_type, "tag": kwargs.get("tag")}
+
+
+class TestRunScheduler(TestCase):
+    def setUp(self):
+        self.log = []
+        self.gates = {}
+        self.scheduler = TE2RunScheduler(
+            client=None,
+            max_concurrent=2,
+            runs_factory=lambda client, name: FakeRuns(self.log, self.gates, client, name)
+        )
+
+    def tearDown(self):
+        for gate in self.gates.values():
+            gate.set()
+        self.scheduler.shutdown(cancel_pending=True)
+
+    def gate(self, workspace_name):
+        return self.gates.setdefault(workspace_name, threading.Event())
+
+    def test_runs_are_serialised_per_workspace(self):
+        gate = self.gate("ws_a")
+        first = self.scheduler.submit("ws_a", "apply", tag=1)
+        second = self.scheduler.submit("ws_a", "apply", tag=2)
+
+        self.assertEqual(self.scheduler.pending("ws_a"), 1)
+        gate.set()
+
+        self.assertEqual(first.result(5)["tag"], 1)
+        self.assertEqual(second.result(5)["tag"], 2)
+        self.assertEqual([entry[0] for entry in self.log], ["start", "end", "start", "end"])
+
+    def test_workspaces_run_in_parallel_up_to_limit(self):
+        gates = [self.gate(name) for name in ("ws_a", "ws_b", "ws_c")]
+        futures = [self.scheduler.submit(name, "apply") for name in ("ws_a", "ws_b", "ws_c")]
+
+        self.assertEqual(self.scheduler.pending(), 1)
+        self.assertEqual(self.scheduler.pending("ws_c"), 1)
+
+        for gate in gates:
+            gate.set()
+        self.assertEqual([future.result(5)["workspace"] for future in futures], ["ws_a", "ws_b", "ws_c"])
+
+    def test_duplicate_plans_are_coalesced(self):
+        gate = self.gate("ws_a")
+        self.scheduler.submit("ws_a", "apply", tag="running")
+        first = self.scheduler.submit("ws_a", "plan")
+        second = self.scheduler.submit("ws_a", "plan")
+        destroy = self.scheduler.submit("ws_a", "plan", destroy=True)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, destroy)
+        self.assertEqual(self.scheduler.pending("ws_a"), 2)
+
+        gate.set()
+        first.result(5)
+        destroy.result(5)
+        self.assertEqual(len([entry for entry in self.log if entry[0] == "start"]), 3)
+
+    def test_applies_are_not_coalesced(self):
+        self.gate("ws_a")
+        self.scheduler.submit("ws_a", "plan", tag="running")
+        self.assertIsNot(self.scheduler.submit("ws_a", "apply"), self.scheduler.submit("ws_a", "apply"))
+
+    def test_priority_order(self):
+        gate = self.gate("ws_a")
+        self.scheduler.submit("ws_a", "apply", tag="running")
+        low = self.scheduler.submit("ws_a", "apply", tag="low")
+        high = self.scheduler.submit("ws_a", "apply", priority=10, tag="high")
+
+        gate.set()
+        low.result(5)
+        high.result(5)
+        started = [entry[3] for entry in self.log if entry[0] == "start"]
+        self.assertEqual(started, ["running", "high", "low"])
+
+    def test_coalesced_plan_takes_highest_priority(self):
+        gate = self.gate("ws_a")
+        self.scheduler.submit("ws_a", "apply", tag="running")
+        self.scheduler.submit("ws_a", "apply", tag="apply")
+        plan = self.scheduler.submit("ws_a", "plan", tag="plan")
+        self.scheduler.submit("ws_a", "plan", priority=5)
+
+        gate.set()
+        plan.result(5)
+        started = [entry[3] for entry in self.log if entry[0] == "start"]
+        self.assertEqual(started[:2], ["running", "plan"])
+
+    def test_exception_is_set_on_future(self):
+        self.gate("ws_a").set()
+        future = self.scheduler.submit("ws_a", "apply", fail=True)
+        self.assertRaises(SyntaxError, lambda: future.result(5))
+        self.assertEqual(self.scheduler.submit("ws_a", "apply", tag="next").result(5)["tag"], "next")
+
+    def test_cancelled_request_is_skipped(self):
+        gate = self.gate("ws_a")
+        self.scheduler.submit("ws_a", "apply", tag="running")
+        cancelled = self.scheduler.submit("ws_a", "apply", tag="cancelled")
+        after = self.scheduler.submit("ws_a", "apply", tag="after")
+
+        self.assertTrue(cancelled.cancel())
+        gate.set()
+        after.result(5)
+        self.assertNotIn("cancelled", [entry[3] for entry in self.log])
+
+    def test_shutdown_cancel_pending(self):
+        gate = self.gate("ws_a")
+        running = self.scheduler.submit("ws_a", "apply")
+        queued = self.scheduler.submit("ws_a", "apply")
+        self.scheduler.shutdown(wait=False, cancel_pending=True)
+        gate.set()
+
+        self.assertEqual(running.result(5)["workspace"], "ws_a")
+        self.assertRaises(CancelledError, queued.result)
+        self.assertRaises(RuntimeError, lambda: self.scheduler.submit("ws_a"))
+
+    def test_shutdown_without_waiting_runs_queued(self):
+        gate = self.gate("ws_a")
+        first = self.scheduler.submit("ws_a", "apply", tag=1)
+        second = self.scheduler.submit("ws_a", "apply", tag=2)
+
+        self.scheduler.shutdown(wait=False)
+        self.assertRaises(RuntimeError, lambda: self.scheduler.submit("ws_b"))
+        gate.set()
+
+        self.assertEqual(first.result(5)["tag"], 1)
+        self.assertEqual(second.result(5)["tag"], 2)
+
+    def test_max_concurrent_must_be_positive(self):
+        self.assertRaises(ValueError, lambda: TE2RunScheduler(client=None, max_concurrent=0))
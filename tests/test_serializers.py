@@ -0,0 +1,100 @@
+import json
+from unittest import TestCase, mock
+from tests.requests import requests as sample_requests
+from tests.responses import responses as sample_responses
+from tests.mocks import MockResponse
+from te2_sdk import serializers
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns, TE2WorkspaceVariables
+
+
+class TestSerializers(TestCase):
+    def test_get_serializer_default(self):
+        self.assertIn(serializers.get_serializer().name, serializers.SERIALIZERS)
+
+    def test_get_serializer_by_name(self):
+        self.assertIsInstance(serializers.get_serializer("json"), serializers.JSONSerializer)
+
+    def test_get_serializer_instance(self):
+        serializer = serializers.JSONSerializer()
+        self.assertIs(serializers.get_serializer(serializer), serializer)
+
+    def test_get_serializer_unknown(self):
+        self.assertRaises(KeyError, lambda: serializers.get_serializer("yaml"))
+
+    def test_backends_round_trip(self):
+        for name, backend in serializers.SERIALIZERS.items():
+            try:
+                serializer = backend()
+            except ImportError:
+                continue
+            self.assertEqual(
+                serializer.loads(serializer.dumps(sample_responses.SAMPLE_GET_WORKSPACE_RUN)),
+                sample_responses.SAMPLE_GET_WORKSPACE_RUN
+            )
+
+    def test_decode_bytes(self):
+        response = MockResponse(None, 200)
+        response.content = json.dumps({"data": sample_responses.SAMPLE_GET_WORKSPACE_RUN}).encode()
+        self.assertEqual(
+            serializers.decode(response, serializers.JSONSerializer())['data'],
+            sample_responses.SAMPLE_GET_WORKSPACE_RUN
+        )
+
+    def test_decode_falls_back_to_json(self):
+        response = MockResponse({"data": []}, 200)
+        self.assertEqual(serializers.decode(response, serializers.JSONSerializer()), {"data": []})
+
+    def test_decode_status_bytes(self):
+        response = MockResponse(None, 200)
+        response.content = json.dumps({"data": sample_responses.SAMPLE_GET_WORKSPACE_RUN}, indent=2).encode()
+        self.assertEqual(serializers.decode_status(response), "applied")
+
+    def test_decode_status_falls_back_to_json(self):
+        response = MockResponse({"data": sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED}, 200)
+        self.assertEqual(serializers.decode_status(response), "applied")
+
+
+class TestBodyTemplates(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1")
+        self.variables = TE2WorkspaceVariables(client=self.client, workspace_name="Example_Workspace_1")
+
+    def test_run_request_matches_render(self):
+        self.assertEqual(
+            json.loads(serializers.RUN_REQUEST.render(workspace_id="ws-example1", destroy=True)),
+            sample_requests.SAMPLE_REQUEST_RUN
+        )
+
+    def test_run_request_escapes_values(self):
+        body = serializers.RUN_REQUEST.render(workspace_id='ws-"quoted"', destroy=False)
+        self.assertEqual(json.loads(body)['data']['relationships']['workspace']['data']['id'], 'ws-"quoted"')
+
+    def test_variable_request_matches_render(self):
+        expected = self.variables._render_request_data_workplace_variable_attributes(
+            key="test_key", value="test_value", category="env", sensitive=True, hcl=True
+        )
+        expected["filter"] = self.variables._render_request_data_workplace_filter()
+
+        self.assertEqual(
+            json.loads(serializers.variable_request(hcl=True, create=True).render(
+                key="test_key", value="test_value", category="env", sensitive=True,
+                organisation="TestOrg", workspace_name="Example_Workspace_1"
+            )),
+            expected
+        )
+
+    def test_variable_request_update(self):
+        body = json.loads(serializers.variable_request(update=True).render(
+            id="var-1", key="key1", value="value", category="env", sensitive=False
+        ))
+        self.assertEqual(body['data']['id'], "var-1")
+        self.assertNotIn("hcl", body['data']['attributes'])
+
+    def test_variable_request_is_cached(self):
+        self.assertIs(serializers.variable_request(hcl=True), serializers.variable_request(hcl=True))
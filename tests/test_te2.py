@@ -1,3 +1,4 @@
+import json
 from unittest import TestCase, mock
 from tests.requests import requests as sample_requests
 from tests.responses import responses as sample_responses
@@ -5,7 +6,8 @@ from tests.mocks import mocked_terraform_responses_gets as mock_gets
 from tests.mocks import mocked_terraform_responses_posts as mock_posts
 from tests.mocks import mocked_terraform_responses_patches as mock_patches
 from tests.mocks import mocked_terraform_responses_deletes as mock_deletes
-from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns, TE2WorkspaceVariables
+from tests.mocks import MockResponse
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns, TE2WorkspaceVariables, jsonapi_params
 
 
 class TestTE2Client(TestCase):
@@ -25,21 +27,21 @@ class TestTE2Client(TestCase):
             }
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_all_workspaces_success(self, *args, **kwargs):
         self.assertEqual(
             self.client.get_all_workspaces(),
             sample_responses.SAMPLE_GET_WORKSPACES_RESPONSE
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_request_workspace_id_success(self, *args, **kwargs):
         self.assertEqual(
             self.client.get_workspace_id("Example_Workspace_1"),
             "ws-example1"
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_request_workspace_id_failure(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.client.get_workspace_id("Fake_Workspace"))
 
@@ -60,20 +62,21 @@ class TestTE2WorkspaceRuns(TestCase):
             workspace_name="Example_Workspace_1",
         )
 
-    def test_render_run_request(self):
-        self.assertEqual(
-            self.runs._render_run_request(destroy=True),
-            sample_requests.SAMPLE_REQUEST_RUN
-        )
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.create_or_update_workspace_variable', return_value=True)
+    @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
+    def test_render_run_request(self, *args, **kwargs):
+        with mock.patch.object(self.client, 'post', return_value=MockResponse({"data": {"id": "run-1"}}, 201)) as post:
+            self.runs._request_run_request(destroy=True)
+        self.assertEqual(json.loads(post.call_args[1]["data"]), sample_requests.SAMPLE_REQUEST_RUN)
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_workspace_runs_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.get_workspace_runs("Example_Workspace_1"),
             sample_responses.SAMPLE_GET_WORKSPACE_RUNS
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_workspace_runs_fail(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.runs.get_workspace_runs("Invalid_Workspace"))
 
@@ -88,47 +91,47 @@ class TestTE2WorkspaceRuns(TestCase):
     def test_get_run_status_fail(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.runs.get_run_status("non_existant_id"))
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_by_id_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.get_run_by_id("run-testID"),
             sample_responses.SAMPLE_GET_WORKSPACE_RUN
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_by_id_fail(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.runs.get_run_by_id("invalid_run"))
 
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_discard_plan_by_id_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.discard_plan_by_id("run-testID"),
             "Successfully Discarded Plan: run-testID"
         )
 
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_discard_plan_by_id_fail(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.runs.discard_plan_by_id("invalid_run"))
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_action_plan_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.get_run_action(run_id="run-testID", request_type="plan"),
             sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLAN
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_action_apply_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.get_run_action(run_id="run-testID", request_type="apply"),
             sample_responses.SAMPLE_GET_WORKSPACE_RUN_APPLY
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_action_fail(self, *args, **kwargs):
         self.assertRaises(IndexError, lambda: self.runs.get_run_action(run_id="run-fakeid", request_type="apply"))
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_plan_log_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs.get_plan_log(run_id="run-testID", request_type="apply"),
@@ -136,7 +139,7 @@ class TestTE2WorkspaceRuns(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_request_run_request_apply_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs._request_run_request(
@@ -146,7 +149,7 @@ class TestTE2WorkspaceRuns(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_request_run_request_plan_success(self, *args, **kwargs):
         self.assertEqual(
             self.runs._request_run_request(
@@ -156,14 +159,14 @@ class TestTE2WorkspaceRuns(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_request_run_request_apply_fail(self, *args, **kwargs):
         self.assertRaises(SyntaxError, lambda: self.runs._request_run_request(run_id="fake_id"))
 
     @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
     @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.create_or_update_workspace_variable', return_value="true")
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns.discard_all_pending_runs', return_value=True)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_request_run_request_plan_success_destroy(self, *args, **kwargs):
         self.assertEqual(
             self.runs._request_run_request(
@@ -173,7 +176,7 @@ class TestTE2WorkspaceRuns(TestCase):
             sample_responses.SAMPLE_GET_WORKSPACE_RUN
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_run_results(self, *args, **kwargs):
         self.assertEqual(
             self.runs._get_run_results(
@@ -184,7 +187,7 @@ class TestTE2WorkspaceRuns(TestCase):
 
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_apply_results(self, *args, **kwargs):
         self.assertEqual(
             self.runs._get_run_results(
@@ -195,14 +198,14 @@ class TestTE2WorkspaceRuns(TestCase):
 
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_apply_results_invalid_request(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.runs._get_run_results(
                 run_id="run-testID",
                 request_type="invalid"
             ))
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_apply_results_timeout(self, *args, **kwargs):
         self.assertRaises(TimeoutError, lambda: self.runs._get_run_results(
                 run_id="run-testID",
@@ -211,7 +214,7 @@ class TestTE2WorkspaceRuns(TestCase):
             ))
 
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
     def test_request_run_success(self, *args, **kwargs):
@@ -223,7 +226,7 @@ class TestTE2WorkspaceRuns(TestCase):
             sample_responses.SAMPLE_GET_WORKSPACE_RUN
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_CHANGES)
     def test_request_run_plan_changes(self, *args, **kwargs):
@@ -235,7 +238,7 @@ class TestTE2WorkspaceRuns(TestCase):
             sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_CHANGES
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_NO_CHANGES)
     def test_request_run_plan_no_changes(self, *args, **kwargs):
@@ -247,7 +250,7 @@ class TestTE2WorkspaceRuns(TestCase):
             sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_NO_CHANGES
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._request_run_request', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN)
     @mock.patch('te2_sdk.te2.TE2WorkspaceRuns._get_run_results', return_value=sample_responses.SAMPLE_GET_WORKSPACE_RUN_PLANNED_ERRORED)
     def test_request_run_errored(self, *args, **kwargs):
@@ -302,14 +305,14 @@ class TestTE2WorkspaceVariables(TestCase):
             sample_requests.SAMPLE_REQUEST_WORKSPACE_FILTER
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     def test_get_workspace_variables_success(self, *args, **kwargs):
         self.assertEqual(
             self.variables.get_workspace_variables(),
             sample_responses.SAMPLE_GET_WORKSPACE_VARIABLES
         )
 
-    @mock.patch('te2_sdk.te2.requests.get', side_effect=mock_gets)
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
     @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
     def test_get_workspace_variables_fail(self, *args, **kwargs):
         self.non_existant_vars = TE2WorkspaceVariables(
@@ -331,7 +334,7 @@ class TestTE2WorkspaceVariables(TestCase):
     def test_get_variable_by_name_fail(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.variables.get_variable_by_name("badkey"))
 
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_create_or_update_workspace_variable_invalid_category(self, *args, **kwargs):
         self.assertRaises(
             SyntaxError,
@@ -344,7 +347,7 @@ class TestTE2WorkspaceVariables(TestCase):
             )
         )
 
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_create_or_update_workspace_variable_invalid_sensitive(self, *args, **kwargs):
         self.assertRaises(
             SyntaxError,
@@ -357,7 +360,7 @@ class TestTE2WorkspaceVariables(TestCase):
             )
         )
 
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_create_or_update_workspace_variable_invalid_hcl(self, *args, **kwargs):
         self.assertRaises(
             SyntaxError,
@@ -370,7 +373,7 @@ class TestTE2WorkspaceVariables(TestCase):
             )
         )
 
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def delete_variable_by_id_success(self, *args, **kwargs):
         self.assertEqual(
             self.variables.delete_variable_by_id(
@@ -379,7 +382,7 @@ class TestTE2WorkspaceVariables(TestCase):
             "Success"
         )
 
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def delete_variable_by_id_fail(self, *args, **kwargs):
         self.assertRaises(
             KeyError,
@@ -389,7 +392,7 @@ class TestTE2WorkspaceVariables(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', side_effect=KeyError)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_create_or_update_workspace_variable_new_success(self, *args, **kwargs):
         self.assertTrue(
             self.variables.create_or_update_workspace_variable(
@@ -402,7 +405,7 @@ class TestTE2WorkspaceVariables(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', side_effect=KeyError)
-    @mock.patch('te2_sdk.te2.requests.post', side_effect=mock_posts)
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=mock_posts)
     def test_create_or_update_workspace_variable_new_fail(self, *args, **kwargs):
         self.assertRaises(
             SyntaxError,
@@ -415,8 +418,9 @@ class TestTE2WorkspaceVariables(TestCase):
             )
         )
 
-    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value="id-existing")
-    @mock.patch('te2_sdk.te2.requests.patch', side_effect=mock_patches)
+    @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name',
+                return_value=dict(sample_responses.SAMPLE_GET_WORKSPACE_VARIABLE, id="id-existing"))
+    @mock.patch('te2_sdk.transport.requests.patch', side_effect=mock_patches)
     def test_create_or_update_workspace_variable_existing_success(self, *args, **kwargs):
         self.assertEqual(
             self.variables.create_or_update_workspace_variable(
@@ -430,7 +434,7 @@ class TestTE2WorkspaceVariables(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', return_value="id-existing")
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def test_delete_variable_by_name_success(self,*args, **kwargs):
         self.assertEqual(
             self.variables.delete_variable_by_name("Some_Real_ID"),
@@ -438,18 +442,18 @@ class TestTE2WorkspaceVariables(TestCase):
         )
 
     @mock.patch('te2_sdk.te2.TE2WorkspaceVariables.get_variable_by_name', side_effect=KeyError)
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def test_delete_variable_by_name_failure(self,*args, **kwargs):
         self.assertRaises(KeyError, lambda: self.variables.delete_variable_by_name("FakeID"))
 
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def test_delete_variable_by_id_success(self, *args, **kwargs):
         self.assertEqual(
             self.variables.delete_variable_by_id("id-existing"),
             True
         )
 
-    @mock.patch('te2_sdk.te2.requests.delete', side_effect=mock_deletes)
+    @mock.patch('te2_sdk.transport.requests.delete', side_effect=mock_deletes)
     def test_delete_variable_by_id_failure(self, *args, **kwargs):
         self.assertRaises(KeyError, lambda: self.variables.delete_variable_by_id("fake-id"))
 
@@ -460,3 +464,105 @@ class TestTE2WorkspaceVariables(TestCase):
             self.variables.delete_all_variables(),
             None
         )
+
+
+def compound_run(status):
+    return {
+        "data": {
+            "id": "run-testID",
+            "type": "runs",
+            "attributes": {"status": status},
+            "relationships": {
+                "plan": {"data": {"id": "plan-testID", "type": "plans"}},
+                "apply": {"data": {"id": "apply-testID", "type": "applies"}}
+            }
+        },
+        "included": [
+            {"id": "plan-testID", "type": "plans", "attributes": {"status": "finished"}},
+            {"id": "apply-testID", "type": "applies", "attributes": {"status": "finished"}}
+        ]
+    }
+
+
+class TestSparseFieldsets(TestCase):
+    @mock.patch('te2_sdk.te2.TE2Client.get_workspace_id', return_value="ws-example1")
+    def setUp(self, *args, **kwargs):
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="https://tf-api.com"
+        )
+        self.runs = TE2WorkspaceRuns(client=self.client, workspace_name="Example_Workspace_1", sparse_polling=True)
+
+    def test_jsonapi_params(self):
+        self.assertEqual(
+            jsonapi_params(fields={"runs": ["status", "has-changes"]}, include=["plan", "apply"], params={"a": 1}),
+            {"fields[runs]": "status,has-changes", "include": "plan,apply", "a": 1}
+        )
+        self.assertIsNone(jsonapi_params())
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_workspace_lookup_requests_names_only(self, get):
+        self.assertEqual(self.client.get_workspace_id("Example_Workspace_1"), "ws-example1")
+        self.assertEqual(get.call_args[1]["params"],
+                         {"fields[workspaces]": "name", "page[number]": 1, "page[size]": 100})
+
+    def test_workspace_listing_follows_pages(self):
+        def page(names, next_page):
+            return MockResponse({
+                "data": [{"id": "ws-" + name, "type": "workspaces", "attributes": {"name": name}} for name in names],
+                "meta": {"pagination": {"next-page": next_page}}
+            }, 200)
+
+        with mock.patch.object(self.client, 'get', side_effect=[page(["a", "b"], 2), page(["c"], None)]) as get:
+            self.assertEqual(self.client.get_workspace_ids(["a", "c"]), {"a": "ws-a", "c": "ws-c"})
+
+        self.assertEqual([call[1]["params"]["page[number]"] for call in get.call_args_list], [1, 2])
+
+    @mock.patch('te2_sdk.te2.time.sleep')
+    def test_sparse_polling_then_compound_document(self, *args, **kwargs):
+        responses = [
+            MockResponse({"data": {"id": "run-testID", "type": "runs", "attributes": {"status": "applying"}}}, 200),
+            MockResponse({"data": {"id": "run-testID", "type": "runs", "attributes": {"status": "applied"}}}, 200),
+            MockResponse(compound_run("applied"), 200),
+        ]
+        with mock.patch.object(self.client, 'get', side_effect=responses) as get:
+            run = self.runs._get_run_results("run-testID", request_type="apply")
+
+            self.assertEqual(run["relationships"]["plan"]["data"]["id"], "plan-testID")
+            self.assertEqual(get.call_args_list[0][1]["params"], {"fields[runs]": "status,actions"})
+            self.assertEqual(get.call_args_list[2][1]["params"], {"include": "plan,apply"})
+
+            self.assertEqual(self.runs.get_run_action("run-testID", "plan")["id"], "plan-testID")
+            self.assertEqual(self.runs.get_run_action("run-testID", "apply")["id"], "apply-testID")
+            self.assertEqual(get.call_count, 3)
+
+    def test_unfinished_apply_not_kept(self):
+        with mock.patch.object(self.client, 'get', return_value=MockResponse(compound_run("planned"), 200)):
+            self.runs.get_run_by_id("run-testID", include=["plan", "apply"])
+
+        self.assertIn("plan", self.runs._actions["run-testID"])
+        self.assertNotIn("apply", self.runs._actions["run-testID"])
+
+    def test_running_plan_not_kept(self):
+        with mock.patch.object(self.client, 'get', return_value=MockResponse(compound_run("planning"), 200)):
+            self.runs.get_run_by_id("run-testID", include=["plan", "apply"])
+        self.assertNotIn("run-testID", self.runs._actions)
+
+    def test_kept_runs_capped(self):
+        def remember(run_id):
+            document = compound_run("planned")
+            self.runs._remember_actions(dict(document["data"], id=run_id), document["included"])
+
+        with mock.patch('te2_sdk.te2.MAX_KEPT_RUNS', 2):
+            remember("run-1")
+            remember("run-2")
+            self.assertIsNotNone(self.runs.get_run_action("run-1", "plan"))  # run-2 is now the least recently used
+            remember("run-3")
+
+        self.assertEqual(list(self.runs._actions), ["run-1", "run-3"])
+
+    @mock.patch('te2_sdk.transport.requests.get', side_effect=mock_gets)
+    def test_plan_log_not_read_from_kept_plan(self, *args, **kwargs):
+        self.runs._actions["run-testID"] = {"plan": {"attributes": {"log-read-url": "https://expired"}}}
+        self.assertNotEqual(self.runs.get_plan_log("run-testID"), "https://expired")
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+from te2_sdk._http_server import ThreadingHTTPServer
+from te2_sdk.cache import WorkspaceCache
+from te2_sdk.te2 import TE2Client, TE2WorkspaceRuns, TE2WorkspaceVariables
+from te2_sdk.transport import RequestsTransport
+
+WORKSPACES = ["Example_Workspace_" + str(number) for number in range(10)]
+THREADS = 16
+
+
+class StandInState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listings = 0
+        self.connections = set()
+        self.variables = {}  # (workspace name, key) -> value
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Just enough of the API for workspace lookups, run polls and variable writes"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, document, status_code=200):
+        body = json.dumps(document).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlparse(self.path)
+        with state.lock:
+            state.connections.add(self.client_address)
+
+        if url.path == "/api/v2/organizations/TestOrg/workspaces":
+            with state.lock:
+                state.listings += 1
+            time.sleep(0.2)  # Slow enough for every thread to miss the cache at once
+            self._reply({"data": [{"id": "ws-" + name, "type": "workspaces", "attributes": {"name": name}}
+                                  for name in WORKSPACES]})
+        elif url.path.startswith("/api/v2/runs/"):
+            run_id = url.path.rsplit("/", 1)[1]
+            self._reply({"data": {"id": run_id, "type": "runs", "attributes": {"status": "applied"}}})
+        elif url.path == "/api/v2/vars":
+            name = parse_qs(url.query)["filter[workspace][name]"][0]
+            with state.lock:
+                variables = [(key, value) for (workspace, key), value in state.variables.items() if workspace == name]
+            self._reply({"data": [{"id": "var-" + key, "type": "vars",
+                                   "attributes": {"key": key, "value": value, "category": "terraform",
+                                                  "sensitive": False}}
+                                  for key, value in variables]})
+        else:
+            self._reply({"errors": [{"status": "404"}]}, 404)
+
+    def do_POST(self):
+        state = self.server.state
+        document = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        attributes = document["data"]["attributes"]
+        with state.lock:
+            state.connections.add(self.client_address)
+            state.variables[(document["filter"]["workspace"]["name"], attributes["key"])] = attributes["value"]
+        self._reply({"data": dict(document["data"], id="var-" + attributes["key"])}, 201)
+
+    def do_PATCH(self):
+        state = self.server.state
+        document = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        attributes = document["data"]["attributes"]
+        with state.lock:
+            state.connections.add(self.client_address)
+            workspace = next(workspace for workspace, key in state.variables if key == attributes["key"])
+            state.variables[(workspace, attributes["key"])] = attributes["value"]
+        self._reply({"data": document["data"]})
+
+
+class TestSharedClient(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.state = StandInState()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = TE2Client(
+            organisation="TestOrg",
+            atlas_token="Test_Token",
+            base_url="http://127.0.0.1:" + str(self.server.server_address[1]) + "/api/v2",
+            transport=RequestsTransport(pooled=True, pool_maxsize=THREADS),
+            workspace_cache=WorkspaceCache(os.path.join(self.directory.name, "workspaces.json"))
+        )
+
+    def tearDown(self):
+        self.client.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_hammer_one_client(self):
+        start = threading.Barrier(THREADS)
+
+        def work(number):
+            start.wait()
+            workspace_name = WORKSPACES[number % len(WORKSPACES)]
+            runs = TE2WorkspaceRuns(self.client, workspace_name)
+            variables = TE2WorkspaceVariables(self.client, workspace_name, workspace_id=runs.workspace_id)
+
+            for iteration in range(20):
+                run = runs.get_run_by_id("run-" + str(number) + "x" + str(iteration))
+                self.assertEqual(run["attributes"]["status"], "applied")
+                self.assertEqual(self.client.get_workspace_id(workspace_name), "ws-" + workspace_name)
+                variables.create_or_update_workspace_variable("thread_" + str(number), str(iteration))
+            return runs.workspace_id
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            workspace_ids = list(pool.map(work, range(THREADS)))
+
+        state = self.server.state
+        self.assertEqual(workspace_ids, ["ws-" + WORKSPACES[number % len(WORKSPACES)] for number in range(THREADS)])
+        self.assertEqual(state.listings, 1)
+        self.assertEqual(len(state.variables), THREADS)
+        self.assertEqual(set(state.variables.values()), {"19"})
+        # Connections are reused between requests, and never more than one per thread
+        self.assertLessEqual(len(state.connections), THREADS)
+
+    def test_threads_writing_one_cache_file(self):
+        path = os.path.join(self.directory.name, "shared.json")
+
+        def work(number):
+            cache = WorkspaceCache(path)  # A cache per thread, all on the same file
+            for key in range(25):
+                cache.update({str(number) + "/" + str(key): "ws-" + str(key)})
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(work, range(8)))
+
+        self.assertEqual(len(WorkspaceCache(path)._store.load()), 200)
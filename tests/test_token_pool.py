@@ -0,0 +1,102 @@
+import pickle
+import threading
+from unittest import TestCase, mock
+from tests.mocks import MockResponse
+from te2_sdk.te2 import TE2Client
+from te2_sdk.token_pool import TokenPool
+
+
+def limited_response(status_code=200, **headers):
+    response = MockResponse({"data": []}, status_code)
+    response.headers = {"X-RateLimit-" + name.title(): str(value) for name, value in headers.items()}
+    return response
+
+
+class TestTokenPool(TestCase):
+    def test_requires_tokens(self):
+        self.assertRaises(ValueError, lambda: TokenPool([]))
+
+    def test_least_in_flight(self):
+        pool = TokenPool(["a", "b", "c"])
+        self.assertEqual([pool.acquire() for _ in range(3)], ["a", "b", "c"])
+
+        pool.release("b")
+        self.assertEqual(pool.acquire(), "b")
+
+    def test_most_headroom(self):
+        pool = TokenPool(["a", "b"])
+        pool.release(pool.acquire(), limited_response(limit=30, remaining=3))
+        pool.release(pool.acquire(), limited_response(limit=30, remaining=20))
+
+        self.assertEqual(pool.acquire(), "b")
+        self.assertEqual(pool.stats()[0]["remaining"], 3)
+
+    def test_throttled_token_cools_down(self):
+        pool = TokenPool(["a", "b"], cooldown=60)
+        pool.release(pool.acquire(), limited_response(429))
+
+        self.assertEqual([pool.acquire(), pool.acquire()], ["b", "b"])
+        self.assertEqual(pool.stats()[0]["throttled"], 1)
+        self.assertGreater(pool.stats()[0]["cooling_for"], 50)
+
+    def test_reset_header_sets_cooldown(self):
+        pool = TokenPool(["a", "b"], cooldown=60)
+        pool.release(pool.acquire(), limited_response(remaining=0, reset=0.5))
+        self.assertLessEqual(pool.stats()[0]["cooling_for"], 0.5)
+        self.assertEqual(pool.acquire(), "b")
+
+    def test_all_cooling_uses_first_to_recover(self):
+        pool = TokenPool(["a", "b"])
+        pool.release(pool.acquire(), limited_response(429, reset=30))
+        pool.release(pool.acquire(), limited_response(429, reset=5))
+        self.assertEqual(pool.acquire(), "b")
+
+    def test_thread_safe(self):
+        pool = TokenPool(["a", "b", "c", "d"])
+
+        def work():
+            for _ in range(500):
+                pool.release(pool.acquire())
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.stats()
+        self.assertEqual(sum(token["requests"] for token in stats), 4000)
+        self.assertEqual([token["in_flight"] for token in stats], [0, 0, 0, 0])
+
+    def test_pickle(self):
+        pool = TokenPool(["a", "b"], cooldown=5)
+        pool.acquire()
+        restored = pickle.loads(pickle.dumps(pool))
+        self.assertEqual(restored.tokens, ["a", "b"])
+        self.assertEqual(restored.cooldown, 5)
+        self.assertEqual(restored.stats()[0]["in_flight"], 0)
+
+
+class TestClientTokenPool(TestCase):
+    @mock.patch('te2_sdk.transport.requests.get', return_value=limited_response(remaining=10))
+    def test_requests_spread_over_tokens(self, get):
+        client = TE2Client(organisation="TestOrg", atlas_token=["token-a", "token-b"], base_url="https://tf-api.com")
+        self.assertIsNotNone(client.token_pool)
+
+        client.get(path="/runs/run-1")
+        client.get(path="/runs/run-2")
+
+        self.assertEqual([call[1]["headers"]["Authorization"] for call in get.call_args_list],
+                         ["Bearer token-a", "Bearer token-b"])
+        self.assertEqual(client.request_header["Authorization"], "Bearer token-a")
+        self.assertEqual([token["in_flight"] for token in client.token_pool.stats()], [0, 0])
+
+    @mock.patch('te2_sdk.transport.requests.post', side_effect=OSError("connection reset"))
+    def test_failed_request_released(self, post):
+        client = TE2Client(organisation="TestOrg", atlas_token=TokenPool(["token-a"]), base_url="https://tf-api.com")
+        self.assertRaises(OSError, lambda: client.post(path="/runs", data="{}"))
+        self.assertEqual(client.token_pool.stats()[0]["in_flight"], 0)
+
+    def test_single_token(self):
+        client = TE2Client(organisation="TestOrg", atlas_token="token-a")
+        self.assertIsNone(client.token_pool)